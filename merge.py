@@ -1,13 +1,87 @@
 """Merge module."""
 
 import csv
+import itertools
 import logging
 import os
+import re
+import sys
+
+try:
+    from utilities.segmentos import LeitorSegmentos, listar_conjuntos
+except ModuleNotFoundError:
+    # executado como script (python merge.py), sem ``src`` no caminho
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+    from utilities.segmentos import LeitorSegmentos, listar_conjuntos
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+PADRAO_PARTE = re.compile(r"^(?P<base>.*)_parte_(?P<linha>\d+)_(?P<parte>\d+)\.csv$")
+
+
+def listar_partes(directory_path):
+    """
+    Lista os arquivos de partes de um diretório em ordem natural.
+
+    Os arquivos seguem o padrão "nome_parte_X_Y.csv" gerado pelo
+    ``break_text``, onde X é o número da linha e Y o número da parte. A ordem
+    é numérica, então "parte_2" vem antes de "parte_10".
+
+    Args:
+        directory_path (str): O caminho do diretório com os arquivos.
+
+    Returns:
+        list: Tuplas (base, linha, parte, nome do arquivo), em ordem. A
+        ordenação exige a listagem completa, então a lista tem um item por
+        arquivo; o conteúdo dos arquivos não é lido aqui.
+    """
+    partes = []
+    with os.scandir(directory_path) as entradas:
+        for entrada in entradas:
+            encontrado = PADRAO_PARTE.match(entrada.name)
+            if encontrado is None:
+                if entrada.name.endswith(".csv"):
+                    logging.warning("Arquivo ignorado no merge: %s", entrada.name)
+                continue
+            partes.append(
+                (
+                    encontrado["base"],
+                    int(encontrado["linha"]),
+                    int(encontrado["parte"]),
+                    entrada.name,
+                )
+            )
+    partes.sort()
+    return partes
+
+
+def merge_segmentos(directory_path, conjuntos, output_file):
+    """
+    Combina conjuntos de segmentos em um arquivo CSV, uma linha por texto.
+
+    Os shards são lidos sequencialmente; as partes de cada linha são unidas
+    em uma única célula.
+
+    Args:
+        directory_path (str): O caminho do diretório com os conjuntos.
+        conjuntos (list): Os nomes base dos conjuntos, na ordem de saída.
+        output_file (str): O caminho do arquivo de saída que será gerado.
+    """
+    total_linhas = 0
+    with open(output_file, "w", newline="") as saida:
+        writer = csv.writer(saida)
+        for indice, conjunto in enumerate(conjuntos):
+            leitor = LeitorSegmentos(directory_path, conjunto)
+            if indice == 0:
+                writer.writerow([leitor.metadados.get("coluna", "text")])
+            for _, textos in leitor.linhas():
+                writer.writerow([" ".join(textos)])
+                total_linhas += 1
+
+    logging.info("Arquivo CSV merged gerado: %s (%s linhas)", output_file, total_linhas)
+
 
 def merge_csv_files(directory_path, output_file):
     """
@@ -16,46 +90,53 @@ def merge_csv_files(directory_path, output_file):
     O script une os arquivos CSV que
     possuem um padrão de nome "nome_parte_X_Y.csv", onde X é o mesmo
     para diferentes partes e Y varia, em uma única linha no novo arquivo CSV.
+    Os textos das partes de uma linha são unidos, na ordem de Y, em uma
+    única célula. Cada arquivo é lido e cada linha é escrita assim que
+    completa, então o conteúdo dos arquivos nunca é acumulado; apenas a
+    lista ordenada dos nomes fica em memória, que cresce com o número de
+    arquivos (uma tupla curta por arquivo).
+
+    Se o diretório tiver conjuntos de segmentos (``utilities.segmentos``),
+    eles são usados no lugar dos arquivos de partes.
 
     Args:
         directory_path (str): O caminho do diretório contendo os arquivos CSV
         separados.
         output_file (str): O caminho do arquivo de saída que será gerado.
     """
-    merged_data = []
-    current_row = []
-    header = None
-
-    for filename in sorted(os.listdir(directory_path)):
-        if filename.endswith(".csv"):
-            with open(os.path.join(directory_path, filename), "r", newline="") as file:
-                reader = csv.reader(file)
-                rows = list(reader)
-                if header is None:
-                    header = rows[0]
-                if len(rows) == 1:
-                    current_row.extend(rows[0])
-                elif (
-                    len(rows) >= 2 and filename.endswith("_1.csv") and len(rows[1]) >= 1
-                ):
-                    if current_row:
-                        merged_data.append(current_row)
-                    current_row = rows[1]
-                elif (
-                    len(rows) >= 2 and filename.endswith("_2.csv") and len(rows[1]) >= 1
-                ):
-                    current_row.extend(rows[1])
+    conjuntos = listar_conjuntos(directory_path)
+    if conjuntos:
+        merge_segmentos(directory_path, conjuntos, output_file)
+        return
 
-    if current_row:
-        merged_data.append(current_row)
+    partes = listar_partes(directory_path)
+    total_linhas = 0
 
-    merged_data.insert(0, header)
-
-    with open(output_file, "w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(merged_data)
+    with open(output_file, "w", newline="") as saida:
+        writer = csv.writer(saida)
+        header = None
+        for _, grupo in itertools.groupby(partes, key=lambda parte: parte[:2]):
+            textos = []
+            for *_, filename in grupo:
+                with open(
+                    os.path.join(directory_path, filename), "r", newline=""
+                ) as file:
+                    rows = [row for row in csv.reader(file) if row]
+                if header is None:
+                    header = rows[0][:1]
+                    writer.writerow(header)
+                # arquivos traduzidos sem cabeçalho têm uma única linha
+                for row in rows[1:] if len(rows) > 1 else rows:
+                    textos.extend(row)
+            writer.writerow([" ".join(textos)])
+            total_linhas += 1
 
-    logging.info("Arquivo CSV merged gerado: %s", output_file)
+    logging.info(
+        "Arquivo CSV merged gerado: %s (%s linhas, %s partes)",
+        output_file,
+        total_linhas,
+        len(partes),
+    )
 
 
 if __name__ == "__main__":
@@ -67,4 +148,3 @@ def merge_csv_files(directory_path, output_file):
 
     # Execução do merge
     merge_csv_files(directory_path, output_file)
-    print("Hello!")
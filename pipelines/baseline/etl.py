@@ -0,0 +1,80 @@
+"""Stages of the translation pipeline.
+
+Each stage takes the input and output paths declared in ``config/main.yaml``
+and its params, and wraps the corresponding module of ``src/utilities`` (or
+``merge.py``) without prompting. The model modules are imported inside the
+stages, so the runner starts without torch.
+"""
+
+import json
+import logging
+import os
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+def check_restrictions(inputs: List[str], outputs: List[str]) -> None:
+    """
+    Check the input CSV and save its profile.
+
+    Raises:
+        ValueError: If the CSV violates a restriction.
+    """
+    from utilities.check_csv_restricoes import verificar_restricoes_csv
+
+    profile = verificar_restricoes_csv(inputs[0])
+    if not profile["valido"]:
+        raise ValueError(f"{inputs[0]}: {profile['problema']}")
+    with open(outputs[0], "w", encoding="utf-8") as profile_file:
+        json.dump(profile, profile_file, ensure_ascii=False, indent=2)
+
+
+def break_text(
+    inputs: List[str],
+    outputs: List[str],
+    column: str,
+    max_length: int,
+    max_rows: int,
+    format: str = "csv",
+) -> None:
+    """Split the texts of a column into parts of at most ``max_length`` chars."""
+    from utilities.break_text import CSVProcessor
+
+    output_dir = os.path.normpath(outputs[0])
+    CSVProcessor(
+        inputs[0],
+        column,
+        max_length,
+        max_rows,
+        os.path.dirname(output_dir) or ".",
+        os.path.basename(output_dir),
+        formato_saida=format,
+    ).verificar_e_dividir_limite_caracteres_csv()
+
+
+def translate(
+    inputs: List[str],
+    outputs: List[str],
+    target_language: str = "pt",
+    cache: str = None,
+    resume: bool = False,
+) -> None:
+    """Translate the parts with the Marian model."""
+    from utilities.segmentos import remover_conjuntos
+    from utilities.translate_marian import traduzir_csv
+
+    if not resume and os.path.isdir(outputs[0]):
+        # translations of parts that no longer exist would be merged
+        for name in os.listdir(outputs[0]):
+            if name.endswith(".csv"):
+                os.remove(os.path.join(outputs[0], name))
+        remover_conjuntos(outputs[0])
+    traduzir_csv(inputs[0], outputs[0], target_language, cache, resume)
+
+
+def merge(inputs: List[str], outputs: List[str]) -> None:
+    """Join the translated parts back into one row per text."""
+    from merge import merge_csv_files
+
+    merge_csv_files(inputs[0], outputs[0])
@@ -0,0 +1,378 @@
+"""Pipeline runner module.
+
+Runs the stages declared in the ``pipeline`` section of ``config/main.yaml``
+as a DAG, without prompting. Each stage declares its input and output
+paths; a stage runs after the stages producing its inputs and the ones
+listed in its ``after`` key.
+
+A stage is skipped when the hash of its inputs (file contents), its code
+(the stage function and the files listed in ``code``) and its config
+(inputs, outputs and params) is the one recorded after its last successful
+run and its outputs still exist. Changing the merge params therefore only
+reruns the merge, and a stage whose rerun produces identical outputs does
+not trigger the stages after it.
+
+Usage, from the repository root:
+
+    PYTHONPATH=src python -m pipelines.pipelines [key=value ...]
+
+Overrides use dotted keys, e.g. ``raw.path=data/raw/other.csv``.
+"""
+
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.path.join("config", "main.yaml")
+
+_REFERENCE = re.compile(r"\$\{([^}]+)\}")
+
+
+def _lookup(config: dict, key: str):
+    """Return the value of a dotted key, e.g. "processed.dir"."""
+    value = config
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(f"Unknown config key in interpolation: {key}")
+        value = value[part]
+    return value
+
+
+def interpolate(config: dict) -> dict:
+    """
+    Resolve the ``${dotted.key}`` references of a config.
+
+    A string made of a single reference takes the referenced value as is;
+    references inside a longer string are replaced by their text.
+
+    Args:
+        config (dict): The loaded config.
+
+    Returns:
+        dict: A copy of the config without references.
+
+    Raises:
+        KeyError: If a reference points to a missing key.
+        ValueError: If the references form a cycle.
+    """
+
+    def resolve(value, seen=()):
+        if isinstance(value, dict):
+            return {key: resolve(item, seen) for key, item in value.items()}
+        if isinstance(value, list):
+            return [resolve(item, seen) for item in value]
+        if not isinstance(value, str):
+            return value
+
+        def referenced(key):
+            if key in seen:
+                raise ValueError(f"Cyclic config interpolation: {key}")
+            return resolve(_lookup(config, key), seen + (key,))
+
+        whole = _REFERENCE.fullmatch(value)
+        if whole:
+            return referenced(whole.group(1))
+        return _REFERENCE.sub(lambda match: str(referenced(match.group(1))), value)
+
+    return resolve(config)
+
+
+def _set(config: dict, key: str, value) -> None:
+    """Set a dotted key, creating the intermediate sections."""
+    *parents, last = key.split(".")
+    for part in parents:
+        config = config.setdefault(part, {})
+    config[last] = value
+
+
+def load_config(path: str = CONFIG_PATH, overrides: Optional[List[str]] = None):
+    """
+    Load a Hydra-style config with its defaults list and interpolations.
+
+    Each ``group: option`` entry of ``defaults`` loads
+    ``<config dir>/<group>/<option>.yaml`` under the ``group`` key.
+
+    Args:
+        path (str): The main config file.
+        overrides (List[str], optional): "dotted.key=value" strings; the
+            value is parsed as YAML.
+
+    Returns:
+        dict: The resolved config.
+    """
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as config_file:
+        main = yaml.safe_load(config_file) or {}
+
+    config = {}
+    defaults = main.pop("defaults", None) or ["_self_"]
+    if "_self_" not in defaults:
+        defaults = [*defaults, "_self_"]
+    for entry in defaults:
+        if entry == "_self_":
+            config.update(main)
+            continue
+        (group, option), *_ = entry.items()
+        group_path = os.path.join(os.path.dirname(path), group, f"{option}.yaml")
+        with open(group_path, "r", encoding="utf-8") as group_file:
+            config[group] = yaml.safe_load(group_file) or {}
+
+    for override in overrides or []:
+        key, _, value = override.partition("=")
+        _set(config, key, yaml.safe_load(value))
+    return interpolate(config)
+
+
+def _hash_file(path: str, known: dict) -> str:
+    """Hash a file, reusing the digest of ``known`` while it is unchanged."""
+    status = os.stat(path)
+    identity = [status.st_size, status.st_mtime_ns]
+    if known.get(path, {}).get("identity") == identity:
+        return known[path]["sha256"]
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    known[path] = {"identity": identity, "sha256": digest.hexdigest()}
+    return known[path]["sha256"]
+
+
+def hash_path(path: str, known: Optional[dict] = None) -> str:
+    """
+    Hash the contents of a file or of the files of a directory.
+
+    Hidden files and directories (e.g. progress journals) and
+    ``__pycache__`` are left out, so only the data itself counts.
+
+    Args:
+        path (str): A file or directory.
+        known (dict, optional): Digests of previous runs, keyed by file
+            path; files whose size and modification time did not change
+            are not read again. Updated in place.
+
+    Returns:
+        str: The SHA-256 hex digest, or "missing" if the path does not exist.
+    """
+    known = {} if known is None else known
+    if not os.path.exists(path):
+        return "missing"
+    if os.path.isfile(path):
+        return _hash_file(path, known)
+    digest = hashlib.sha256()
+    for root, directories, files in os.walk(path):
+        directories[:] = sorted(
+            name
+            for name in directories
+            if not name.startswith(".") and name != "__pycache__"
+        )
+        for name in sorted(files):
+            if name.startswith(".") or name.endswith(".pyc"):
+                continue
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(_hash_file(file_path, known).encode())
+    return digest.hexdigest()
+
+
+class Stage:
+    """A step of the pipeline, as declared in the config."""
+
+    def __init__(self, name: str, spec: dict, functions) -> None:
+        """
+        Build a stage from its config entry.
+
+        Args:
+            name (str): The stage name.
+            spec (dict): The ``inputs``, ``outputs``, ``after``, ``code``,
+                ``params`` and ``function`` keys of the stage.
+            functions: Module or object holding the stage functions.
+        """
+        self.name = name
+        self.inputs = list(spec.get("inputs") or [])
+        self.outputs = list(spec.get("outputs") or [])
+        self.after = list(spec.get("after") or [])
+        self.code = list(spec.get("code") or [])
+        self.params = dict(spec.get("params") or {})
+        function_name = spec.get("function", name)
+        self.function = getattr(functions, function_name, None)
+        if self.function is None:
+            raise ValueError(f"Stage {name}: unknown function {function_name}")
+
+    def fingerprint(self, known: dict) -> str:
+        """Hash of the inputs, code and config that determine the outputs."""
+        try:
+            source = inspect.getsource(self.function)
+        except (OSError, TypeError):
+            source = self.function.__qualname__
+        payload = {
+            "inputs": {path: hash_path(path, known) for path in self.inputs},
+            "code": {path: hash_path(path, known) for path in self.code},
+            "function": hashlib.sha256(source.encode()).hexdigest(),
+            "config": {
+                "inputs": self.inputs,
+                "outputs": self.outputs,
+                "params": self.params,
+            },
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def run(self) -> None:
+        """Call the stage function."""
+        self.function(self.inputs, self.outputs, **self.params)
+
+
+def build_stages(config: dict, functions) -> List[Stage]:
+    """
+    Build the stages of the config in dependency order.
+
+    Args:
+        config (dict): The resolved config, with a ``pipeline.stages`` section.
+        functions: Module or object holding the stage functions.
+
+    Returns:
+        List[Stage]: The stages, each one after all its dependencies.
+
+    Raises:
+        ValueError: If a dependency is unknown or the stages form a cycle.
+    """
+    specs = config["pipeline"]["stages"]
+    stages = {name: Stage(name, spec or {}, functions) for name, spec in specs.items()}
+    producers = {
+        output: stage.name for stage in stages.values() for output in stage.outputs
+    }
+    dependencies = {}
+    for stage in stages.values():
+        unknown = [name for name in stage.after if name not in stages]
+        if unknown:
+            raise ValueError(f"Stage {stage.name}: unknown dependencies {unknown}")
+        dependencies[stage.name] = set(stage.after) | {
+            producers[path] for path in stage.inputs if path in producers
+        }
+        dependencies[stage.name].discard(stage.name)
+
+    # Kahn's algorithm, keeping the config order among independent stages
+    ordered, done = [], set()
+    while len(ordered) < len(stages):
+        ready = [
+            name for name in stages if name not in done and dependencies[name] <= done
+        ]
+        if not ready:
+            cycle = sorted(set(stages) - done)
+            raise ValueError(f"The pipeline stages form a cycle: {cycle}")
+        for name in ready:
+            ordered.append(stages[name])
+            done.add(name)
+    return ordered
+
+
+def _read_state(path: str) -> dict:
+    """Load the state of previous runs."""
+    try:
+        with open(path, "r", encoding="utf-8") as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(path: str, state: dict) -> None:
+    """Save the state atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def run_pipeline(
+    config: dict,
+    functions=None,
+    only: Optional[List[str]] = None,
+    force: Optional[List[str]] = None,
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    """
+    Run the stages of a config, skipping the up-to-date ones.
+
+    Args:
+        config (dict): The resolved config.
+        functions: Module or object holding the stage functions. Defaults
+            to ``pipelines.baseline.etl``.
+        only (List[str], optional): Run just these stages (and skip the
+            others even if they are stale).
+        force (List[str], optional): Run these stages even if up to date.
+        dry_run (bool): Report what would run without running it.
+
+    Returns:
+        Dict[str, str]: The status of each stage: "ran", "skipped",
+        "stale" (dry run) or "excluded".
+    """
+    if functions is None:
+        functions = importlib.import_module("pipelines.baseline.etl")
+    state_path = config["pipeline"]["state"]
+    state = _read_state(state_path)
+    known = state.setdefault("files", {})
+    stage_state = state.setdefault("stages", {})
+    statuses = {}
+    for stage in build_stages(config, functions):
+        if only and stage.name not in only:
+            statuses[stage.name] = "excluded"
+            continue
+        fingerprint = stage.fingerprint(known)
+        up_to_date = stage_state.get(stage.name) == fingerprint and all(
+            os.path.exists(path) for path in stage.outputs
+        )
+        if up_to_date and stage.name not in (force or []):
+            logger.info("Stage %s is up to date, skipping", stage.name)
+            statuses[stage.name] = "skipped"
+            continue
+        if dry_run:
+            logger.info("Stage %s would run", stage.name)
+            statuses[stage.name] = "stale"
+            continue
+        logger.info("Running stage %s", stage.name)
+        for output in stage.outputs:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        stage.run()
+        stage_state[stage.name] = fingerprint
+        _write_state(state_path, state)
+        statuses[stage.name] = "ran"
+    if not dry_run:
+        # keep the digests of the files hashed by the skipped stages too
+        _write_state(state_path, state)
+    return statuses
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("overrides", nargs="*", help="dotted.key=value")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--only", nargs="+", default=None)
+    parser.add_argument("--force", nargs="+", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config, args.overrides)
+    statuses = run_pipeline(
+        config, only=args.only, force=args.force, dry_run=args.dry_run
+    )
+    for name, status in statuses.items():
+        print(f"{name}: {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+import types
+
+import pytest
+
+from pipelines.pipelines import build_stages, interpolate, load_config, run_pipeline
+
+
+def fake_stages(calls):
+    """Estágios falsos que copiam a entrada, registrando cada execução."""
+
+    def copy(inputs, outputs, suffix=""):
+        calls.append(outputs[0])
+        with open(inputs[0], encoding="utf-8") as source:
+            text = source.read()
+        with open(outputs[0], "w", encoding="utf-8") as target:
+            target.write(text + suffix)
+
+    def translate(inputs, outputs):
+        calls.append("translate")
+        with open(inputs[0], encoding="utf-8") as source:
+            text = source.read()
+        with open(outputs[0], "w", encoding="utf-8") as target:
+            target.write(text.upper())
+
+    return types.SimpleNamespace(copy=copy, translate=translate)
+
+
+def make_config(tmp_path, merge_suffix=""):
+    raw = tmp_path / "raw.txt"
+    if not raw.exists():
+        raw.write_text("abc", encoding="utf-8")
+    return interpolate(
+        {
+            "raw": {"path": str(raw)},
+            "processed": {"dir": str(tmp_path / "processed")},
+            "pipeline": {
+                "state": "${processed.dir}/state.json",
+                "stages": {
+                    "merge": {
+                        "function": "copy",
+                        "inputs": ["${processed.dir}/translated.txt"],
+                        "outputs": ["${processed.dir}/final.txt"],
+                        "params": {"suffix": merge_suffix},
+                    },
+                    "translate": {
+                        "inputs": ["${processed.dir}/parts.txt"],
+                        "outputs": ["${processed.dir}/translated.txt"],
+                    },
+                    "break_text": {
+                        "function": "copy",
+                        "inputs": ["${raw.path}"],
+                        "outputs": ["${processed.dir}/parts.txt"],
+                    },
+                },
+            },
+        }
+    )
+
+
+def test_interpolacao_e_defaults(tmp_path):
+    """Os defaults do Hydra são carregados e as referências resolvidas."""
+    (tmp_path / "process").mkdir()
+    (tmp_path / "process" / "p1.yaml").write_text("use_columns: [a]\n")
+    (tmp_path / "main.yaml").write_text(
+        "defaults:\n  - process: p1\n  - _self_\n"
+        "processed:\n  dir: data\n  path: ${processed.dir}/x.csv\n"
+        "columns: ${process.use_columns}\n"
+    )
+    config = load_config(str(tmp_path / "main.yaml"), ["processed.dir=other"])
+    assert config["processed"]["path"] == "other/x.csv"
+    assert config["columns"] == ["a"]
+
+    with pytest.raises(ValueError):
+        interpolate({"a": "${b}", "b": "${a}"})
+
+
+def test_estagios_em_ordem_de_dependencia(tmp_path):
+    """A ordem segue as entradas e saídas, não a ordem do config."""
+    stages = build_stages(make_config(tmp_path), fake_stages([]))
+    assert [stage.name for stage in stages] == ["break_text", "translate", "merge"]
+
+
+def test_estagios_atualizados_sao_pulados(tmp_path):
+    """Mudar só o merge não repete a tradução; mudar a entrada repete tudo."""
+    calls = []
+    functions = fake_stages(calls)
+    statuses = run_pipeline(make_config(tmp_path), functions)
+    assert set(statuses.values()) == {"ran"}
+    assert (tmp_path / "processed" / "final.txt").read_text() == "ABC"
+
+    calls.clear()
+    statuses = run_pipeline(make_config(tmp_path), functions)
+    assert set(statuses.values()) == {"skipped"}
+    assert calls == []
+
+    statuses = run_pipeline(make_config(tmp_path, merge_suffix="!"), functions)
+    assert statuses == {"break_text": "skipped", "translate": "skipped", "merge": "ran"}
+    assert (tmp_path / "processed" / "final.txt").read_text() == "ABC!"
+
+    (tmp_path / "raw.txt").write_text("abcd", encoding="utf-8")
+    statuses = run_pipeline(make_config(tmp_path, merge_suffix="!"), functions)
+    assert set(statuses.values()) == {"ran"}
+    assert (tmp_path / "processed" / "final.txt").read_text() == "ABCD!"
+
+
+def test_saida_removida_e_estagio_forcado(tmp_path):
+    """Um estágio roda de novo se a saída sumiu ou se for forçado."""
+    functions = fake_stages([])
+    run_pipeline(make_config(tmp_path), functions)
+    (tmp_path / "processed" / "final.txt").unlink()
+    statuses = run_pipeline(make_config(tmp_path), functions, dry_run=True)
+    assert statuses["merge"] == "stale"
+    assert statuses["translate"] == "skipped"
+
+    statuses = run_pipeline(make_config(tmp_path), functions, force=["translate"])
+    # a tradução refeita é idêntica, então o merge só roda pela saída ausente
+    assert statuses == {"break_text": "skipped", "translate": "ran", "merge": "ran"}
+
+
+def test_config_do_repositorio():
+    """O config/main.yaml declara os estágios existentes em etl.py."""
+    from pipelines.baseline import etl
+
+    stages = build_stages(load_config(), etl)
+    assert [stage.name for stage in stages] == [
+        "check",
+        "break_text",
+        "translate",
+        "merge",
+    ]
@@ -0,0 +1,225 @@
+"""HTTP translation service.
+
+Exposes the model wrappers of ``src/models`` over HTTP. Concurrent
+requests for the same model are coalesced into batched ``generate`` calls
+by a ``MicroBatcher``; when its queue is full the service answers 503 so
+clients back off instead of piling up.
+
+``GET /metrics`` exposes the stage timers and counters of
+``models.metrics`` in the Prometheus text format.
+
+``POST /translate/stream`` translates one document and streams the
+translation as Server-Sent Events while it is being decoded, so the time
+to the first byte does not grow with the document length. Its chunks are
+generated under the lock of the model batcher, and a client disconnect
+stops the decoding; ``MAX_STREAMS`` bounds the live generations.
+
+Settings are read from the environment:
+    SERVE_MODELS: Comma-separated models loaded and warmed up at startup.
+    MAX_BATCH_SIZE: Maximum number of sentences per ``generate`` call.
+    MAX_WAIT_MS: Maximum time a request waits for others to join its batch.
+    MAX_QUEUE_SIZE: Maximum number of requests waiting per model.
+    MAX_STREAMS: Maximum number of documents streamed at the same time.
+
+Example:
+    $ PYTHONPATH=src SERVE_MODELS=marian uvicorn serve.app:app
+"""
+
+import asyncio
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from models.batching import MicroBatcher, QueueFullError
+from models.metrics import metrics
+from models.registry import registry
+
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "10"))
+MAX_QUEUE_SIZE = int(os.environ.get("MAX_QUEUE_SIZE", "256"))
+MAX_STREAMS = int(os.environ.get("MAX_STREAMS", "4"))
+
+batchers = {}
+streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+class TranslationRequest(BaseModel):
+    """Body of a translation request."""
+
+    model: str = "marian"
+    texts: List[str]
+
+
+class StreamRequest(BaseModel):
+    """Body of a streaming translation request."""
+
+    model: str = "marian"
+    text: str
+
+
+class TranslationResponse(BaseModel):
+    """Body of a translation response."""
+
+    model: str
+    translations: List[str]
+
+
+async def get_batcher(modelname: str) -> MicroBatcher:
+    """Return the batcher of a model, loading the model on first use."""
+    if modelname not in batchers:
+        try:
+            registry.factory(modelname)
+        except ValueError as error:
+            raise HTTPException(status_code=404, detail=str(error)) from error
+        model = await asyncio.to_thread(registry.get, modelname)
+        if modelname not in batchers:
+            batchers[modelname] = MicroBatcher(
+                model.translate_batch, MAX_BATCH_SIZE, MAX_WAIT_MS, MAX_QUEUE_SIZE
+            )
+            batchers[modelname].start()
+    return batchers[modelname]
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Load and warm up the configured models, and stop the batchers."""
+    for modelname in filter(None, os.environ.get("SERVE_MODELS", "").split(",")):
+        batcher = await get_batcher(modelname.strip())
+        await batcher.translate(["Hello world."])
+    yield
+    for batcher in batchers.values():
+        await batcher.stop()
+    batchers.clear()
+
+
+app = FastAPI(title="translate-dataset", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    """Liveness probe, with the queue depth of each loaded model."""
+    return {
+        "status": "ok",
+        "queues": {name: batcher.queue_depth() for name, batcher in batchers.items()},
+    }
+
+
+@app.get("/models")
+async def list_models():
+    """List the registered and the loaded models."""
+    return {"registered": registry.names(), "loaded": registry.loaded()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage timers and counters in the Prometheus text format."""
+    return metrics.to_prometheus()
+
+
+@app.post("/translate", response_model=TranslationResponse)
+async def translate(request: TranslationRequest):
+    """Translate a list of texts with one of the registered models."""
+    batcher = await get_batcher(request.model)
+    try:
+        translations = await batcher.translate(request.texts)
+    except QueueFullError as error:
+        raise HTTPException(
+            status_code=503, detail=str(error), headers={"Retry-After": "1"}
+        ) from error
+    return TranslationResponse(model=request.model, translations=translations)
+
+
+_END = object()
+
+
+async def server_sent_events(
+    pieces, stop: threading.Event, started: Optional[threading.Event] = None
+):
+    """
+    Format translation pieces as Server-Sent Events.
+
+    The pieces are produced on a worker thread. However the stream ends,
+    including a client disconnect, the decoding is stopped, the pieces
+    generator is closed (which waits for its generation thread) and only
+    then is the stream slot released. ``started`` is set once this cleanup
+    is guaranteed to run.
+    """
+    if started is not None:
+        started.set()
+    access = threading.Lock()
+
+    def advance():
+        with access:
+            return next(pieces, _END)
+
+    def finish():
+        # waits for a pending ``advance`` before closing the generator
+        with access:
+            pieces.close()
+        streams.release()
+
+    try:
+        while True:
+            piece = await asyncio.to_thread(advance)
+            if piece is _END:
+                break
+            yield f"data: {json.dumps({'text': piece}, ensure_ascii=False)}\n\n"
+        yield "event: end\ndata: {}\n\n"
+    except Exception as error:
+        yield f"event: error\ndata: {json.dumps({'detail': str(error)})}\n\n"
+    finally:
+        stop.set()
+        # a thread, since awaiting here fails once the request is cancelled
+        threading.Thread(target=finish, daemon=True).start()
+
+
+class EventStreamResponse(StreamingResponse):
+    """Server-Sent Events response holding one of the ``streams`` slots."""
+
+    def __init__(self, pieces, stop: threading.Event) -> None:
+        """Init function."""
+        self.pieces = pieces
+        self.started = threading.Event()
+        super().__init__(
+            server_sent_events(pieces, stop, self.started),
+            media_type="text/event-stream",
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        """Send the stream, releasing its slot if the body never started."""
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # the client went away before the first event: the body generator
+            # never ran, so its cleanup will not release the slot
+            if not self.started.is_set():
+                self.pieces.close()
+                streams.release()
+
+
+@app.post("/translate/stream")
+async def translate_stream(request: StreamRequest):
+    """Translate a document, streaming the translation as it is decoded."""
+    batcher = await get_batcher(request.model)
+    model = await asyncio.to_thread(registry.get, request.model)
+    if not hasattr(model, "translate_stream"):
+        raise HTTPException(
+            status_code=400, detail=f"Model '{request.model}' cannot stream"
+        )
+    if not streams.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail=f"{MAX_STREAMS} documents are already streaming",
+            headers={"Retry-After": "1"},
+        )
+    stop = threading.Event()
+    # the batcher lock keeps generate from running for a stream and a batch
+    # of the same model instance at the same time
+    pieces = model.translate_stream(request.text, stop=stop, lock=batcher.lock)
+    return EventStreamResponse(pieces, stop)
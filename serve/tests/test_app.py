@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from starlette.requests import ClientDisconnect  # noqa: E402
+
+from models.registry import registry  # noqa: E402
+from serve.app import (  # noqa: E402
+    MAX_STREAMS,
+    EventStreamResponse,
+    app,
+    server_sent_events,
+    streams,
+)
+
+
+class EchoModel:
+    """Modelo falso que devolve os textos em maiúsculas."""
+
+    def translate_batch(self, sentences):
+        return [sentence.upper() for sentence in sentences]
+
+    def translate_stream(self, text, stop=None, lock=None):
+        for word in text.upper().split():
+            with lock:
+                yield word
+
+
+registry.register("echo", EchoModel)
+
+
+def test_translate():
+    """As traduções voltam na ordem dos textos enviados."""
+    with TestClient(app) as client:
+        response = client.post(
+            "/translate", json={"model": "echo", "texts": ["a", "b"]}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"model": "echo", "translations": ["A", "B"]}
+        assert client.get("/health").json()["queues"] == {"echo": 0}
+
+
+def test_metrics():
+    """As métricas são expostas no formato de texto do Prometheus."""
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert 'translation_stage_seconds_total{stage="generate"}' in response.text
+
+
+def test_unknown_model():
+    """Um modelo não registrado responde 404."""
+    with TestClient(app) as client:
+        response = client.post("/translate", json={"model": "nope", "texts": ["a"]})
+        assert response.status_code == 404
+
+
+def test_translate_stream():
+    """A tradução é enviada em eventos à medida que é gerada."""
+    with TestClient(app) as client:
+        response = client.post(
+            "/translate/stream", json={"model": "echo", "text": "hello world"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text == (
+            'data: {"text": "HELLO"}\n\n'
+            'data: {"text": "WORLD"}\n\n'
+            "event: end\ndata: {}\n\n"
+        )
+
+
+def test_stream_interrompido_libera_a_vaga_depois_de_parar():
+    """Ao desconectar, a geração para e só então a vaga é liberada."""
+    fechado = threading.Event()
+
+    def pedacos(stop):
+        try:
+            while not stop.is_set():
+                yield "x"
+        finally:
+            fechado.set()
+
+    async def principal():
+        stop = threading.Event()
+        streams.acquire()
+        eventos = server_sent_events(pedacos(stop), stop)
+        assert await eventos.__anext__() == 'data: {"text": "x"}\n\n'
+        await eventos.aclose()
+        return stop
+
+    assert asyncio.run(principal()).is_set()
+    assert fechado.wait(5)
+    # a vaga volta ao semáforo depois que o gerador é fechado
+    for _ in range(500):
+        if streams._value == MAX_STREAMS:
+            break
+        time.sleep(0.01)
+    assert streams._value == MAX_STREAMS
+
+
+def test_desconexao_antes_do_corpo_libera_a_vaga():
+    """Se o cliente sai antes do primeiro evento, a vaga também é liberada."""
+    fechado = threading.Event()
+
+    def pedacos():
+        try:
+            yield "x"
+        finally:
+            fechado.set()
+
+    gerador = pedacos()
+    next(gerador)  # aberto, como o gerador de um modelo já iniciado
+
+    async def enviar(mensagem):
+        raise OSError("cliente desconectado")
+
+    async def principal():
+        streams.acquire()
+        resposta = EventStreamResponse(gerador, threading.Event())
+        escopo = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(ClientDisconnect):
+            await resposta(escopo, None, enviar)
+
+    asyncio.run(principal())
+    assert fechado.is_set()
+    assert streams._value == MAX_STREAMS
@@ -1,70 +1,680 @@
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
 from typing import List
 
-import pandas as pd
 from tqdm import tqdm
 
-from models.m2m100 import M2m100Model
-from models.marian import MarianModel
-from models.mbart import MbartModel
-from models.nllb import NllbModel
-from models.t5 import t5Model
+from models.metrics import MetricsReporter, metrics
+from models.parallel import ParallelTranslator, default_threads, init_worker
+from models.pipeline import StagedPipeline
+from models.registry import configured, registry
+from utilities.cache import CacheTraducoes
 from utilities.check_csv_restricoes import verificar_restricoes_csv
+from utilities.checkpoint import DiarioProgresso
+from utilities.dedup import Deduplicador
+from utilities.tabular import EscritorBlocos, formato_arquivo, ler_em_blocos
+from utilities.webdataset import (
+    expandir_shards,
+    traduzir_shard,
+    traduzir_shard_no_worker,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
 def select_model(modelname):
-    if modelname == "marian":
-        return MarianModel()
-    elif modelname == "t5":
-        return t5Model()
-    elif modelname == "nllb":
-        return NllbModel()
-    elif modelname == "mbart":
-        return MbartModel()
-    elif modelname == "m2m100":
-        return M2m100Model()
-    logger.debug("Provided invalid modelname!")
+    """Return the warm instance of a registered model, loading it if needed."""
+    return registry.get(modelname)
+
+
+def translate_dataframe(
+    model,
+    modelname: str,
+    dataframe,
+    collumns: List[str],
+    batch_size: int = 16,
+    dedup=None,
+):
+    """
+    Translate columns of a dataframe in place.
+
+    Each translation is added as a new "<column> <model> translation" column.
+    Models that report it (``Seq2SeqModel.translate_batch_with_flags``) also
+    add a "<column> <model> hit_cap" column, True for the rows whose decoding
+    stopped at the generation length limit.
+
+    Args:
+    model: The model wrapper used for translation.
+    modelname (str): Name of the model, used in the new column names.
+    dataframe (pd.DataFrame): The rows to be translated.
+    collumns (list): List of column names to be translated.
+    batch_size (int): Number of rows translated by each ``generate`` call.
+    dedup (Deduplicador): Optional deduplicator; when given, the cells of all
+        columns are pooled and each unique segment is translated once. The
+        hit_cap columns are not added in this mode.
+
+    When the model has a token budget (``max_tokens``), the cells of all the
+    columns are pooled into a single ``translate_batch`` call, which sorts
+    their chunks by token length and packs them into batches of up to
+    ``max_tokens`` padded tokens; ``batch_size`` is then not used.
+
+    """
+    pooled = bool(getattr(model, "max_tokens", None))
+
+    def translate_texts(texts, hit_cap=None):
+        translations = []
+        # with a token budget the model schedules all the texts at once
+        step = max(1, len(texts)) if pooled else batch_size
+        for start in range(0, len(texts), step):
+            batch = texts[start : start + step]
+            if hit_cap is None:
+                translations.extend(model.translate_batch(batch))
+                continue
+            batch_translations, batch_hit_cap = model.translate_batch_with_flags(batch)
+            translations.extend(batch_translations)
+            hit_cap.extend(batch_hit_cap)
+        return translations
+
+    rows = len(dataframe)
+    flags = {}
+    if dedup is None and not pooled:
+        translated = []
+        for collum in collumns:
+            if hasattr(model, "translate_batch_with_flags"):
+                flags[collum] = []
+            translated.append(
+                translate_texts(dataframe[collum].tolist(), flags.get(collum))
+            )
+    else:
+        texts = [text for collum in collumns for text in dataframe[collum].tolist()]
+        if dedup is not None:
+            translations = dedup.traduzir(texts, translate_texts)
+        else:
+            hit_cap = [] if hasattr(model, "translate_batch_with_flags") else None
+            translations = translate_texts(texts, hit_cap)
+            if hit_cap is not None:
+                flags = {
+                    collum: hit_cap[i * rows : (i + 1) * rows]
+                    for i, collum in enumerate(collumns)
+                }
+        translated = [
+            translations[i * rows : (i + 1) * rows] for i in range(len(collumns))
+        ]
+
+    for collum, translations in zip(collumns, translated):
+        translated_collum_name = f"{collum} {modelname} translation"
+        dataframe.insert(len(dataframe.columns), translated_collum_name, translations)
+        if collum in flags:
+            dataframe.insert(
+                len(dataframe.columns), f"{collum} {modelname} hit_cap", flags[collum]
+            )
+
+
+def open_model(modelname, num_workers=1, threads_per_worker=None, batch_size=16):
+    """
+    Return a model ready for ``translate_dataframe``.
+
+    Args:
+    modelname (str): Name of a registered model.
+    num_workers (int): Above 1, a ``ParallelTranslator`` pool of worker
+        processes is started; it must be closed with ``close()``.
+    threads_per_worker (int): Torch threads used by each worker process.
+    batch_size (int): Number of sentences sent to a worker at a time.
+
+    """
+    if num_workers > 1:
+        return ParallelTranslator(
+            modelname, num_workers, threads_per_worker, shard_size=batch_size
+        )
+    return select_model(modelname)
+
+
+def translate_to_file(
+    csv_path,
+    output_path,
+    output_format,
+    journal_config,
+    translate_chunks,
+    description,
+    chunk_size=1000,
+    read_columns=None,
+    max_rows=None,
+    total_rows=None,
+    resume=False,
+    status=None,
+):
+    """
+    Read the input in chunks, translate each chunk and append it to a file.
+
+    Each written chunk is recorded in the "<output>.progress.jsonl" journal,
+    so an interrupted run can be resumed from the last recorded chunk. The
+    time spent reading and writing is added to ``models.metrics.metrics``.
+
+    Args:
+    csv_path (str): Path of the input file.
+    output_path (str): Path of the output file.
+    output_format (str): "csv", "jsonl", "parquet" or "arrow".
+    journal_config (dict): Settings of the run, checked when resuming.
+    translate_chunks (Callable): Takes the iterator of input chunks and
+        yields them, in order, with the translated columns added.
+    description (str): Label of the progress bar.
+    chunk_size (int): Number of rows read at a time.
+    read_columns (list): Columns loaded from the input, or None for all.
+    max_rows (int): Optional maximum number of rows to translate.
+    total_rows (int): Optional number of rows, for the progress bar.
+    resume (bool): Continue an interrupted run.
+    status (Callable): Optional function returning a dict shown next to the
+        progress bar, e.g. the queue depths of a ``StagedPipeline``.
+
+    """
+    journal = DiarioProgresso(
+        f"{output_path}.progress.jsonl", journal_config, retomar=resume
+    )
+    done = journal.concluidas()
+    start_row = done[-1]["rows"][1] if done else 0
+    with EscritorBlocos(
+        output_path,
+        output_format,
+        retomar_em=done[-1]["bytes"] if done else 0,
+        linhas_escritas=start_row,
+    ) as writer, tqdm(
+        desc=description,
+        unit="rows",
+        initial=start_row,
+        total=total_rows,
+    ) as progress:
+        chunks = ler_em_blocos(
+            csv_path,
+            chunk_size,
+            colunas=read_columns,
+            max_linhas=max_rows,
+            inicio=start_row,
+        )
+        for dataframe in translate_chunks(metrics.timed("read", chunks)):
+            with metrics.timer("write"):
+                writer.escrever(dataframe)
+                journal.registrar(
+                    {
+                        "model": journal_config["model"],
+                        "collumns": journal_config["collumns"],
+                        "rows": [
+                            int(dataframe.index[0]),
+                            int(dataframe.index[-1]) + 1,
+                        ],
+                        "bytes": writer.tamanho(),
+                    }
+                )
+            metrics.increment("rows", len(dataframe))
+            progress.update(len(dataframe))
+            if status is not None:
+                progress.set_postfix(status())
+    logger.info(f"Saved {output_path}")
+
+
+def translate_chunks_serially(
+    model, modelname, chunks, collumns, batch_size=16, dedup=None
+):
+    """Translate each chunk with ``translate_dataframe`` and yield it."""
+    for dataframe in chunks:
+        translate_dataframe(model, modelname, dataframe, collumns, batch_size, dedup)
+        yield dataframe
+
+
+def translate_chunks_pipelined(pipeline, modelname, chunks, collumns):
+    """
+    Translate chunks through a ``StagedPipeline`` and yield them in order.
+
+    The cells of all the translated columns of a chunk form one pipeline
+    item, so the next chunks are read and tokenized while this one is being
+    generated, and it is written while the next ones are generated. Like
+    ``translate_dataframe``, a "<column> <model> hit_cap" column follows each
+    translated column.
+    """
+    items = (
+        (dataframe, [text for collum in collumns for text in dataframe[collum]])
+        for dataframe in chunks
+    )
+    for dataframe, translations, hit_cap in pipeline.translate(items):
+        rows = len(dataframe)
+        for position, collum in enumerate(collumns):
+            cells = slice(position * rows, (position + 1) * rows)
+            dataframe.insert(
+                len(dataframe.columns),
+                f"{collum} {modelname} translation",
+                translations[cells],
+            )
+            dataframe.insert(
+                len(dataframe.columns), f"{collum} {modelname} hit_cap", hit_cap[cells]
+            )
+        yield dataframe
+
+
+def log_padding_efficiency(modelname, before):
+    """
+    Log the share of the token slots sent to ``generate`` that held tokens.
+
+    Args:
+    modelname (str): Label of the log message.
+    before (dict): The ``models.metrics`` counters when the run started.
+
+    """
+    counters = metrics.snapshot()["counters"]
+    padded = counters["padded_tokens"] - before["padded_tokens"]
+    if padded:
+        tokens = counters["tokens_in"] - before["tokens_in"]
+        logger.info(
+            f"{modelname}: padding efficiency {tokens / padded:.1%} "
+            f"({tokens} of {padded} token slots)"
+        )
 
 
 def translate_csv(
-    csv_path, collumns: List[str], models: List[str], output_format="csv", filename=None
+    csv_path,
+    collumns: List[str],
+    models: List[str],
+    output_format="csv",
+    filename=None,
+    batch_size: int = 16,
+    cache_path=None,
+    chunk_size: int = 1000,
+    max_rows=None,
+    resume: bool = False,
+    num_workers: int = 1,
+    threads_per_worker=None,
+    dedup=None,
+    keep_columns=None,
+    concurrent_models: bool = False,
+    total_threads=None,
+    pipelined: bool = False,
+    queue_size: int = 4,
+    max_tokens=None,
+    metrics_path=None,
+    prometheus_path=None,
+    metrics_interval: float = 10.0,
 ):
     """
     Args:
     csv_file (str): Path to the CSV file.
     columns_to_translate (list): List of column names to be translated.
     translation_map (dict): Dictionary containing the translation map for each column.
+    output_format (str): "csv", "jsonl", "parquet" or "arrow". Parquet and
+        Arrow outputs are written one row group per chunk and cannot be
+        resumed.
+    batch_size (int): Number of rows translated by each ``generate`` call.
+    cache_path (str): Optional path of the SQLite translation cache shared
+        across runs and models.
+    chunk_size (int): Number of rows read, translated and appended to the
+        output at a time, which bounds the memory used.
+    max_rows (int): Optional maximum number of rows to translate.
+    resume (bool): Continue an interrupted run, skipping the chunks recorded
+        in the "<output>.progress.jsonl" journal and appending to the partial
+        output.
+    num_workers (int): Number of worker processes. Above 1, rows are sharded
+        across processes that each hold their own copy of the model.
+    threads_per_worker (int): Torch threads used by each worker process.
+    dedup (str): "cell" translates each distinct cell once and "sentence"
+        also each distinct sentence, pooled across all translated columns.
+    keep_columns (list): Optional list of untranslated columns copied to the
+        output. Only these and the translated columns are loaded; Parquet
+        and Arrow inputs (chosen by extension) are memory-mapped.
+    concurrent_models (bool): Read the input once and run all the models on
+        each chunk at the same time, writing their translations side by side
+        into a single "<filename>_translation.<format>" file. All the models
+        must fit the registry memory budget (MODEL_MEMORY_BUDGET_MB).
+    total_threads (int): Torch threads shared by the concurrent models,
+        split evenly between them. Defaults to the CPU count.
+    pipelined (bool): Run reading, tokenization, generation, decoding and
+        writing as overlapping stages (see ``models.pipeline``), so that
+        ``generate`` does not wait on I/O or text processing. Queue depths are
+        shown next to the progress bar. Not combined with ``num_workers``,
+        ``dedup`` or ``concurrent_models``.
+    queue_size (int): Capacity of each queue between pipeline stages.
+    max_tokens (int): Token budget of each ``generate`` call. When given,
+        the cells of all the translated columns of a chunk are pooled, their
+        segments sorted by token length and packed into batches of up to
+        ``max_tokens`` padded tokens, and the translations put back in their
+        row and column. Replaces ``batch_size``; not combined with
+        ``num_workers``. The padding efficiency achieved is logged per model.
+    metrics_path (str): Optional JSON lines file to which the stage timers
+        and counters of ``models.metrics`` are appended every
+        ``metrics_interval`` seconds and at the end of the run. The work done
+        inside ``num_workers`` processes is not included.
+    prometheus_path (str): Optional file rewritten with the same metrics in
+        the Prometheus text format.
+    metrics_interval (float): Seconds between two metrics reports.
 
     """
-    verificar_restricoes_csv(csv_path)
-    for modelname in models:
-        logger.info(f"Initializing {modelname} model ...")
-        model = select_model(modelname)
-        logger.info(f"Initializing {modelname} model ... done")
-        dataframe = pd.read_csv(csv_path)
-        dataframe = dataframe[:100]
-        for collum in collumns:
-            translations = []
-            for index, row in tqdm(
-                dataframe.iterrows(), desc=f"Translating {collum} with {modelname}"
-            ):
-                text = row[collum]
-                translated_text = model.translate_text(text)
-                translations.append(translated_text)
-            translated_collum_name = f"{collum} {modelname} translation"
-            dataframe.insert(
-                len(dataframe.columns), translated_collum_name, translations
+    if pipelined and (num_workers > 1 or dedup or concurrent_models):
+        raise ValueError(
+            "pipelined cannot be combined with num_workers, dedup or "
+            "concurrent_models"
+        )
+    if max_tokens and num_workers > 1:
+        raise ValueError("max_tokens cannot be combined with num_workers")
+    total_rows = None
+    if formato_arquivo(csv_path) == "csv":
+        total_rows = verificar_restricoes_csv(csv_path)["linhas"]
+        if max_rows is not None:
+            total_rows = min(total_rows, max_rows)
+    read_columns = (
+        None if keep_columns is None else list(dict.fromkeys(keep_columns + collumns))
+    )
+    journal_config = {
+        "csv_path": csv_path,
+        "collumns": collumns,
+        "chunk_size": chunk_size,
+        "output_format": output_format,
+        "keep_columns": keep_columns,
+    }
+    read_options = {
+        "chunk_size": chunk_size,
+        "read_columns": read_columns,
+        "max_rows": max_rows,
+        "total_rows": total_rows,
+        "resume": resume,
+    }
+    reporter = MetricsReporter(
+        metrics, metrics_path, prometheus_path, metrics_interval
+    ).start()
+    try:
+        # the pool shards the whole chunk across its workers
+        shard_size = chunk_size if num_workers > 1 else batch_size
+        cache = CacheTraducoes(cache_path) if cache_path else None
+
+        if concurrent_models:
+            translate_models_concurrently(
+                csv_path,
+                collumns,
+                models,
+                f"{filename}_translation.{output_format}",
+                output_format,
+                {**journal_config, "model": models},
+                read_options,
+                batch_size,
+                cache,
+                num_workers,
+                threads_per_worker,
+                dedup,
+                total_threads,
+                max_tokens,
+            )
+        else:
+            for modelname in models:
+                deduplicator = (
+                    Deduplicador(por_sentenca=dedup == "sentence") if dedup else None
+                )
+                model = open_model(
+                    modelname, num_workers, threads_per_worker, batch_size
+                )
+                # max_tokens is rejected above when there are worker processes
+                with configured(model, cache=cache, max_tokens=max_tokens):
+                    before = metrics.snapshot()["counters"]
+                    output_path = (
+                        f"{filename}_translation.{output_format}"
+                        if len(models) == 1
+                        else f"{filename}_{modelname}_translation.{output_format}"
+                    )
+                    if pipelined:
+                        pipeline = StagedPipeline(model, queue_size)
+                        translate_to_file(
+                            csv_path,
+                            output_path,
+                            output_format,
+                            {**journal_config, "model": modelname},
+                            lambda chunks: translate_chunks_pipelined(
+                                pipeline, modelname, chunks, collumns
+                            ),
+                            f"Translating with {modelname}",
+                            status=pipeline.queue_depths,
+                            **read_options,
+                        )
+                        pipeline.report()
+                    else:
+                        translate_to_file(
+                            csv_path,
+                            output_path,
+                            output_format,
+                            {**journal_config, "model": modelname},
+                            lambda chunks: translate_chunks_serially(
+                                model,
+                                modelname,
+                                chunks,
+                                collumns,
+                                shard_size,
+                                deduplicator,
+                            ),
+                            f"Translating with {modelname}",
+                            **read_options,
+                        )
+                    log_padding_efficiency(modelname, before)
+                if num_workers > 1:
+                    model.close()
+                if deduplicator is not None:
+                    deduplicator.relatorio()
+        if cache is not None:
+            cache.relatorio()
+            cache.fechar()
+    finally:
+        reporter.stop()
+
+
+@contextmanager
+def torch_threads(num_threads):
+    """
+    Size the torch thread pool for the enclosed block, then restore it.
+
+    Models that do not run on torch, e.g. API clients or registry plugins,
+    work without torch installed; the pool is then left alone.
+    """
+    try:
+        import torch
+    except ImportError:
+        yield
+        return
+    previous = torch.get_num_threads()
+    torch.set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+def translate_models_concurrently(
+    csv_path,
+    collumns,
+    models,
+    output_path,
+    output_format,
+    journal_config,
+    read_options,
+    batch_size,
+    cache,
+    num_workers=1,
+    threads_per_worker=None,
+    dedup=None,
+    total_threads=None,
+    max_tokens=None,
+):
+    """
+    Translate each chunk with several models at the same time.
+
+    The input is read once; each chunk is translated by one thread per model
+    and the translated columns are added in the order of ``models``. In a
+    single process the torch thread pool, when torch is installed, is sized
+    for the run so that all the models together use ``total_threads``, and
+    restored afterwards; with worker processes each model gets
+    ``num_workers`` processes sharing that budget.
+
+    Raises:
+    ValueError: If the models do not fit the registry memory budget
+        together, which would reload them on every chunk.
+
+    """
+    total_threads = total_threads or os.cpu_count() or 1
+    threads_per_model = max(1, total_threads // len(models))
+    if num_workers > 1:
+        threads_per_worker = threads_per_worker or max(
+            1, threads_per_model // num_workers
+        )
+    with ExitStack() as stack:
+        if num_workers == 1:
+            stack.enter_context(torch_threads(threads_per_model))
+        logger.info(
+            f"Running {', '.join(models)} concurrently with {threads_per_model} "
+            "threads each"
+        )
+
+        opened = {
+            modelname: open_model(
+                modelname, num_workers, threads_per_worker, batch_size
+            )
+            for modelname in models
+        }
+        if num_workers == 1 and not set(models) <= set(registry.loaded()):
+            raise ValueError(
+                f"Models {models} do not fit the model memory budget together; "
+                "raise MODEL_MEMORY_BUDGET_MB or translate them one at a time."
             )
-            # dataframe[translated_collum_name] = translations
-        dataframe.to_csv(f"{filename}_translation.csv")
-    logger.info(f"Saving file...")
+        deduplicators = {
+            modelname: Deduplicador(por_sentenca=dedup == "sentence") if dedup else None
+            for modelname in models
+        }
+        for model in opened.values():
+            stack.enter_context(configured(model, cache=cache, max_tokens=max_tokens))
+        before = metrics.snapshot()["counters"]
 
+        # the pool shards the whole chunk across its workers
+        shard_size = read_options["chunk_size"] if num_workers > 1 else batch_size
+
+        def translate_with(modelname, dataframe):
+            translated = dataframe[collumns].copy()
+            translate_dataframe(
+                opened[modelname],
+                modelname,
+                translated,
+                collumns,
+                shard_size,
+                deduplicators[modelname],
+            )
+            return translated.iloc[:, len(collumns) :]
+
+        with ThreadPoolExecutor(max_workers=len(models)) as executor:
+
+            def translate_chunks(chunks):
+                for dataframe in chunks:
+                    futures = [
+                        executor.submit(translate_with, modelname, dataframe)
+                        for modelname in models
+                    ]
+                    for future in futures:
+                        for collum, translations in future.result().items():
+                            dataframe.insert(
+                                len(dataframe.columns), collum, translations
+                            )
+                    yield dataframe
+
+            translate_to_file(
+                csv_path,
+                output_path,
+                output_format,
+                journal_config,
+                translate_chunks,
+                f"Translating with {', '.join(models)}",
+                **read_options,
+            )
+
+        log_padding_efficiency(", ".join(models), before)
+    for modelname, model in opened.items():
+        if num_workers > 1:
+            model.close()
+        if deduplicators[modelname] is not None:
+            deduplicators[modelname].relatorio()
+
+
+def translate_webdataset(
+    url,
+    models: List[str],
+    fields=("txt",),
+    output_dir="data/processed/webdataset",
+    batch_size: int = 16,
+    num_workers: int = 1,
+    threads_per_worker=None,
+    resume: bool = False,
+):
+    """
+    Translate the text fields of a WebDataset corpus stored as tar shards.
+
+    Shards are streamed without extracting them. Each translated shard keeps
+    the original fields and adds a "<model>.<field>" field per translated
+    field, and is written to "<output_dir>/<model>/<shard name>".
+
+    Args:
+    url (str): Local shard pattern, e.g. "data/raw/shard-{000000..000999}.tar"
+        or a glob such as "data/raw/*.tar".
+    models (list): List of model names.
+    fields (list): Extensions of the text fields to be translated.
+    output_dir (str): Directory of the translated shards.
+    batch_size (int): Number of samples translated together.
+    num_workers (int): Number of shards translated in parallel, each in its
+        own process with its own copy of the model.
+    threads_per_worker (int): Torch threads used by each worker process.
+    resume (bool): Skip the shards whose output already exists. Outputs are
+        written atomically, so an existing shard is always complete.
+
+    """
+    shards = expandir_shards(url)
+    logger.info(f"Found {len(shards)} shards")
+    for modelname in models:
+        model_dir = os.path.join(output_dir, modelname)
+        os.makedirs(model_dir, exist_ok=True)
+        pending = []
+        for shard in shards:
+            output_path = os.path.join(model_dir, os.path.basename(shard))
+            if resume and os.path.exists(output_path):
+                continue
+            pending.append((shard, output_path))
+        logger.info(f"Translating {len(pending)} shards with {modelname}")
 
-def translate_webdataset(url, models: List[str]):
-    pass
+        if num_workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(
+                    registry.factory(modelname),
+                    threads_per_worker or default_threads(num_workers),
+                ),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        traduzir_shard_no_worker,
+                        shard,
+                        output_path,
+                        modelname,
+                        list(fields),
+                        batch_size,
+                    )
+                    for shard, output_path in pending
+                ]
+                for future in tqdm(
+                    as_completed(futures), total=len(futures), unit="shards"
+                ):
+                    future.result()
+        else:
+            model = select_model(modelname)
+            for shard, output_path in tqdm(pending, unit="shards"):
+                traduzir_shard(
+                    shard,
+                    output_path,
+                    model.translate_batch,
+                    modelname,
+                    list(fields),
+                    batch_size,
+                )
 
 
 if __name__ == "__main__":
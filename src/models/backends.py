@@ -0,0 +1,87 @@
+"""Inference backends module.
+
+The wrappers can run the same checkpoint with different CPU backends:
+
+- ``eager``: full precision PyTorch.
+- ``int8``: PyTorch with the linear layers dynamically quantized to int8.
+- ``onnx``: the model exported to ONNX and run with ONNX Runtime.
+
+``compare_backends`` checks the output of a backend against the fp32 one.
+"""
+
+import difflib
+import logging
+import os
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("eager", "int8", "onnx")
+
+
+def load_backend(model, checkpoint: str, backend: str, onnx_dir: Optional[str] = None):
+    """
+    Convert a loaded fp32 model to the requested backend.
+
+    Args:
+        model: The fp32 PyTorch model.
+        checkpoint (str): The Hugging Face checkpoint of the model.
+        backend (str): One of ``BACKENDS``.
+        onnx_dir (str, optional): Directory where the exported ONNX graph is
+            saved and reused on the next loads.
+
+    Returns:
+        The model to be used for generation.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Use one of {BACKENDS}.")
+    if backend == "eager":
+        return model
+    if backend == "int8":
+        import torch
+
+        return torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    if onnx_dir and os.path.exists(onnx_dir):
+        return ORTModelForSeq2SeqLM.from_pretrained(onnx_dir)
+    logger.info("Exporting %s to ONNX ...", checkpoint)
+    onnx_model = ORTModelForSeq2SeqLM.from_pretrained(checkpoint, export=True)
+    if onnx_dir:
+        onnx_model.save_pretrained(onnx_dir)
+    return onnx_model
+
+
+def compare_backends(reference, candidate, sentences: List[str]) -> dict:
+    """
+    Compare the translations of two wrappers of the same model.
+
+    Args:
+        reference: The wrapper running the fp32 ``eager`` backend.
+        candidate: The wrapper running the backend under test.
+        sentences (List[str]): The sentences to be translated.
+
+    Returns:
+        dict: The fraction of identical translations (``exact_match``), the
+        mean character similarity (``similarity``) and the differing pairs.
+    """
+    expected = reference.translate_batch(sentences)
+    actual = candidate.translate_batch(sentences)
+    similarities = [
+        difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(expected, actual)
+    ]
+    return {
+        "exact_match": sum(a == b for a, b in zip(expected, actual)) / len(sentences),
+        "similarity": sum(similarities) / len(sentences),
+        "differences": [
+            {"source": s, "reference": a, "candidate": b}
+            for s, a, b in zip(sentences, expected, actual)
+            if a != b
+        ],
+    }
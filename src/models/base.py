@@ -0,0 +1,447 @@
+"""Base module for the seq2seq translation models."""
+
+import logging
+import math
+import threading
+from contextlib import nullcontext
+from functools import cached_property
+from typing import Iterator, List, Optional, Tuple
+
+from models.backends import load_backend
+from models.chunking import chunk_text
+from models.config import load_model_config
+from models.metrics import metrics
+from models.scheduling import pack_batches
+
+logger = logging.getLogger(__name__)
+
+#: Defaults of the generation profile, overridden by the ``generation``
+#: section of ``config/model/<name>.yaml``.
+GENERATION_DEFAULTS = {
+    "num_beams": 1,
+    "length_penalty": 1.0,
+    "no_repeat_ngram_size": 0,
+    # initial target/source token ratio, refined from the decoded outputs
+    "length_ratio": 1.5,
+    # weight of each batch in the moving average of the ratio
+    "ratio_momentum": 0.05,
+    # max_new_tokens = source tokens * ratio * length_headroom + length_margin
+    "length_headroom": 1.5,
+    "length_margin": 10,
+    # hard limit of max_new_tokens, whatever the source length
+    "max_new_tokens": 512,
+}
+
+
+class Seq2SeqModel:
+    """
+    Base class for the Hugging Face seq2seq translation models.
+
+    Subclasses load ``self.tokenizer`` and ``self.model`` in ``__init__`` and
+    customize the input text and the ``generate`` arguments through
+    ``prepare_inputs`` and ``generation_kwargs``. Beams, length penalty,
+    no-repeat n-grams and length limits come from the generation profile.
+
+    Long inputs are split at sentence boundaries into chunks that fit the
+    model token budget, translated together and joined back. When ``cache``
+    is set, texts already translated by the same checkpoint and generation
+    settings are read from it instead of calling ``generate``.
+
+    The number of new tokens of a batch is derived from its longest source
+    with a target/source ratio learned from the outputs, so a runaway decode
+    stops soon after the expected length. A translation that stopped at the
+    limit instead of at the end-of-sentence token is reported as hitting the
+    cap by ``translate_batch_with_flags``.
+    """
+
+    #: Name of the model in the registry and in ``config/model``.
+    name = None
+    #: Hugging Face checkpoint loaded by the subclass.
+    checkpoint = None
+    #: Extra arguments passed to the tokenizer ``from_pretrained``.
+    tokenizer_kwargs = {}
+    #: Inference backend, see ``models.backends``.
+    backend = "eager"
+    #: Optional ``utilities.cache.CacheTraducoes`` consulted before generating.
+    cache = None
+
+    #: Maximum number of chunks sent to a single ``generate`` call.
+    chunk_batch_size = 32
+    #: Token budget of a ``generate`` call. When set, chunks are sorted by
+    #: token length and packed up to it (see ``models.scheduling``) instead
+    #: of being grouped ``chunk_batch_size`` at a time.
+    max_tokens = None
+    #: Learned target/source token ratio, see ``length_ratio``.
+    _length_ratio = None
+
+    @classmethod
+    def from_components(cls, model, tokenizer, backend="eager"):
+        """
+        Build the wrapper around an already loaded model and tokenizer.
+
+        Args:
+            model: The seq2seq model, e.g. a small randomly initialized one.
+            tokenizer: The tokenizer of the checkpoint.
+            backend (str, optional): The inference backend. Default is "eager".
+        """
+        wrapper = cls.__new__(cls)
+        wrapper.model = model
+        wrapper.tokenizer = tokenizer
+        wrapper.set_backend(backend)
+        return wrapper
+
+    def set_backend(self, backend=None) -> None:
+        """
+        Convert the loaded fp32 model to another inference backend.
+
+        Args:
+            backend (str, optional): "eager", "int8" or "onnx". Defaults to the
+                ``backend`` key of ``config/model/<name>.yaml``.
+        """
+        config = load_model_config(self.name)
+        self.backend = backend or config.get("backend", "eager")
+        self.model = load_backend(
+            self.model, self.checkpoint, self.backend, config.get("onnx_dir")
+        )
+
+    @cached_property
+    def generation_profile(self) -> dict:
+        """Generation settings of ``config/model/<name>.yaml`` over the defaults."""
+        return {
+            **GENERATION_DEFAULTS,
+            **(load_model_config(self.name).get("generation") or {}),
+        }
+
+    @property
+    def length_ratio(self) -> float:
+        """Target/source token ratio learned from the outputs so far."""
+        return self._length_ratio or self.generation_profile["length_ratio"]
+
+    def cache_settings(self) -> dict:
+        """Return the settings that change the output, used in the cache key."""
+        return {
+            **self.generation_kwargs(),
+            "generation": self.generation_profile,
+            "backend": self.backend,
+        }
+
+    def prepare_inputs(self, sentences: List[str]) -> List[str]:
+        """Apply model specific changes (prefixes, language tags) to the input."""
+        return list(sentences)
+
+    def generation_kwargs(self) -> dict:
+        """Extra keyword arguments passed to ``model.generate``."""
+        return {}
+
+    def count_tokens(self, sentences: List[str]) -> List[int]:
+        """Count the tokens of each sentence, without special tokens."""
+        encoded = self.tokenizer(list(sentences), add_special_tokens=False)
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    @cached_property
+    def chunk_budget(self) -> int:
+        """Maximum number of source tokens of a chunk."""
+        overhead = len(self.tokenizer(self.prepare_inputs([""])[0])["input_ids"])
+        input_limit = min(
+            self.tokenizer.model_max_length,
+            getattr(self.model.config, "max_position_embeddings", None)
+            or self.tokenizer.model_max_length,
+        )
+        profile = self.generation_profile
+        # a chunk of this size stays within max_new_tokens at the initial ratio
+        output_budget = (profile["max_new_tokens"] - profile["length_margin"]) / (
+            profile["length_ratio"] * profile["length_headroom"]
+        )
+        return max(1, min(input_limit - overhead, int(output_budget)))
+
+    def max_new_tokens(self, source_tokens: int) -> int:
+        """Return the generation limit for a source of ``source_tokens`` tokens."""
+        profile = self.generation_profile
+        limit = (
+            math.ceil(source_tokens * self.length_ratio * profile["length_headroom"])
+            + profile["length_margin"]
+        )
+        return max(1, min(profile["max_new_tokens"], limit))
+
+    def output_lengths(self, output_sequences) -> Tuple[List[int], List[bool]]:
+        """
+        Measure generated sequences.
+
+        Args:
+            output_sequences: The token ids returned by ``generate``.
+
+        Returns:
+            Tuple[List[int], List[bool]]: The number of generated tokens of
+            each sequence and whether it hit the cap, i.e. ended without the
+            end-of-sentence token.
+        """
+        eos = self.tokenizer.eos_token_id
+        lengths, hit_cap = [], []
+        for sequence in output_sequences.tolist():
+            generated = sequence[1:]  # without the decoder start token
+            if eos in generated:
+                lengths.append(generated.index(eos) + 1)
+                hit_cap.append(False)
+            else:
+                lengths.append(len(generated))
+                hit_cap.append(True)
+        return lengths, hit_cap
+
+    def update_length_ratio(self, source_lengths, output_lengths, hit_cap) -> None:
+        """Move the learned ratio towards the ratio of a finished batch."""
+        finished = [
+            (source, output)
+            for source, output, capped in zip(source_lengths, output_lengths, hit_cap)
+            if not capped and source
+        ]
+        if not finished:
+            return
+        ratio = sum(output for _, output in finished) / sum(
+            source for source, _ in finished
+        )
+        momentum = self.generation_profile["ratio_momentum"]
+        self._length_ratio = (1 - momentum) * self.length_ratio + momentum * ratio
+
+    def source_lengths(self, sentences: List[str]) -> List[int]:
+        """Count the encoder tokens of each sentence, with the special tokens."""
+        encoded = self.tokenizer(self.prepare_inputs(sentences))
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    def schedule(self, chunks: List[str]) -> List[List[int]]:
+        """
+        Group chunks into ``generate`` batches.
+
+        Args:
+            chunks (List[str]): The chunks to be translated.
+
+        Returns:
+            List[List[int]]: The chunk indexes of each batch. Chunks of
+            similar length are batched together so little padding is needed.
+        """
+        if self.max_tokens:
+            return pack_batches(self.source_lengths(chunks), self.max_tokens)
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+        return [
+            order[start : start + self.chunk_batch_size]
+            for start in range(0, len(order), self.chunk_batch_size)
+        ]
+
+    def encode(self, sentences: List[str]):
+        """Tokenize a batch of sentences, padding to the longest one."""
+        with metrics.timer("tokenize"):
+            return self.tokenizer(
+                self.prepare_inputs(sentences),
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+            )
+
+    def generate(self, inputs, **kwargs):
+        """
+        Run ``model.generate`` over an encoded batch.
+
+        ``max_new_tokens`` is derived from the longest source of the batch,
+        and the learned length ratio is updated from the outputs.
+        """
+        profile = self.generation_profile
+        source_lengths = inputs["attention_mask"].sum(dim=1).tolist()
+        settings = {
+            "num_beams": profile["num_beams"],
+            "no_repeat_ngram_size": profile["no_repeat_ngram_size"],
+            "max_new_tokens": self.max_new_tokens(max(source_lengths, default=0)),
+        }
+        if profile["num_beams"] > 1:
+            # only used by beam search; transformers warns about it otherwise
+            settings["length_penalty"] = profile["length_penalty"]
+        with metrics.timer("generate"):
+            outputs = self.model.generate(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                # decoding without sampling and with an attention mask gives
+                # the same output for a sentence whether it is translated
+                # alone or in a batch, as long as it does not hit the cap
+                do_sample=False,
+                **{**settings, **self.generation_kwargs(), **kwargs},
+            )
+        output_lengths, hit_cap = self.output_lengths(outputs)
+        self.update_length_ratio(source_lengths, output_lengths, hit_cap)
+        metrics.increment("tokens_in", sum(source_lengths))
+        metrics.increment(
+            "padded_tokens", len(source_lengths) * max(source_lengths, default=0)
+        )
+        metrics.increment("tokens_out", sum(output_lengths))
+        metrics.increment("hit_cap", sum(hit_cap))
+        return outputs
+
+    def decode(self, output_sequences) -> List[str]:
+        """Decode the generated token ids back to text."""
+        with metrics.timer("decode"):
+            return self.tokenizer.batch_decode(
+                output_sequences, skip_special_tokens=True
+            )
+
+    def translate_chunks(self, chunks: List[str]) -> List[str]:
+        """
+        Translate chunks that already fit the token budget.
+
+        Args:
+            chunks (List[str]): The chunks to be translated.
+
+        Returns:
+            List[str]: The translations, in the same order as the input.
+        """
+        return self._translate_chunks(chunks)[0]
+
+    def _translate_chunks(self, chunks: List[str]) -> Tuple[List[str], List[bool]]:
+        """Translate chunks, also returning whether each one hit the cap."""
+        translations = [None] * len(chunks)
+        hit_cap = [False] * len(chunks)
+        for indexes in self.schedule(chunks):
+            outputs = self.generate(self.encode([chunks[i] for i in indexes]))
+            _, capped = self.output_lengths(outputs)
+            for i, translation, chunk_capped in zip(
+                indexes, self.decode(outputs), capped
+            ):
+                translations[i] = translation
+                hit_cap[i] = chunk_capped
+        return translations, hit_cap
+
+    def translate_batch(self, sentences: List[str]) -> List[str]:
+        """
+        Translate a list of texts of any length.
+
+        Args:
+            sentences (List[str]): The texts to be translated.
+
+        Returns:
+            List[str]: The translations, in the same order as the input.
+        """
+        return self.translate_batch_with_flags(sentences)[0]
+
+    def translate_batch_with_flags(
+        self, sentences: List[str]
+    ) -> Tuple[List[str], List[bool]]:
+        """
+        Translate a list of texts, reporting the ones that hit the cap.
+
+        Args:
+            sentences (List[str]): The texts to be translated.
+
+        Returns:
+            Tuple[List[str], List[bool]]: The translations and, for each
+            text, whether the decoding of any of its chunks stopped at
+            ``max_new_tokens``. Texts read from the cache are reported as
+            False.
+        """
+        if self.cache is None:
+            return self._translate_batch(sentences)
+
+        hits, misses = self.cache.acertos, self.cache.falhas
+        result = self.cache.traduzir_com_sinais(
+            self.checkpoint, self.cache_settings(), sentences, self._translate_batch
+        )
+        metrics.increment("cache_hits", self.cache.acertos - hits)
+        metrics.increment("cache_misses", self.cache.falhas - misses)
+        return result
+
+    def _translate_batch(self, sentences: List[str]) -> Tuple[List[str], List[bool]]:
+        """Chunk, translate and join the texts, without the cache."""
+        chunks, owners = [], []
+        for index, sentence in enumerate(sentences):
+            for chunk in chunk_text(sentence, self.count_tokens, self.chunk_budget):
+                chunks.append(chunk)
+                owners.append(index)
+
+        parts = [[] for _ in sentences]
+        hit_cap = [False] * len(sentences)
+        for owner, translation, capped in zip(owners, *self._translate_chunks(chunks)):
+            parts[owner].append(translation)
+            hit_cap[owner] = hit_cap[owner] or capped
+        return [" ".join(part) for part in parts], hit_cap
+
+    def translate_text(self, sentence: str) -> str:
+        """Translate a single sentence."""
+        return self.translate_batch([sentence])[0]
+
+    def translate_stream(
+        self,
+        text: str,
+        stop: Optional[threading.Event] = None,
+        lock: Optional[threading.Lock] = None,
+    ) -> Iterator[str]:
+        """
+        Translate a text of any length, yielding the translation as decoded.
+
+        The text is chunked like in ``translate_batch`` and the chunks are
+        translated one after the other, so the first tokens arrive after a
+        single chunk has started decoding, whatever the length of the text.
+
+        Closing the generator early (e.g. when the client disconnects) stops
+        the decoding at the next token and waits for the generation thread
+        to finish before returning.
+
+        Args:
+            text (str): The text to be translated.
+            stop (threading.Event, optional): Stops the decoding when set;
+                the generator sets it when closed early.
+            lock (threading.Lock, optional): Held while the tokenizer and
+                ``generate`` run, e.g. the lock of the ``MicroBatcher``
+                serving the same model instance.
+
+        Yields:
+            str: Consecutive pieces of the translation.
+        """
+        import torch
+        from transformers import (
+            StoppingCriteria,
+            StoppingCriteriaList,
+            TextIteratorStreamer,
+        )
+
+        stop = stop or threading.Event()
+        lock = lock or nullcontext()
+
+        class Stopped(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full(
+                    (input_ids.shape[0],), stop.is_set(), device=input_ids.device
+                )
+
+        with lock:
+            chunks = chunk_text(text, self.count_tokens, self.chunk_budget)
+        for position, chunk in enumerate(chunks):
+            if stop.is_set():
+                return
+            if position:
+                yield " "
+            streamer = TextIteratorStreamer(
+                self.tokenizer, skip_prompt=True, skip_special_tokens=True
+            )
+            errors = []
+
+            def run(chunk=chunk, streamer=streamer, errors=errors):
+                try:
+                    with lock:
+                        self.generate(
+                            self.encode([chunk]),
+                            streamer=streamer,
+                            stopping_criteria=StoppingCriteriaList([Stopped()]),
+                        )
+                except Exception as error:
+                    errors.append(error)
+                    streamer.end()
+
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            try:
+                for piece in streamer:
+                    if piece:
+                        yield piece
+            except BaseException:
+                # closed by the consumer: stop decoding the rest of the chunk
+                stop.set()
+                raise
+            finally:
+                thread.join()
+            if errors:
+                raise errors[0]
@@ -0,0 +1,162 @@
+"""Dynamic micro-batching module.
+
+Concurrent translation requests are queued and coalesced into batched
+``translate_batch`` calls: the first waiting request opens a batch, which
+is sent once it holds ``max_batch_size`` sentences or ``max_wait_ms`` have
+passed. Generation runs in a single background thread per model, so the
+event loop keeps accepting requests while a batch is being translated.
+Each batch holds the ``lock`` of the batcher, which other users of the same
+model instance (e.g. streaming) take to avoid running it concurrently.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a request arrives while the batcher queue is full."""
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests into batched translation calls."""
+
+    def __init__(
+        self,
+        translate_batch: Callable[[List[str]], List[str]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_queue_size: int = 256,
+    ) -> None:
+        """
+        Create the batcher; its loop starts with the first request.
+
+        Args:
+            translate_batch (Callable): Translates a list of sentences, e.g.
+                the ``translate_batch`` method of a model wrapper.
+            max_batch_size (int): Maximum number of sentences per call. A
+                single request larger than this is sent on its own.
+            max_wait_ms (float): Maximum time the first request of a batch
+                waits for other requests to join it.
+            max_queue_size (int): Maximum number of waiting requests; above
+                it ``translate`` raises ``QueueFullError``.
+        """
+        self.translate_batch = translate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.batches = 0
+        self.sentences = 0
+        #: Held while a batch is translated; share it with any other code
+        #: running the same model.
+        self.lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task: Optional[asyncio.Task] = None
+        self._pending = None
+
+    def start(self) -> None:
+        """Start the batching loop on the running event loop."""
+        if self._task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching loop and the generation thread."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown()
+
+    def queue_depth(self) -> int:
+        """Return the number of requests waiting to join a batch."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def translate(self, sentences: List[str]) -> List[str]:
+        """
+        Queue sentences and wait for their translations.
+
+        Args:
+            sentences (List[str]): The texts to be translated.
+
+        Returns:
+            List[str]: The translations, in the same order as the input.
+
+        Raises:
+            QueueFullError: If the queue already holds ``max_queue_size``
+                requests.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((sentences, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(
+                f"{self.max_queue_size} requests are already waiting"
+            ) from None
+        return await future
+
+    def _translate_locked(self, sentences: List[str]) -> List[str]:
+        """Translate a batch while holding the model lock."""
+        with self.lock:
+            return self.translate_batch(sentences)
+
+    async def _next_batch(self) -> list:
+        """Wait for a request, then gather more until the batch is full."""
+        first = self._pending or await self.queue.get()
+        self._pending = None
+        batch, size = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if size + len(request[0]) > self.max_batch_size:
+                # keep it for the next batch rather than exceeding the limit
+                self._pending = request
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    async def _run(self) -> None:
+        """Translate batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            batch = [(s, future) for s, future in batch if not future.cancelled()]
+            sentences = [sentence for request, _ in batch for sentence in request]
+            if not sentences:
+                for _, future in batch:
+                    future.set_result([])
+                continue
+            try:
+                translations = await loop.run_in_executor(
+                    self._executor, self._translate_locked, sentences
+                )
+            except Exception as error:
+                logger.exception("Batch of %s sentences failed", len(sentences))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batches += 1
+            self.sentences += len(sentences)
+            start = 0
+            for request, future in batch:
+                if not future.done():
+                    future.set_result(translations[start : start + len(request)])
+                start += len(request)
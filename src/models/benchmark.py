@@ -0,0 +1,333 @@
+r"""Offline translation benchmark module.
+
+Measures throughput and latency of the registered model wrappers across
+batch sizes and input lengths, and saves the results as JSON so runs can
+be compared for regressions.
+
+With ``--tiny`` the wrappers run small randomly initialized models built
+from the real checkpoint configs, so the benchmark runs without
+downloading the weights (the configs and tokenizers must be in the local
+Hugging Face cache when ``--offline`` is used).
+
+Example:
+    $ python src/models/benchmark.py --tiny --offline --models marian nllb \
+        --output output/benchmark.json --compare output/baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+from models.registry import registry
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "the government said on monday that the new law would help families "
+    "pay for school meals while critics argued it was too little too late"
+).split()
+
+#: Config attributes shrunk to build the tiny models, with their new value.
+TINY_CONFIG = {
+    "d_model": 32,
+    "encoder_layers": 1,
+    "decoder_layers": 1,
+    "encoder_attention_heads": 2,
+    "decoder_attention_heads": 2,
+    "encoder_ffn_dim": 64,
+    "decoder_ffn_dim": 64,
+    "num_layers": 1,
+    "num_decoder_layers": 1,
+    "num_heads": 2,
+    "d_ff": 64,
+    "d_kv": 16,
+}
+
+
+def tiny_model(name: str, offline: bool = True):
+    """
+    Build a wrapper around a small randomly initialized model.
+
+    Args:
+        name (str): The model name in the registry.
+        offline (bool): Only use files from the local Hugging Face cache.
+
+    Returns:
+        The wrapper, using the real tokenizer and a shrunk model config.
+    """
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoTokenizer
+
+    wrapper_class = registry.factory(name)
+    config = AutoConfig.from_pretrained(
+        wrapper_class.checkpoint, local_files_only=offline
+    )
+    for attribute, value in TINY_CONFIG.items():
+        if hasattr(config, attribute):
+            setattr(config, attribute, value)
+    tokenizer = AutoTokenizer.from_pretrained(
+        wrapper_class.checkpoint,
+        local_files_only=offline,
+        **wrapper_class.tokenizer_kwargs,
+    )
+    model = AutoModelForSeq2SeqLM.from_config(config).eval()
+    return wrapper_class.from_components(model, tokenizer)
+
+
+def make_sentences(count: int, length: int, seed: int = 0) -> List[str]:
+    """
+    Build synthetic sentences with lengths spread around ``length`` words.
+
+    Args:
+        count (int): The number of sentences.
+        length (int): The mean sentence length, in words.
+        seed (int): The random seed.
+
+    Returns:
+        List[str]: The sentences.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(count):
+        words = rng.randint(max(1, length // 2), length + length // 2)
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(words)) + ".")
+    return sentences
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the peak resident set size of the process.
+
+    Only Linux allows it; elsewhere the peak is the one of the whole process.
+
+    Returns:
+        bool: Whether the peak was reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    """Read a memory field of ``/proc/self/status``, in MB."""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as status:
+            for line in status:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> Optional[float]:
+    """Return the current resident set size of the process, in MB (Linux only)."""
+    return _proc_status_mb("VmRSS")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the last ``reset_peak_rss``, in MB."""
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_model(
+    model, batch_size: int, input_length: int, num_batches: int = 5
+) -> dict:
+    """
+    Measure one model for one batch size and input length.
+
+    Args:
+        model: The model wrapper.
+        batch_size (int): Sentences per ``generate`` call.
+        input_length (int): Mean sentence length, in words.
+        num_batches (int): Number of timed batches, after one warm-up batch.
+
+    Returns:
+        dict: Throughput, latency, memory and padding measures. The memory
+        peak is the one of this combination where the OS can reset it
+        (Linux), and the one of the whole process elsewhere, in which case
+        ``peak_rss_delta_mb`` is None.
+    """
+    # the peak of the process only grows, so it is reset for each combination
+    peak_is_local = reset_peak_rss()
+    rss_before = rss_mb()
+    sentences = make_sentences(batch_size * (num_batches + 1), input_length)
+    batches = [
+        sentences[start : start + batch_size]
+        for start in range(0, len(sentences), batch_size)
+    ]
+    model.decode(model.generate(model.encode(batches[0])))
+
+    latencies, input_tokens, padded_tokens, output_tokens = [], 0, 0, 0
+    for batch in batches[1:]:
+        start = time.perf_counter()
+        inputs = model.encode(batch)
+        outputs = model.generate(inputs)
+        model.decode(outputs)
+        latencies.append(time.perf_counter() - start)
+
+        input_tokens += int(inputs["attention_mask"].sum())
+        padded_tokens += int(inputs["attention_mask"].numel())
+        pad_token_id = model.tokenizer.pad_token_id
+        output_tokens += int((outputs != pad_token_id).sum())
+
+    total_time = sum(latencies)
+    peak = peak_rss_mb()
+    return {
+        "batch_size": batch_size,
+        "input_length": input_length,
+        "sentences_per_s": batch_size * num_batches / total_time,
+        "tokens_per_s": output_tokens / total_time,
+        "latency_p50_s": statistics.median(latencies),
+        "latency_p95_s": percentile(latencies, 0.95),
+        "peak_rss_mb": peak,
+        # growth of the memory used while running this combination
+        "peak_rss_delta_mb": (
+            peak - rss_before if peak_is_local and rss_before is not None else None
+        ),
+        "padding_ratio": 1 - input_tokens / padded_tokens,
+    }
+
+
+def run_benchmark(
+    models: List[str],
+    batch_sizes: List[int],
+    input_lengths: List[int],
+    num_batches: int = 5,
+    tiny: bool = False,
+    offline: bool = False,
+) -> dict:
+    """
+    Benchmark every combination of model, batch size and input length.
+
+    Returns:
+        dict: The run metadata and one result per combination.
+    """
+    results = []
+    for name in models:
+        model = tiny_model(name, offline) if tiny else registry.get(name)
+        for batch_size in batch_sizes:
+            for input_length in input_lengths:
+                result = benchmark_model(model, batch_size, input_length, num_batches)
+                result["model"] = name
+                result["backend"] = model.backend
+                logger.info("%s", result)
+                results.append(result)
+    return {
+        "metadata": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "tiny": tiny,
+            "num_batches": num_batches,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """
+    Find the combinations whose throughput dropped compared to a baseline.
+
+    Args:
+        baseline (dict): A previous ``run_benchmark`` output.
+        current (dict): The new ``run_benchmark`` output.
+        tolerance (float): Allowed relative drop in sentences per second.
+
+    Returns:
+        list: One entry per regression, with the old and new throughput.
+    """
+
+    def key(result):
+        return (
+            result["model"],
+            result["backend"],
+            result["batch_size"],
+            result["input_length"],
+        )
+
+    previous = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if old and result["sentences_per_s"] < old["sentences_per_s"] * (1 - tolerance):
+            regressions.append(
+                {
+                    "model": result["model"],
+                    "backend": result["backend"],
+                    "batch_size": result["batch_size"],
+                    "input_length": result["input_length"],
+                    "baseline_sentences_per_s": old["sentences_per_s"],
+                    "sentences_per_s": result["sentences_per_s"],
+                }
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns 1 when a regression is found."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=None)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--input-lengths", nargs="+", type=int, default=[16, 64, 256])
+    parser.add_argument("--num-batches", type=int, default=5)
+    parser.add_argument("--tiny", action="store_true")
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--output", default="output/benchmark.json")
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+
+    report = run_benchmark(
+        args.models or registry.names(),
+        args.batch_sizes,
+        args.input_lengths,
+        args.num_batches,
+        args.tiny,
+        args.offline,
+    )
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    logger.info("Saved %s", args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as baseline_file:
+            regressions = compare_results(
+                json.load(baseline_file), report, args.tolerance
+            )
+        for regression in regressions:
+            logger.warning("Regression: %s", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Sentence aware chunking of long texts to fit a model token budget."""
+
+import math
+import re
+from typing import Callable, List
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split a text at sentence boundaries.
+
+    Args:
+        text (str): The text to be split.
+
+    Returns:
+        List[str]: The sentences, without the surrounding whitespace.
+    """
+    return [sentence for sentence in SENTENCE_END.split(text.strip()) if sentence]
+
+
+def _split_long_sentence(sentence: str, length: int, max_tokens: int):
+    """Split a sentence above the budget into word groups of similar size."""
+    words = sentence.split()
+    num_parts = min(len(words), math.ceil(length / max_tokens))
+    part_size = math.ceil(len(words) / num_parts)
+    for start in range(0, len(words), part_size):
+        part = words[start : start + part_size]
+        yield " ".join(part), math.ceil(length * len(part) / len(words))
+
+
+def chunk_text(
+    text: str, count_tokens: Callable[[List[str]], List[int]], max_tokens: int
+) -> List[str]:
+    """
+    Group the sentences of a text into chunks of at most ``max_tokens`` tokens.
+
+    Sentences are never broken unless a single sentence is longer than the
+    budget, in which case it is split between words.
+
+    Args:
+        text (str): The text to be chunked.
+        count_tokens (Callable): Returns the token count of each given text.
+        max_tokens (int): The token budget of each chunk.
+
+    Returns:
+        List[str]: The chunks, in the original order.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return [text]
+
+    pieces = []
+    for sentence, length in zip(sentences, count_tokens(sentences)):
+        if length > max_tokens:
+            pieces.extend(_split_long_sentence(sentence, length, max_tokens))
+        else:
+            pieces.append((sentence, length))
+
+    chunks = []
+    current, current_length = [], 0
+    for piece, length in pieces:
+        if current and current_length + length > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_length = [], 0
+        current.append(piece)
+        current_length += length
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
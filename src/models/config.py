@@ -0,0 +1,34 @@
+"""Model configuration module.
+
+Reads the per-model settings from ``config/model/<name>.yaml``.
+"""
+
+import os
+from typing import Optional
+
+CONFIG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "config",
+    "model",
+)
+
+
+def load_model_config(name: str, config_dir: Optional[str] = None) -> dict:
+    """
+    Load the configuration of a model.
+
+    Args:
+        name (str): The model name, e.g. "marian".
+        config_dir (str, optional): Directory with the model YAML files.
+            Defaults to the repository ``config/model`` directory.
+
+    Returns:
+        dict: The configuration, or an empty dict if the model has no file.
+    """
+    import yaml
+
+    path = os.path.join(config_dir or CONFIG_DIR, f"{name}.yaml")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as config_file:
+        return yaml.safe_load(config_file) or {}
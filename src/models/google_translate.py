@@ -1,8 +1,6 @@
 """Módulo do Google Translate."""
 
-import os
-
-from google.cloud import translate_v2 as translate
+from utilities.google_client import obter_cliente
 
 
 def traduzir_texto(texto, idioma_destino, caminho_chave_api):
@@ -18,7 +16,4 @@ def traduzir_texto(texto, idioma_destino, caminho_chave_api):
     Returns:
         str: O texto traduzido.
     """
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = caminho_chave_api
-    client = translate.Client()
-    traducao = client.translate(texto, target_language=idioma_destino)
-    return traducao["translatedText"]
+    return obter_cliente(caminho_chave_api).traduzir([texto], idioma_destino)[0]
@@ -4,34 +4,25 @@
 
 from transformers import MarianMTModel, MarianTokenizer
 
+from models.base import Seq2SeqModel
+from models.registry import register_model
+
 logger = logging.getLogger(__name__)
 
 
-class MarianModel:
+@register_model("marian")
+class MarianModel(Seq2SeqModel):
     """Marian Model Class."""
 
-    def __init__(self) -> None:
+    name = "marian"
+    checkpoint = "Helsinki-NLP/opus-mt-en-ROMANCE"
+
+    def __init__(self, backend=None) -> None:
         """Init function."""
-        model_name = "Helsinki-NLP/opus-mt-en-ROMANCE"
-        self.tokenizer = MarianTokenizer.from_pretrained(model_name)
-        self.model = MarianMTModel.from_pretrained(model_name)
-
-    def translate_text(self, sentence):
-        """Translate text."""
-        inputs = self.tokenizer(
-            ">>pt<<" + sentence if len(sentence) < 512 else ">>pt<<" + sentence[:512],
-            return_tensors="pt",
-            padding=True,
-        )
-
-        output_sequences = self.model.generate(
-            input_ids=inputs["input_ids"],
-            attention_mask=inputs["attention_mask"],
-            do_sample=False,  # test if batching affects output,
-            max_length=1024,
-        )
-        sentence_decoded = self.tokenizer.batch_decode(
-            output_sequences, skip_special_tokens=True
-        )
-
-        return sentence_decoded[0]
+        self.tokenizer = MarianTokenizer.from_pretrained(self.checkpoint)
+        self.model = MarianMTModel.from_pretrained(self.checkpoint)
+        self.set_backend(backend)
+
+    def prepare_inputs(self, sentences):
+        """Add the target language tag."""
+        return [">>pt<<" + sentence for sentence in sentences]
@@ -2,33 +2,26 @@
 
 from transformers import MBart50TokenizerFast, MBartForConditionalGeneration
 
+from models.base import Seq2SeqModel
+from models.registry import register_model
 
-class MbartModel:
+
+@register_model("mbart")
+class MbartModel(Seq2SeqModel):
     """MBART model class."""
 
-    def __init__(self) -> None:
+    name = "mbart"
+    checkpoint = "Narrativa/mbart-large-50-finetuned-opus-en-pt-translation"
+    tokenizer_kwargs = {"src_lang": "en_XX"}
+
+    def __init__(self, backend=None) -> None:
         """Init function."""
         self.tokenizer = MBart50TokenizerFast.from_pretrained(
-            "Narrativa/mbart-large-50-finetuned-opus-en-pt-translation"
-        )
-        self.model = MBartForConditionalGeneration.from_pretrained(
-            "Narrativa/mbart-large-50-finetuned-opus-en-pt-translation"
-        )
-
-    def translate_text(self, sentence):
-        """Translate text."""
-        self.tokenizer.src_lang = "en_XX"
-
-        inputs = self.tokenizer(sentence, return_tensors="pt", padding=True)
-
-        output_sequences = self.model.generate(
-            input_ids=inputs["input_ids"],
-            attention_mask=inputs["attention_mask"],
-            do_sample=False,  # test if batching affects output
-            forced_bos_token_id=self.tokenizer.lang_code_to_id["pt_XX"],
+            self.checkpoint, **self.tokenizer_kwargs
         )
+        self.model = MBartForConditionalGeneration.from_pretrained(self.checkpoint)
+        self.set_backend(backend)
 
-        sentence_decoded = self.tokenizer.batch_decode(
-            output_sequences, skip_special_tokens=True
-        )
-        return sentence_decoded
+    def generation_kwargs(self):
+        """Return the generation arguments."""
+        return {"forced_bos_token_id": self.tokenizer.lang_code_to_id["pt_XX"]}
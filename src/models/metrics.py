@@ -0,0 +1,235 @@
+"""Translation metrics module.
+
+Collects per-stage timers (read, tokenize, generate, decode, write) and
+counters (rows, tokens in and out, padding, cache hits) from the hot path
+of a translation run, plus the peak resident set size of the process.
+
+The process-wide ``metrics`` instance is updated by the model wrappers,
+the staged pipeline and ``translate_to_file``. A ``MetricsReporter``
+periodically appends its snapshot as a JSON line and rewrites a Prometheus
+text exposition file; the HTTP service exposes the same text on
+``/metrics``.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+#: Stages timed on the hot path, in processing order.
+STAGES = ("read", "tokenize", "generate", "decode", "write")
+#: Counters, with their Prometheus help text.
+COUNTERS = {
+    "rows": "Rows written",
+    "tokens_in": "Source tokens sent to generate, without padding",
+    "tokens_out": "Tokens generated",
+    "padded_tokens": "Source token slots sent to generate, with padding",
+    "cache_hits": "Texts read from the translation cache",
+    "cache_misses": "Texts not found in the translation cache",
+    "hit_cap": "Generated sequences that stopped at max_new_tokens",
+}
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the process, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Metrics:
+    """Thread-safe stage timers and counters."""
+
+    def __init__(self) -> None:
+        """Init function."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all timers and counters."""
+        with self._lock:
+            self.started = time.time()
+            self.seconds = dict.fromkeys(STAGES, 0.0)
+            self.calls = dict.fromkeys(STAGES, 0)
+            self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Add the duration of one call of a stage."""
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one call of ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str, iterable: Iterable) -> Iterator:
+        """Yield the items of ``iterable``, timing each ``next`` as ``stage``."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            item = next(iterator, _END)
+            self.add_time(stage, time.perf_counter() - start)
+            if item is _END:
+                return
+            yield item
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Add ``value`` to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> dict:
+        """
+        Return the current values.
+
+        Returns:
+            dict: "time" and "elapsed_s", "stages" (seconds and calls of each
+            stage), "counters", "padding_ratio" (share of the source token
+            slots that were padding) and "peak_rss_bytes".
+        """
+        with self._lock:
+            stages = {
+                stage: {"seconds": self.seconds[stage], "calls": self.calls[stage]}
+                for stage in self.seconds
+            }
+            counters = dict(self.counters)
+        padded = counters["padded_tokens"]
+        now = time.time()
+        return {
+            "time": now,
+            "elapsed_s": now - self.started,
+            "stages": stages,
+            "counters": counters,
+            "padding_ratio": (
+                (padded - counters["tokens_in"]) / padded if padded else 0.0
+            ),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+    def to_prometheus(self, prefix: str = "translation") -> str:
+        """Render the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Time spent in each stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for stage, values in snapshot["stages"].items():
+            lines.append(
+                f'{prefix}_stage_seconds_total{{stage="{stage}"}} {values["seconds"]}'
+            )
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Calls of each stage.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        for stage, values in snapshot["stages"].items():
+            lines.append(
+                f'{prefix}_stage_calls_total{{stage="{stage}"}} {values["calls"]}'
+            )
+        for name, value in snapshot["counters"].items():
+            lines += [
+                f"# HELP {prefix}_{name}_total {COUNTERS.get(name, name)}.",
+                f"# TYPE {prefix}_{name}_total counter",
+                f"{prefix}_{name}_total {value}",
+            ]
+        lines += [
+            f"# HELP {prefix}_padding_ratio Share of source token slots that "
+            "were padding.",
+            f"# TYPE {prefix}_padding_ratio gauge",
+            f"{prefix}_padding_ratio {snapshot['padding_ratio']}",
+            f"# HELP {prefix}_peak_rss_bytes Peak resident set size.",
+            f"# TYPE {prefix}_peak_rss_bytes gauge",
+            f"{prefix}_peak_rss_bytes {snapshot['peak_rss_bytes']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsReporter:
+    """Periodically export a ``Metrics`` snapshot to files."""
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        jsonl_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        interval: float = 10.0,
+    ) -> None:
+        """
+        Create the reporter; ``start`` launches its thread.
+
+        Args:
+            metrics (Metrics): The metrics to export.
+            jsonl_path (str, optional): File to which a JSON line is appended
+                at each report.
+            prometheus_path (str, optional): File rewritten at each report
+                with the Prometheus text format, e.g. for the node exporter
+                textfile collector.
+            interval (float): Seconds between two reports.
+        """
+        self.metrics = metrics
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def report(self) -> None:
+        """Write the current snapshot to the configured files."""
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as jsonl_file:
+                jsonl_file.write(json.dumps(self.metrics.snapshot()) + "\n")
+        if self.prometheus_path:
+            temporary = self.prometheus_path + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as prometheus_file:
+                prometheus_file.write(self.metrics.to_prometheus())
+            os.replace(temporary, self.prometheus_path)
+
+    def _run(self) -> None:
+        """Report every ``interval`` seconds until stopped."""
+        while not self._stop.wait(self.interval):
+            try:
+                self.report()
+            except OSError:
+                logger.exception("Could not write the metrics")
+
+    def start(self) -> "MetricsReporter":
+        """Start reporting in a background thread."""
+        if self._thread is None and (self.jsonl_path or self.prometheus_path):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and write a final report."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.report()
+
+    def __enter__(self) -> "MetricsReporter":
+        """Start reporting when entering a ``with`` block."""
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop and write the final report when leaving the block."""
+        self.stop()
+
+
+#: Process-wide metrics updated by the translation hot path.
+metrics = Metrics()
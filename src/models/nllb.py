@@ -2,7 +2,10 @@
 
 import logging
 
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+from models.base import Seq2SeqModel
+from models.registry import register_model
 
 source_lang = "eng_Latn"
 target_lang = "por_Latn"
@@ -10,50 +13,45 @@
 logger = logging.getLogger(__name__)
 
 
-class NllbModel:
+@register_model("nllb")
+class NllbModel(Seq2SeqModel):
     """
-    Classe para o modelo Nlbb.
+    Classe para o modelo Nllb.
 
-    Esta classe utiliza o modelo M2M100 da biblioteca transformers para
+    Esta classe utiliza o modelo NLLB-200 da biblioteca transformers para
     traduzir texto do inglês para o português.
 
     Métodos:
     - __init__: Inicializa o modelo e o tokenizador.
+    - translate_batch: Traduz uma lista de sentenças do inglês para o português.
     - translate_text: Traduz uma sentença do inglês para o português.
     """
 
-    def __init__(self) -> None:
+    name = "nllb"
+    checkpoint = "facebook/nllb-200-distilled-600M"
+    tokenizer_kwargs = {"src_lang": source_lang}
+
+    def __init__(self, backend=None) -> None:
         """
-        Inicializa uma nova instância do modelo Nlbb.
+        Inicializa uma nova instância do modelo Nllb.
 
-        O modelo e o tokenizador M2M100 são carregados a partir dos recursos
+        O modelo e o tokenizador NLLB-200 são carregados a partir dos recursos
         predefinidos do Facebook.
         """
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(
-            "facebook/nllb-200-distilled-600M"
-        )
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(self.checkpoint)
         self.tokenizer = AutoTokenizer.from_pretrained(
-            "facebook/nllb-200-distilled-600M"
-        )
-        self.translator = pipeline(
-            "translation",
-            model=self.model,
-            tokenizer=self.tokenizer,
-            src_lang=source_lang,
-            tgt_lang=target_lang,
-            max_length=400,
+            self.checkpoint, **self.tokenizer_kwargs
         )
+        self.set_backend(backend)
 
-    def translate_text(self, sentence):
+    def generation_kwargs(self):
         """
-        Traduz uma sentença do inglês para o português.
-
-        Parâmetros:
-        - sentence (str): A sentença em inglês a ser traduzida.
+        Argumentos de geração.
 
         Retorna:
-        - list: Uma lista contendo a sentença traduzida em português.
+        - dict: O token do idioma de destino. O tamanho máximo da saída vem
+          do perfil de geração em ``config/model/nllb.yaml``.
         """
-        out = self.translator(sentence)
-        out = [o["translation_text"] for o in out]
-        return out[0]
+        return {
+            "forced_bos_token_id": self.tokenizer.convert_tokens_to_ids(target_lang)
+        }
@@ -0,0 +1,174 @@
+"""Multi-process data-parallel inference module.
+
+Each worker process loads its own copy of a registered model and runs it
+with a fixed number of torch threads. Batches are sharded across the
+workers and the results are merged back in the original order.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from models.registry import registry
+
+logger = logging.getLogger(__name__)
+
+_worker_model = None
+
+
+def init_worker(factory, num_threads: int) -> None:
+    """
+    Pin the torch thread pools and load the model of a worker process.
+
+    Used as the ``initializer`` of process pools; the model is then available
+    through ``worker_model``.
+
+    Args:
+        factory (Callable): Builds the model, e.g. ``registry.factory(name)``.
+        num_threads (int): Number of torch threads of the worker.
+    """
+    global _worker_model
+    try:
+        import torch
+    except ImportError:
+        # models that do not run on torch need no thread pinning
+        torch = None
+    if torch is not None:
+        torch.set_num_threads(num_threads)
+        torch.set_num_interop_threads(1)
+    _worker_model = factory()
+
+
+def worker_model():
+    """Return the model loaded by ``init_worker`` in this process."""
+    return _worker_model
+
+
+def _describe_worker():
+    """Return the cache identity of the worker model, if it has one."""
+    checkpoint = getattr(_worker_model, "checkpoint", None)
+    if checkpoint is None or not hasattr(_worker_model, "cache_settings"):
+        return checkpoint, {}
+    return checkpoint, _worker_model.cache_settings()
+
+
+def _translate_shard(sentences: List[str]) -> Tuple[List[str], List[bool]]:
+    """Translate a shard of sentences in a worker, with the hit_cap flags."""
+    if hasattr(_worker_model, "translate_batch_with_flags"):
+        return _worker_model.translate_batch_with_flags(sentences)
+    return _worker_model.translate_batch(sentences), [False] * len(sentences)
+
+
+def default_threads(num_workers: int) -> int:
+    """Split the CPU cores evenly between the worker processes."""
+    return max(1, (os.cpu_count() or 1) // num_workers)
+
+
+class ParallelTranslator:
+    """
+    Pool of worker processes, each holding its own model.
+
+    It exposes ``translate_batch`` and ``translate_batch_with_flags`` like the
+    model wrappers, so it can be used wherever a single model is expected.
+    """
+
+    #: Optional ``utilities.cache.CacheTraducoes``, consulted in the parent
+    #: process before sending sentences to the workers.
+    cache = None
+
+    def __init__(
+        self,
+        modelname: str,
+        num_workers: int,
+        threads_per_worker: Optional[int] = None,
+        shard_size: int = 16,
+    ) -> None:
+        """
+        Start the worker processes.
+
+        Args:
+            modelname (str): Name of a model in the registry.
+            num_workers (int): Number of worker processes.
+            threads_per_worker (int, optional): Torch threads of each worker.
+                Defaults to the CPU count divided by the number of workers.
+            shard_size (int): Number of sentences sent to a worker at a time.
+        """
+        threads_per_worker = threads_per_worker or default_threads(num_workers)
+        logger.info(
+            "Starting %s %s workers with %s threads each",
+            num_workers,
+            modelname,
+            threads_per_worker,
+        )
+        self.shard_size = shard_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(registry.factory(modelname), threads_per_worker),
+        )
+        self.checkpoint, self._cache_settings = self.executor.submit(
+            _describe_worker
+        ).result()
+
+    def cache_settings(self) -> dict:
+        """Return the settings of the worker models used in the cache key."""
+        return self._cache_settings
+
+    def translate_batch(self, sentences: List[str]) -> List[str]:
+        """
+        Translate sentences, sharding them across the workers.
+
+        Args:
+            sentences (List[str]): The texts to be translated.
+
+        Returns:
+            List[str]: The translations, in the same order as the input.
+        """
+        return self.translate_batch_with_flags(sentences)[0]
+
+    def translate_batch_with_flags(
+        self, sentences: List[str]
+    ) -> Tuple[List[str], List[bool]]:
+        """
+        Translate sentences in the workers, reporting the ones that hit the cap.
+
+        Args:
+            sentences (List[str]): The texts to be translated.
+
+        Returns:
+            Tuple[List[str], List[bool]]: The translations and whether the
+            decoding of each text stopped at ``max_new_tokens``, in the same
+            order as the input. Texts read from the cache are reported as
+            False. The cache is only used for models with a ``checkpoint``.
+        """
+        # models without a checkpoint have no identity to build cache keys from
+        if self.cache is not None and self.checkpoint is not None:
+            return self.cache.traduzir_com_sinais(
+                self.checkpoint,
+                self.cache_settings(),
+                sentences,
+                self._translate_batch,
+            )
+        return self._translate_batch(sentences)
+
+    def _translate_batch(self, sentences: List[str]) -> Tuple[List[str], List[bool]]:
+        """Translate sentences in the workers, without the cache."""
+        shards = [
+            sentences[start : start + self.shard_size]
+            for start in range(0, len(sentences), self.shard_size)
+        ]
+        translations, hit_cap = [], []
+        # map returns the shards in submission order
+        for shard_translations, shard_hit_cap in self.executor.map(
+            _translate_shard, shards
+        ):
+            translations.extend(shard_translations)
+            hit_cap.extend(shard_hit_cap)
+        return translations, hit_cap
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self.executor.shutdown()
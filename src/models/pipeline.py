@@ -0,0 +1,320 @@
+"""Staged translation pipeline module.
+
+Splits translation into stages that run on their own threads and hand work
+to each other through bounded queues:
+
+    read -> tokenize -> generate -> decode -> caller (write)
+
+The input iterable is consumed on a reader thread, tokenization (and cache
+lookups) on one or more tokenizer threads, ``generate`` on a single thread,
+and decoding (and cache writes) on a decode thread. Results are yielded to
+the caller in input order, so the caller can write them while the next
+items are being generated. Torch releases the GIL inside ``generate``, so
+the Python-side work of the other stages overlaps with it. The tokenizer is
+shared by the tokenize and decode stages, which take turns using it.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from models.chunking import chunk_text
+from models.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class StageStats:
+    """Busy and waiting time of a pipeline stage."""
+
+    def __init__(self) -> None:
+        """Init function."""
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    def as_dict(self) -> dict:
+        """Return the stats as a dictionary."""
+        return {"items": self.items, "busy_s": self.busy, "waiting_s": self.waiting}
+
+
+class StagedPipeline:
+    """
+    Overlap tokenization, generation, decoding and output of a model.
+
+    ``translate`` takes ``(payload, texts)`` items and yields
+    ``(payload, translations, hit_cap)`` in the same order. Texts are looked
+    up in the cache, chunked and scheduled like in
+    ``Seq2SeqModel.translate_batch``.
+    """
+
+    def __init__(self, model, queue_size: int = 4, tokenizer_workers: int = 1) -> None:
+        """
+        Create the pipeline; its threads are started by each ``translate``.
+
+        Args:
+            model (Seq2SeqModel): The model wrapper.
+            queue_size (int): Capacity of each queue between two stages.
+            tokenizer_workers (int): Number of tokenizer threads. They run
+                the cache lookups concurrently, but use the tokenizer one at
+                a time.
+        """
+        self.model = model
+        self.queue_size = queue_size
+        self.tokenizer_workers = tokenizer_workers
+        self.stats = {
+            stage: StageStats()
+            for stage in ("read", "tokenize", "generate", "decode", "write")
+        }
+        self._queues = {}
+        # a Hugging Face fast tokenizer cannot be used by two threads at once
+        self._tokenizer_lock = threading.Lock()
+        self._failed = threading.Event()
+        self._errors = []
+
+    def queue_depths(self) -> dict:
+        """Return the number of items waiting in front of each stage."""
+        return {name: q.qsize() for name, q in self._queues.items()}
+
+    def report(self) -> dict:
+        """Log and return the busy and waiting time of each stage."""
+        report = {stage: stats.as_dict() for stage, stats in self.stats.items()}
+        logger.info("Pipeline stages: %s", report)
+        return report
+
+    def _put(self, target: queue.Queue, item, stage: str) -> bool:
+        """Put an item downstream; return False if the pipeline failed."""
+        start = time.perf_counter()
+        while not self._failed.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                self.stats[stage].waiting += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue, stage: str):
+        """Take the next item from upstream, counting the time waited."""
+        start = time.perf_counter()
+        while not self._failed.is_set():
+            try:
+                item = source.get(timeout=0.1)
+                self.stats[stage].waiting += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_stage(self, stage: str, function, *args) -> None:
+        """Run a stage loop, stopping the whole pipeline if it fails."""
+        try:
+            function(*args)
+        except Exception as error:
+            logger.exception("Pipeline stage %s failed", stage)
+            self._errors.append(error)
+            self._failed.set()
+
+    def _read(self, items: Iterable[Tuple[Any, List[str]]]) -> None:
+        """Feed the input items, numbered, to the tokenizers."""
+        iterator = iter(items)
+        sequence = 0
+        while True:
+            start = time.perf_counter()
+            item = next(iterator, _END)
+            self.stats["read"].busy += time.perf_counter() - start
+            if item is _END:
+                break
+            if not self._put(self._queues["tokenize"], (sequence, *item), "read"):
+                return
+            self.stats["read"].items += 1
+            sequence += 1
+        for _ in range(self.tokenizer_workers):
+            self._put(self._queues["tokenize"], _END, "read")
+
+    def _tokenize(self) -> None:
+        """Look up the cache, chunk and encode the texts of each item."""
+        model = self.model
+        while True:
+            item = self._get(self._queues["tokenize"], "tokenize")
+            if item is _END:
+                break
+            start = time.perf_counter()
+            sequence, payload, texts = item
+            keys, found = None, {}
+            pending = dict(enumerate(texts))
+            if model.cache is not None:
+                keys, found, pending = model.cache.consultar(
+                    model.checkpoint, model.cache_settings(), texts
+                )
+                metrics.increment("cache_hits", len(texts) - len(pending))
+                metrics.increment("cache_misses", len(pending))
+
+            chunks, owners = [], []
+            with self._tokenizer_lock:
+                for owner, text in pending.items():
+                    for chunk in chunk_text(
+                        text, model.count_tokens, model.chunk_budget
+                    ):
+                        chunks.append(chunk)
+                        owners.append(owner)
+                batches = model.schedule(chunks)
+                encoded = [
+                    model.encode([chunks[i] for i in indexes]) for indexes in batches
+                ]
+            header = {
+                "sequence": sequence,
+                "payload": payload,
+                "size": len(texts),
+                "keys": keys,
+                "found": found,
+                "pending": list(pending),
+                "owners": owners,
+                "chunks": [None] * len(chunks),
+                "hit_cap": [False] * len(chunks),
+                "remaining": len(batches),
+            }
+            self.stats["tokenize"].busy += time.perf_counter() - start
+            self.stats["tokenize"].items += 1
+            if not self._put(self._queues["generate"], ("item", header), "tokenize"):
+                return
+            for indexes, inputs in zip(batches, encoded):
+                message = ("batch", sequence, indexes, inputs)
+                if not self._put(self._queues["generate"], message, "tokenize"):
+                    return
+        self._put(self._queues["generate"], _END, "tokenize")
+
+    def _generate(self) -> None:
+        """Run ``generate`` on the encoded batches."""
+        finished = 0
+        while finished < self.tokenizer_workers:
+            message = self._get(self._queues["generate"], "generate")
+            if message is _END:
+                finished += 1
+                continue
+            if message[0] == "batch":
+                kind, sequence, indexes, inputs = message
+                start = time.perf_counter()
+                outputs = self.model.generate(inputs)
+                self.stats["generate"].busy += time.perf_counter() - start
+                self.stats["generate"].items += 1
+                message = (kind, sequence, indexes, outputs)
+            if not self._put(self._queues["decode"], message, "generate"):
+                return
+        self._put(self._queues["decode"], _END, "generate")
+
+    def _finish(self, header: dict) -> bool:
+        """Join the chunk translations of an item and pass it on."""
+        parts, capped = {owner: [] for owner in header["pending"]}, {}
+        for owner, chunk, chunk_capped in zip(
+            header["owners"], header["chunks"], header["hit_cap"]
+        ):
+            parts[owner].append(chunk)
+            capped[owner] = capped.get(owner, False) or chunk_capped
+        # texts without any chunk, e.g. empty cells, are translated as ""
+        new = {owner: " ".join(chunks) for owner, chunks in parts.items()}
+        if header["keys"] is None:
+            keys = range(header["size"])
+        else:
+            keys = header["keys"]
+            if new:
+                self.model.cache.salvar(new)
+        translations = [header["found"].get(key, new.get(key)) for key in keys]
+        hit_cap = [capped.get(key, False) for key in keys]
+        self.stats["decode"].items += 1
+        result = (header["sequence"], header["payload"], translations, hit_cap)
+        return self._put(self._queues["write"], result, "decode")
+
+    def _decode(self) -> None:
+        """Decode the generated batches and reassemble each item."""
+        headers = {}
+        while True:
+            message = self._get(self._queues["decode"], "decode")
+            if message is _END:
+                break
+            start = time.perf_counter()
+            if message[0] == "item":
+                header = message[1]
+                headers[header["sequence"]] = header
+            else:
+                _, sequence, indexes, outputs = message
+                header = headers[sequence]
+                _, capped = self.model.output_lengths(outputs)
+                with self._tokenizer_lock:
+                    translations = self.model.decode(outputs)
+                for i, translation, chunk_capped in zip(indexes, translations, capped):
+                    header["chunks"][i] = translation
+                    header["hit_cap"][i] = chunk_capped
+                header["remaining"] -= 1
+            self.stats["decode"].busy += time.perf_counter() - start
+            if header["remaining"] == 0:
+                del headers[header["sequence"]]
+                if not self._finish(header):
+                    return
+        self._put(self._queues["write"], _END, "decode")
+
+    def translate(
+        self, items: Iterable[Tuple[Any, List[str]]]
+    ) -> Iterator[Tuple[Any, List[str], List[bool]]]:
+        """
+        Translate the texts of each item through the pipeline stages.
+
+        Args:
+            items (Iterable): ``(payload, texts)`` pairs; the payload is
+                passed through untouched, e.g. the DataFrame chunk the texts
+                were taken from.
+
+        Yields:
+            Tuple[Any, List[str], List[bool]]: The payload, the translations
+            of its texts and whether each one hit the cap (see
+            ``Seq2SeqModel.translate_batch_with_flags``), in input order.
+
+        Raises:
+            Exception: The first error raised by a stage.
+        """
+        self._failed.clear()
+        self._errors = []
+        self._queues = {
+            stage: queue.Queue(maxsize=self.queue_size)
+            for stage in ("tokenize", "generate", "decode", "write")
+        }
+        threads = [
+            threading.Thread(target=self._run_stage, args=("read", self._read, items))
+        ]
+        threads += [
+            threading.Thread(target=self._run_stage, args=("tokenize", self._tokenize))
+            for _ in range(self.tokenizer_workers)
+        ]
+        threads += [
+            threading.Thread(target=self._run_stage, args=("generate", self._generate)),
+            threading.Thread(target=self._run_stage, args=("decode", self._decode)),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        waiting, next_sequence = {}, 0
+        try:
+            while True:
+                result = self._get(self._queues["write"], "write")
+                if result is _END:
+                    break
+                waiting[result[0]] = result[1:]
+                while next_sequence in waiting:
+                    start = time.perf_counter()
+                    yield waiting.pop(next_sequence)
+                    self.stats["write"].busy += time.perf_counter() - start
+                    self.stats["write"].items += 1
+                    next_sequence += 1
+        finally:
+            # stop the stages if the caller stopped early or a stage failed
+            if next_sequence < self.stats["read"].items or self._errors:
+                self._failed.set()
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
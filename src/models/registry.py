@@ -0,0 +1,228 @@
+"""Model registry module.
+
+Backends register a factory under a short name with ``register_model``.
+Models are only built the first time they are requested and are then kept
+warm, so repeated calls reuse the same instance. When a memory budget is
+configured, the least recently used models are unloaded to stay within it.
+
+A factory can also be registered as a "module:attribute" string, imported
+the first time the model is requested. The built-in wrappers are
+registered this way, and installed packages can add models through the
+``translate_dataset.models`` entry point group, so importing the package
+never imports ``transformers`` or the code of a model that is not used.
+"""
+
+import gc
+import importlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from importlib.metadata import entry_points
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+#: Built-in models, imported the first time they are requested.
+BUILTIN_MODELS = {
+    "m2m100": "models.m2m100:M2m100Model",
+    "marian": "models.marian:MarianModel",
+    "mbart": "models.mbart:MbartModel",
+    "nllb": "models.nllb:NllbModel",
+    "t5": "models.t5:t5Model",
+}
+#: Entry point group through which installed packages register models.
+ENTRY_POINT_GROUP = "translate_dataset.models"
+
+
+def model_memory(model) -> int:
+    """
+    Estimate the memory used by a loaded model wrapper.
+
+    Args:
+        model: A model wrapper, usually holding a torch module in ``model``.
+
+    Returns:
+        int: The size in bytes of the parameters and buffers of the model.
+    """
+    module = getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+@contextmanager
+def configured(model, **settings) -> Iterator:
+    """
+    Set attributes of a model for the duration of a ``with`` block.
+
+    The registry hands out the same warm instance to every caller, so
+    per-call settings such as ``cache`` must not outlive the call that set
+    them. The previous values are restored on exit.
+
+    Args:
+        model: A model wrapper, usually a shared registry instance.
+        **settings: The attributes to set.
+
+    Yields:
+        The model.
+    """
+    missing = object()
+    previous = {name: model.__dict__.get(name, missing) for name in settings}
+    for name, value in settings.items():
+        setattr(model, name, value)
+    try:
+        yield model
+    finally:
+        for name, value in previous.items():
+            if value is missing:
+                # back to the class default
+                model.__dict__.pop(name, None)
+            else:
+                setattr(model, name, value)
+
+
+class ModelRegistry:
+    """Registry of lazily loaded, reusable translation models."""
+
+    def __init__(
+        self,
+        memory_budget: Optional[int] = None,
+        entry_point_group: Optional[str] = None,
+    ) -> None:
+        """
+        Init function.
+
+        Args:
+            memory_budget (int, optional): Maximum number of bytes used by the
+                loaded models. ``None`` keeps every loaded model warm.
+            entry_point_group (str, optional): Entry point group scanned for
+                more models the first time the names are needed.
+        """
+        self.memory_budget = memory_budget
+        self.entry_point_group = entry_point_group
+        self._discovered = entry_point_group is None
+        self._factories: Dict[str, Union[Callable, str]] = {}
+        self._loaded: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Union[Callable, str, None] = None):
+        """
+        Register a model factory under ``name``.
+
+        Can be used directly or as a class decorator::
+
+            @registry.register("marian")
+            class MarianModel(Seq2SeqModel): ...
+
+        Args:
+            name (str): The name used to select the model.
+            factory (Callable or str, optional): Builds the model when called,
+                or its "module:attribute" path, imported on first use.
+        """
+        if factory is None:
+            return lambda factory: self.register(name, factory)
+        self._factories[name] = factory
+        return factory
+
+    def _discover(self) -> None:
+        """Register the models of the entry point group, once."""
+        if self._discovered:
+            return
+        self._discovered = True
+        for entry_point in entry_points(group=self.entry_point_group):
+            # models registered in code take precedence
+            self._factories.setdefault(entry_point.name, entry_point.value)
+
+    def names(self) -> List[str]:
+        """Names of the registered models."""
+        self._discover()
+        return sorted(self._factories)
+
+    def factory(self, name: str) -> Callable:
+        """
+        Return the factory registered as ``name`` without calling it.
+
+        A factory registered as a "module:attribute" string is imported now.
+
+        Raises:
+            ValueError: If no model is registered under ``name``.
+        """
+        if name not in self._factories:
+            self._discover()
+        if name not in self._factories:
+            raise ValueError(
+                f"Unknown model '{name}'. Available models: {self.names()}"
+            )
+        factory = self._factories[name]
+        if isinstance(factory, str):
+            module_name, _, attribute = factory.partition(":")
+            factory = getattr(importlib.import_module(module_name), attribute)
+            self._factories[name] = factory
+        return factory
+
+    def loaded(self) -> List[str]:
+        """Names of the models currently loaded, least recently used first."""
+        return list(self._loaded)
+
+    def get(self, name: str):
+        """
+        Return the model registered as ``name``, loading it if needed.
+
+        Args:
+            name (str): The model name.
+
+        Raises:
+            ValueError: If no model is registered under ``name``.
+        """
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            factory = self.factory(name)
+            logger.info("Loading %s model ...", name)
+            model = factory()
+            self._loaded[name] = model
+            self._sizes[name] = model_memory(model)
+            logger.info(
+                "Loading %s model ... done (%.0f MB)", name, self._sizes[name] / 2**20
+            )
+            self._evict()
+            return model
+
+    def unload(self, name: str) -> None:
+        """Drop a loaded model so its memory can be reclaimed."""
+        with self._lock:
+            self._loaded.pop(name, None)
+            self._sizes.pop(name, None)
+        gc.collect()
+
+    def memory_usage(self) -> int:
+        """Estimated memory in bytes of the loaded models."""
+        return sum(self._sizes.values())
+
+    def _evict(self) -> None:
+        """Unload least recently used models while over the memory budget."""
+        if self.memory_budget is None:
+            return
+        while len(self._loaded) > 1 and self.memory_usage() > self.memory_budget:
+            name = next(iter(self._loaded))
+            logger.info("Memory budget exceeded, unloading %s model", name)
+            self.unload(name)
+
+
+def _budget_from_env() -> Optional[int]:
+    """Read the memory budget, in MB, from ``MODEL_MEMORY_BUDGET_MB``."""
+    budget = os.environ.get("MODEL_MEMORY_BUDGET_MB")
+    return int(budget) * 2**20 if budget else None
+
+
+registry = ModelRegistry(
+    memory_budget=_budget_from_env(), entry_point_group=ENTRY_POINT_GROUP
+)
+for _name, _target in BUILTIN_MODELS.items():
+    registry.register(_name, _target)
+register_model = registry.register
@@ -0,0 +1,41 @@
+"""Token-budget batch scheduling module.
+
+Batches formed in input order mix short and long segments, and every
+sequence of a batch is padded to the longest one. ``pack_batches`` sorts
+the segments by token length and packs neighbours into batches whose
+padded size (number of sequences times the longest one) stays within a
+token budget, so short segments travel in large batches and long ones in
+small batches, with little padding in either.
+"""
+
+from typing import List, Optional
+
+
+def pack_batches(
+    lengths: List[int], max_tokens: int, max_batch_size: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Group segment indexes into length-sorted batches within a token budget.
+
+    Args:
+        lengths (List[int]): The token length of each segment.
+        max_tokens (int): Maximum padded size of a batch, i.e. number of
+            segments times the longest one. A segment longer than the budget
+            forms a batch of its own.
+        max_batch_size (int, optional): Maximum number of segments per batch.
+
+    Returns:
+        List[List[int]]: The indexes of each batch, shortest segments first.
+    """
+    batches, batch = [], []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # sorted ascending, so this segment is the longest of the batch
+        padded = (len(batch) + 1) * lengths[index]
+        full = max_batch_size is not None and len(batch) >= max_batch_size
+        if batch and (padded > max_tokens or full):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
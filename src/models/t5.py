@@ -2,38 +2,32 @@
 
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 
+from models.base import Seq2SeqModel
+from models.registry import register_model
 
-class t5Model:
+
+@register_model("t5")
+class t5Model(Seq2SeqModel):
     """T5 Model Class."""
 
-    def __init__(self) -> None:
+    name = "t5"
+    checkpoint = "unicamp-dl/translation-en-pt-t5"
+
+    def __init__(self, backend=None) -> None:
         """Init function."""
-        model_name = "unicamp-dl/translation-en-pt-t5"
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.checkpoint)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(self.checkpoint)
+        self.set_backend(backend)
 
-    def translate_text(self, sentence):
+    def prepare_inputs(self, sentences):
         """
-        Translate the input sentence.
+        Add the task prefix to the input sentences.
 
         Args:
-            sentence (str): The input sentence to be translated.
+            sentences (List[str]): The input sentences to be translated.
 
         Returns:
-            str: The translated version of the input sentence.
+            List[str]: The sentences prefixed with the T5 task.
         """
         task_prefix = "translate English to Portuguese:"
-        inputs = self.tokenizer(
-            task_prefix + sentence, return_tensors="pt", padding=True
-        )
-
-        output_sequences = self.model.generate(
-            input_ids=inputs["input_ids"],
-            attention_mask=inputs["attention_mask"],
-            do_sample=False,  # test if batching affects output
-        )
-        sentence_decoded = self.tokenizer.batch_decode(
-            output_sequences, skip_special_tokens=True
-        )
-
-        return sentence_decoded[0]
+        return [task_prefix + sentence for sentence in sentences]
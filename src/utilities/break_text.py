@@ -19,6 +19,11 @@
     Divide o texto de um arquivo CSV usando pandas e gera arquivos CSV
     correspondentes.
 
+- dividir_texto_segmentos:
+    Divide o texto de um arquivo CSV e grava todas as partes em um único
+    conjunto de segmentos (veja ``utilities.segmentos``), em vez de um
+    arquivo CSV por parte.
+
 - dividir_texto_em_subtextos:
     Divide um texto em subtextos com base em um limite de tamanho.
 
@@ -44,6 +49,9 @@
 
 import pandas as pd
 
+from utilities.check_csv_restricoes import perfilar_csv
+from utilities.segmentos import EscritorSegmentos, remover_conjuntos
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
@@ -60,6 +68,8 @@ def __init__(
         num_linhas: int,
         pasta_saida: str,
         nome_arquivo: str,
+        formato_saida: str = "csv",
+        segmentos_por_shard: int = 100_000,
     ):
         """
         Inicializa o processador CSV com os parâmetros fornecidos.
@@ -72,6 +82,11 @@ def __init__(
             pasta_saida (str): O diretório onde o arquivo CSV processado será
                                armazenado.
             nome_arquivo (str): O nome do arquivo CSV processado.
+            formato_saida (str, optional): "csv" grava um arquivo CSV por
+                parte; "segmentos" grava todas as partes em shards JSON Lines
+                com um índice. Default é "csv".
+            segmentos_por_shard (int, optional): O número de segmentos de cada
+                shard no formato "segmentos". Default é 100000.
         """
         self.caminho_arquivo = caminho_arquivo
         self.nome_coluna = nome_coluna
@@ -79,6 +94,8 @@ def __init__(
         self.num_linhas = num_linhas
         self.pasta_saida = pasta_saida
         self.nome_arquivo = nome_arquivo
+        self.formato_saida = formato_saida
+        self.segmentos_por_shard = segmentos_por_shard
 
     def verificar_e_dividir_limite_caracteres_csv(self) -> None:
         """
@@ -101,12 +118,16 @@ def verificar_e_dividir_limite_caracteres_csv(self) -> None:
         if not os.path.exists(pasta_arquivo):
             os.makedirs(pasta_arquivo)
 
-        # Remover os arquivos existentes na pasta de saída
+        # Remover os arquivos existentes na pasta de saída, inclusive os
+        # conjuntos de segmentos, que o merge e os tradutores leriam antes
         arquivos_existentes = glob.glob(os.path.join(pasta_arquivo, "*.csv"))
         for arquivo in arquivos_existentes:
             os.remove(arquivo)
+        remover_conjuntos(pasta_arquivo)
 
-        if self.contar_linhas_csv() > self.num_linhas:
+        if self.formato_saida == "segmentos":
+            self.dividir_texto_segmentos(nome_arquivo_base, pasta_arquivo)
+        elif self.contar_linhas_csv() > self.num_linhas:
             self.dividir_texto_pandas(nome_arquivo_base, pasta_arquivo)
         else:
             self.dividir_texto_csv(nome_arquivo_base, pasta_arquivo)
@@ -115,12 +136,13 @@ def contar_linhas_csv(self) -> int:
         """
         Conta o número de linhas no arquivo CSV.
 
+        Usa o perfil do arquivo guardado pela verificação de restrições, e só
+        lê o arquivo se ele ainda não tiver sido verificado.
+
         Returns:
-            int: O número de linhas no arquivo CSV.
+            int: O número de linhas no arquivo CSV, incluindo o cabeçalho.
         """
-        with open(self.caminho_arquivo, "r", encoding="utf-8") as arquivo_csv:
-            total_linhas = sum(1 for linha in arquivo_csv)
-        return total_linhas
+        return perfilar_csv(self.caminho_arquivo)["linhas"] + 1
 
     def dividir_texto_csv(self, nome_arquivo_base: str, pasta_arquivo: str) -> None:
         """
@@ -139,7 +161,7 @@ def dividir_texto_csv(self, nome_arquivo_base: str, pasta_arquivo: str) -> None:
                 if indice_linha >= self.num_linhas:
                     break
                 texto = linha[coluna_indice]
-                subtextos = self.dividir_texto_em_subtextos(texto)
+                subtextos = self.dividir_texto_em_subtextos(texto, self.tamanho_maximo)
                 for indice_subtexto, subtexto in enumerate(subtextos):
                     nome_arquivo = os.path.join(
                         pasta_arquivo,
@@ -168,7 +190,7 @@ def dividir_texto_pandas(self, nome_arquivo_base: str, pasta_arquivo: str) -> No
         )
         coluna_interesse = data_frame[self.nome_coluna]
         for indice_linha, texto in enumerate(coluna_interesse):
-            subtextos = self.dividir_texto_em_subtextos(texto)
+            subtextos = self.dividir_texto_em_subtextos(texto, self.tamanho_maximo)
             for indice_subtexto, subtexto in enumerate(subtextos):
                 nome_arquivo = os.path.join(
                     pasta_arquivo,
@@ -179,6 +201,45 @@ def dividir_texto_pandas(self, nome_arquivo_base: str, pasta_arquivo: str) -> No
                 data_frame_temporario.to_csv(nome_arquivo, index=False)
             self.monitorar_progresso(indice_linha, self.num_linhas)
 
+    def dividir_texto_segmentos(
+        self, nome_arquivo_base: str, pasta_arquivo: str
+    ) -> None:
+        """
+        Divide o texto e grava todas as partes em um conjunto de segmentos.
+
+        O arquivo CSV é lido uma única vez, em streaming, e cada parte vira
+        um registro ``(row_id, part_id, text)``, com os mesmos números dos
+        nomes "nome_parte_X_Y.csv" do formato CSV.
+
+        Args:
+            nome_arquivo_base (str): O nome base do conjunto.
+            pasta_arquivo (str): O diretório onde o conjunto será armazenado.
+        """
+        with open(
+            self.caminho_arquivo, "r", encoding="utf-8", newline=""
+        ) as arquivo_csv, EscritorSegmentos(
+            pasta_arquivo,
+            nome_arquivo_base,
+            {"coluna": self.nome_coluna},
+            self.segmentos_por_shard,
+        ) as escritor:
+            leitor_csv = csv.reader(arquivo_csv)
+            coluna_indice = next(leitor_csv).index(self.nome_coluna)
+            for indice_linha, linha in enumerate(leitor_csv):
+                if indice_linha >= self.num_linhas:
+                    break
+                subtextos = self.dividir_texto_em_subtextos(
+                    linha[coluna_indice], self.tamanho_maximo
+                )
+                escritor.escrever_linha(indice_linha + 1, subtextos)
+                self.monitorar_progresso(indice_linha, self.num_linhas)
+        logging.info(
+            "Conjunto de segmentos gerado: %s (%s linhas, %s segmentos)",
+            os.path.join(pasta_arquivo, nome_arquivo_base),
+            escritor.total_linhas,
+            escritor.total_segmentos,
+        )
+
     @staticmethod
     def dividir_texto_em_subtextos(texto: str, limite_tamanho: int = 5000) -> List[str]:
         """
@@ -210,13 +271,18 @@ def monitorar_progresso(linha_atual: int, total_linhas: int) -> None:
         """
         Monitora o progresso da divisão do arquivo.
 
+        Registra uma mensagem a cada 5% das linhas, e na última linha.
+
         Args:
-            linha_atual (int): O número da linha atual.
+            linha_atual (int): O índice (a partir de 0) da linha atual.
             total_linhas (int): O total de linhas no arquivo.
         """
-        percentual = (linha_atual / total_linhas) * 100
-        if percentual % 5 == 0:
-            logging.info("Progresso: %s%% concluído", percentual)
+        processadas = linha_atual + 1
+        passo = max(1, total_linhas // 20)
+        if processadas % passo == 0 or processadas == total_linhas:
+            logging.info(
+                "Progresso: %s%% concluído", processadas * 100 // max(1, total_linhas)
+            )
 
 
 if __name__ == "__main__":
@@ -232,6 +298,15 @@ def monitorar_progresso(linha_atual: int, total_linhas: int) -> None:
         "Digite o diretório onde os arquivos CSV divididos serão salvos: "
     )
     nome_arquivo_final = input("Digite o nome base para os arquivos CSV divididos: ")
+    formato_saida = (
+        input(
+            "Digite o formato de saída, csv (um arquivo por subtexto) ou "
+            "segmentos (shards indexados) [csv]: "
+        ).strip()
+        or "csv"
+    )
+    if formato_saida not in ("csv", "segmentos"):
+        raise SystemExit(f"Formato de saída desconhecido: {formato_saida}")
 
     processador = CSVProcessor(
         caminho_arquivo_original,
@@ -240,5 +315,6 @@ def monitorar_progresso(linha_atual: int, total_linhas: int) -> None:
         num_linhas_leitura,
         pasta_saida_final,
         nome_arquivo_final,
+        formato_saida=formato_saida,
     )
     processador.verificar_e_dividir_limite_caracteres_csv()
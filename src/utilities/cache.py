@@ -0,0 +1,309 @@
+"""Módulo do cache persistente de traduções.
+
+As traduções são guardadas em um banco SQLite, endereçadas pelo hash do
+nome do modelo, das configurações de geração e do texto de origem
+normalizado. Assim, execuções repetidas ou retomadas após uma falha não
+traduzem novamente o que já foi traduzido, mesmo entre modelos e
+utilitários diferentes.
+
+Classes:
+- CacheTraducoes: Cache em disco com despejo por tamanho.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Tuple
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Normaliza o texto de origem antes do cálculo do hash.
+
+    Args:
+        texto (str): O texto de origem.
+
+    Returns:
+        str: O texto em NFC e com os espaços em branco colapsados.
+    """
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+class CacheTraducoes:
+    """Cache de traduções em disco, compartilhado entre execuções e modelos."""
+
+    def __init__(self, caminho: str, tamanho_maximo: int = 1024**3):
+        """
+        Abre (ou cria) o cache.
+
+        Args:
+            caminho (str): O caminho do arquivo SQLite.
+            tamanho_maximo (int, optional): O tamanho máximo, em bytes, das
+                traduções guardadas. Ao ultrapassá-lo, as entradas usadas há
+                mais tempo são removidas. Default é 1 GiB.
+        """
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS traducoes ("
+            "chave TEXT PRIMARY KEY, traducao TEXT NOT NULL, "
+            "tamanho INTEGER NOT NULL, ultimo_acesso REAL NOT NULL)"
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS traducoes_ultimo_acesso "
+            "ON traducoes(ultimo_acesso)"
+        )
+        # o tamanho total é mantido por gatilhos, sem somar a tabela a cada
+        # gravação; caches criados antes dele são somados uma única vez
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS meta (nome TEXT PRIMARY KEY, valor INTEGER)"
+        )
+        self._conexao.execute(
+            "INSERT OR IGNORE INTO meta "
+            "SELECT 'tamanho_total', COALESCE(SUM(tamanho), 0) FROM traducoes"
+        )
+        for gatilho, evento, variacao in (
+            ("traducoes_inseridas", "INSERT", "new.tamanho"),
+            ("traducoes_removidas", "DELETE", "-old.tamanho"),
+            ("traducoes_alteradas", "UPDATE OF tamanho", "new.tamanho - old.tamanho"),
+        ):
+            self._conexao.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {gatilho} AFTER {evento} "
+                "ON traducoes BEGIN UPDATE meta SET valor = valor + "
+                f"{variacao} WHERE nome = 'tamanho_total'; END"
+            )
+        self._conexao.commit()
+
+    @staticmethod
+    def gerar_chave(modelo: str, configuracao: dict, texto: str) -> str:
+        """
+        Gera a chave de uma tradução.
+
+        Args:
+            modelo (str): O nome do modelo.
+            configuracao (dict): As configurações de geração.
+            texto (str): O texto de origem.
+
+        Returns:
+            str: O hash SHA-256 que identifica a tradução.
+        """
+        hash_texto = hashlib.sha256(normalizar_texto(texto).encode("utf-8"))
+        conteudo = json.dumps(
+            [modelo, configuracao, hash_texto.hexdigest()], sort_keys=True
+        )
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    def buscar(self, chaves: List[str]) -> Dict[str, str]:
+        """
+        Busca as traduções guardadas para as chaves fornecidas.
+
+        Args:
+            chaves (List[str]): As chaves procuradas.
+
+        Returns:
+            Dict[str, str]: As traduções encontradas, por chave.
+        """
+        encontradas = {}
+        unicas = list(dict.fromkeys(chaves))
+        with self._trava:
+            for inicio in range(0, len(unicas), 500):
+                lote = unicas[inicio : inicio + 500]
+                marcadores = ",".join("?" * len(lote))
+                encontradas.update(
+                    self._conexao.execute(
+                        "SELECT chave, traducao FROM traducoes "
+                        f"WHERE chave IN ({marcadores})",
+                        lote,
+                    ).fetchall()
+                )
+            if encontradas:
+                agora = time.time()
+                self._conexao.executemany(
+                    "UPDATE traducoes SET ultimo_acesso = ? WHERE chave = ?",
+                    [(agora, chave) for chave in encontradas],
+                )
+                self._conexao.commit()
+        return encontradas
+
+    def salvar(self, traducoes: Dict[str, str]) -> None:
+        """
+        Guarda traduções no cache e remove as mais antigas se necessário.
+
+        Args:
+            traducoes (Dict[str, str]): As traduções a serem guardadas, por
+                chave.
+        """
+        agora = time.time()
+        with self._trava:
+            # um upsert, e não INSERT OR REPLACE, cuja remoção implícita não
+            # dispara o gatilho de DELETE
+            self._conexao.executemany(
+                "INSERT INTO traducoes VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(chave) DO UPDATE SET traducao = excluded.traducao, "
+                "tamanho = excluded.tamanho, ultimo_acesso = excluded.ultimo_acesso",
+                [
+                    (chave, traducao, len(traducao.encode("utf-8")), agora)
+                    for chave, traducao in traducoes.items()
+                ],
+            )
+            self._despejar()
+            self._conexao.commit()
+
+    def tamanho_total(self) -> int:
+        """
+        Retorna o tamanho, em bytes, das traduções guardadas.
+
+        Returns:
+            int: A soma dos tamanhos, mantida pelos gatilhos do banco.
+        """
+        with self._trava:
+            return self._tamanho_total()
+
+    def _tamanho_total(self) -> int:
+        """Lê o tamanho total guardado na tabela meta."""
+        (tamanho_total,) = self._conexao.execute(
+            "SELECT valor FROM meta WHERE nome = 'tamanho_total'"
+        ).fetchone()
+        return tamanho_total
+
+    def _despejar(self) -> None:
+        """Remove as entradas usadas há mais tempo até caber no limite."""
+        excesso = self._tamanho_total() - self.tamanho_maximo
+        if excesso <= 0:
+            return
+        removidas = []
+        for chave, tamanho in self._conexao.execute(
+            "SELECT chave, tamanho FROM traducoes ORDER BY ultimo_acesso"
+        ):
+            removidas.append((chave,))
+            excesso -= tamanho
+            if excesso <= 0:
+                break
+        self._conexao.executemany("DELETE FROM traducoes WHERE chave = ?", removidas)
+        logging.info("Cache: %s traduções removidas por tamanho.", len(removidas))
+
+    def consultar(
+        self, modelo: str, configuracao: dict, textos: List[str]
+    ) -> Tuple[List[str], Dict[str, str], Dict[str, str]]:
+        """
+        Busca as traduções de textos e separa os que ainda faltam.
+
+        Conta os acertos e as falhas; cada texto ausente do cache é contado
+        uma única vez, mesmo que se repita.
+
+        Args:
+            modelo (str): O nome do modelo.
+            configuracao (dict): As configurações de geração.
+            textos (List[str]): Os textos a serem traduzidos.
+
+        Returns:
+            Tuple[List[str], Dict[str, str], Dict[str, str]]: A chave de cada
+            texto, as traduções encontradas por chave e os textos ausentes
+            por chave, na ordem em que aparecem.
+        """
+        chaves = [self.gerar_chave(modelo, configuracao, texto) for texto in textos]
+        encontradas = self.buscar(chaves)
+
+        pendentes = {}
+        for chave, texto in zip(chaves, textos):
+            if chave not in encontradas and chave not in pendentes:
+                pendentes[chave] = texto
+        # os contadores são atualizados por várias threads
+        with self._trava:
+            self.acertos += len(textos) - len(pendentes)
+            self.falhas += len(pendentes)
+        return chaves, encontradas, pendentes
+
+    def traduzir(
+        self,
+        modelo: str,
+        configuracao: dict,
+        textos: List[str],
+        funcao_traducao: Callable[[List[str]], List[str]],
+    ) -> List[str]:
+        """
+        Traduz textos consultando o cache antes de chamar o modelo.
+
+        Apenas os textos ausentes do cache são enviados para
+        ``funcao_traducao``, uma única vez cada.
+
+        Args:
+            modelo (str): O nome do modelo.
+            configuracao (dict): As configurações de geração.
+            textos (List[str]): Os textos a serem traduzidos.
+            funcao_traducao (Callable): Traduz uma lista de textos.
+
+        Returns:
+            List[str]: As traduções, na mesma ordem dos textos.
+        """
+        chaves, encontradas, pendentes = self.consultar(modelo, configuracao, textos)
+        if pendentes:
+            novas = dict(zip(pendentes, funcao_traducao(list(pendentes.values()))))
+            self.salvar(novas)
+            encontradas.update(novas)
+        return [encontradas[chave] for chave in chaves]
+
+    def traduzir_com_sinais(
+        self,
+        modelo: str,
+        configuracao: dict,
+        textos: List[str],
+        funcao_traducao: Callable[[List[str]], Tuple[List[str], List[bool]]],
+    ) -> Tuple[List[str], List[bool]]:
+        """
+        Traduz textos como ``traduzir``, repassando um sinal de cada texto.
+
+        Args:
+            modelo (str): O nome do modelo.
+            configuracao (dict): As configurações de geração.
+            textos (List[str]): Os textos a serem traduzidos.
+            funcao_traducao (Callable): Traduz uma lista de textos e retorna
+                também um sinal de cada um, por exemplo se a geração parou no
+                limite de tokens.
+
+        Returns:
+            Tuple[List[str], List[bool]]: As traduções e os sinais, na mesma
+            ordem dos textos. Os textos lidos do cache recebem False.
+        """
+        sinais = {}
+
+        def traduzir(pendentes):
+            traducoes, sinais_pendentes = funcao_traducao(pendentes)
+            sinais.update(zip(pendentes, sinais_pendentes))
+            return traducoes
+
+        traducoes = self.traduzir(modelo, configuracao, textos, traduzir)
+        return traducoes, [sinais.get(texto, False) for texto in textos]
+
+    def relatorio(self) -> str:
+        """
+        Registra e retorna o resumo de acertos e falhas do cache.
+
+        Returns:
+            str: O resumo de acertos e falhas.
+        """
+        total = self.acertos + self.falhas
+        taxa = self.acertos / total * 100 if total else 0.0
+        resumo = (
+            f"Cache: {self.acertos} acertos, {self.falhas} falhas "
+            f"({taxa:.1f}% de acertos)"
+        )
+        logging.info(resumo)
+        return resumo
+
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco."""
+        self._conexao.close()
@@ -1,75 +1,186 @@
-"""Módulo para verificar restrições em arquivos CSV."""
+"""Módulo para verificar restrições em arquivos CSV.
+
+A verificação é feita em uma única passada, que também conta as linhas e
+coleta estatísticas do tamanho dos textos de cada coluna. O resultado (o
+perfil do arquivo) é guardado ao lado do arquivo, em ``<arquivo>.perfil.json``,
+e reaproveitado enquanto o tamanho e a data de modificação do arquivo não
+mudarem, então as etapas seguintes não precisam ler o arquivo de novo.
+
+Funções:
+- perfilar_csv: Verifica, conta as linhas e coleta estatísticas de um CSV.
+- verificar_restricoes_csv: Verifica as restrições de um arquivo CSV.
+"""
 
 import csv
+import json
 import logging
-import sys
+import os
 
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+SUFIXO_PERFIL = ".perfil.json"
 
-def verificar_restricoes_csv(caminho_arquivo: str) -> None:
-    """Verifica as restrições de um arquivo CSV.
+
+def _identidade_arquivo(caminho_arquivo: str) -> dict:
+    """Retorna o tamanho e a data de modificação do arquivo."""
+    estado = os.stat(caminho_arquivo)
+    return {"tamanho": estado.st_size, "mtime_ns": estado.st_mtime_ns}
+
+
+def _ler_perfil(caminho_arquivo: str, identidade: dict):
+    """Retorna o perfil guardado, se ele ainda corresponder ao arquivo."""
+    try:
+        with open(caminho_arquivo + SUFIXO_PERFIL, "r", encoding="utf-8") as arquivo:
+            perfil = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if perfil.get("arquivo") != identidade:
+        return None
+    return perfil
+
+
+def _guardar_perfil(caminho_arquivo: str, perfil: dict) -> None:
+    """Guarda o perfil ao lado do arquivo, se a pasta permitir."""
+    temporario = caminho_arquivo + SUFIXO_PERFIL + ".tmp"
+    try:
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(perfil, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho_arquivo + SUFIXO_PERFIL)
+    except OSError:
+        logging.warning("Não foi possível guardar o perfil de '%s'.", caminho_arquivo)
+
+
+def _calcular_perfil(caminho_arquivo: str) -> dict:
+    """Lê o arquivo uma única vez, verificando a estrutura e medindo as colunas."""
+    problema = None
+    linhas = 0
+    with open(caminho_arquivo, "r", encoding="utf-8", newline="") as arquivo_csv:
+        leitor_csv = csv.reader(arquivo_csv)
+        cabecalho = next(leitor_csv, None)
+        numero_colunas = len(cabecalho) if cabecalho else 0
+        totais = [0] * numero_colunas
+        minimos = [None] * numero_colunas
+        maximos = [0] * numero_colunas
+        vazias = [0] * numero_colunas
+
+        if cabecalho is None:
+            problema = "O arquivo CSV está vazio."
+        elif not any(cabecalho):
+            problema = "O arquivo CSV não possui uma linha de cabeçalho."
+        elif numero_colunas < 2:
+            problema = "O arquivo CSV deve ter pelo menos duas colunas."
+
+        for linha in leitor_csv:
+            linhas += 1
+            if len(linha) != numero_colunas:
+                if problema is None:
+                    problema = (
+                        "O arquivo CSV possui linhas com números de colunas "
+                        f"diferentes (linha {linhas})."
+                    )
+                continue
+            for indice, comprimento in enumerate(map(len, linha)):
+                totais[indice] += comprimento
+                if comprimento > maximos[indice]:
+                    maximos[indice] = comprimento
+                if minimos[indice] is None or comprimento < minimos[indice]:
+                    minimos[indice] = comprimento
+                if not comprimento:
+                    vazias[indice] += 1
+
+    estatisticas = {
+        nome: {
+            "caracteres": totais[indice],
+            "media": totais[indice] / linhas if linhas else 0.0,
+            "minimo": minimos[indice] or 0,
+            "maximo": maximos[indice],
+            "vazias": vazias[indice],
+        }
+        for indice, nome in enumerate(cabecalho or [])
+    }
+    return {
+        "valido": problema is None,
+        "problema": problema,
+        "linhas": linhas,
+        "colunas": cabecalho or [],
+        "estatisticas": estatisticas,
+    }
+
+
+def perfilar_csv(caminho_arquivo: str, usar_cache: bool = True) -> dict:
+    """
+    Verifica a estrutura, conta as linhas e mede as colunas de um CSV.
 
     Args:
         caminho_arquivo (str): O caminho para o arquivo CSV.
+        usar_cache (bool, optional): Se True, reaproveita o perfil guardado em
+            ``<arquivo>.perfil.json`` enquanto o tamanho e a data de
+            modificação do arquivo forem os mesmos, e guarda o novo perfil.
+            Default é True.
+
+    Returns:
+        dict: O perfil, com as chaves "valido", "problema" (a primeira
+        restrição violada, ou None), "linhas" (o número de linhas de dados),
+        "colunas" (o cabeçalho) e "estatisticas" (o tamanho dos textos de
+        cada coluna: "caracteres", "media", "minimo", "maximo" e "vazias").
 
     Raises:
         FileNotFoundError: Se o arquivo especificado não for encontrado.
         UnicodeDecodeError: Se ocorrer um erro de decodificação do arquivo CSV.
         csv.Error: Se ocorrer um erro relacionado à leitura do arquivo CSV.
     """
-    # Configurar o logger
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
+    identidade = _identidade_arquivo(caminho_arquivo)
+    if usar_cache:
+        perfil = _ler_perfil(caminho_arquivo, identidade)
+        if perfil is not None:
+            return perfil
+
+    perfil = {"arquivo": identidade, **_calcular_perfil(caminho_arquivo)}
+    if usar_cache:
+        _guardar_perfil(caminho_arquivo, perfil)
+    return perfil
 
-    # Configurar o handler para imprimir os logs no console
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
+def verificar_restricoes_csv(caminho_arquivo: str) -> dict:
+    """Verifica as restrições de um arquivo CSV.
+
+    Args:
+        caminho_arquivo (str): O caminho para o arquivo CSV.
+
+    Returns:
+        dict: O perfil do arquivo, como retornado por ``perfilar_csv``.
+
+    Raises:
+        FileNotFoundError: Se o arquivo especificado não for encontrado.
+        UnicodeDecodeError: Se ocorrer um erro de decodificação do arquivo CSV.
+        csv.Error: Se ocorrer um erro relacionado à leitura do arquivo CSV.
+    """
     try:
-        with open(caminho_arquivo, "r", encoding="utf-8") as arquivo_csv:
-            leitor_csv = csv.reader(arquivo_csv)
-
-            # Verificar se o arquivo está vazio
-            if not any(leitor_csv):
-                logger.info("O arquivo CSV está vazio.")
-                return
-
-            # Verificar se o arquivo possui uma linha de cabeçalho
-            cabecalho = next(leitor_csv, None)
-            if not cabecalho:
-                logger.info("O arquivo CSV não possui uma linha de cabeçalho.")
-                return
-
-            # Verificar o número de colunas
-            numero_colunas = len(cabecalho)
-            if numero_colunas < 2:
-                logger.info("O arquivo CSV deve ter pelo menos duas colunas.")
-                return
-
-            # Verificar o conteúdo das colunas
-            for linha in leitor_csv:
-                if len(linha) != numero_colunas:
-                    logger.info(
-                        "O arquivo CSV possui linhas com números de colunas \
-                            diferentes."
-                    )
-                    return
+        perfil = perfilar_csv(caminho_arquivo)
 
     except FileNotFoundError:
-        logger.exception("O arquivo CSV '%s' não foi encontrado.", caminho_arquivo)
+        logging.exception("O arquivo CSV '%s' não foi encontrado.", caminho_arquivo)
         raise
 
     except UnicodeDecodeError:
-        logger.exception("Erro de decodificação do arquivo CSV '%s'.", caminho_arquivo)
+        logging.exception("Erro de decodificação do arquivo CSV '%s'.", caminho_arquivo)
         raise
 
     except csv.Error:
-        logger.exception("Erro durante a leitura do arquivo CSV '%s'.", caminho_arquivo)
+        logging.exception(
+            "Erro durante a leitura do arquivo CSV '%s'.", caminho_arquivo
+        )
         raise
 
-    logger.info("O arquivo CSV atende a todas as restrições.")
+    if perfil["valido"]:
+        logging.info(
+            "O arquivo CSV atende a todas as restrições (%s linhas).", perfil["linhas"]
+        )
+    else:
+        logging.info(perfil["problema"])
+    return perfil
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+"""Módulo de checkpoint para retomar traduções longas.
+
+O diário de progresso é um arquivo JSON Lines em que cada linha registra uma
+unidade de trabalho concluída. Cada registro é gravado e sincronizado com o
+disco antes de a execução seguir adiante, então uma execução interrompida
+pode ser retomada a partir da última unidade registrada.
+
+Classes:
+- DiarioProgresso: Diário de unidades de trabalho concluídas.
+
+Funções:
+- escrever_csv_atomicamente: Grava um arquivo CSV inteiro ou nada dele.
+"""
+
+import csv
+import json
+import logging
+import os
+from typing import List
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def _gravar_sincronizado(arquivo, texto: str) -> None:
+    """Escreve o texto e só retorna depois que ele estiver no disco."""
+    arquivo.write(texto)
+    arquivo.flush()
+    os.fsync(arquivo.fileno())
+
+
+class DiarioProgresso:
+    """Diário de unidades de trabalho concluídas, gravado em JSON Lines."""
+
+    def __init__(self, caminho: str, configuracao: dict, retomar: bool = False):
+        """
+        Abre o diário.
+
+        A primeira linha guarda a configuração da execução. Ao retomar, ela
+        precisa ser igual à configuração atual.
+
+        Args:
+            caminho (str): O caminho do arquivo do diário.
+            configuracao (dict): Os parâmetros que definem as unidades de
+                trabalho (arquivo de entrada, colunas, tamanho dos blocos...).
+            retomar (bool, optional): Se True, mantém as unidades já
+                registradas. Default é False.
+
+        Raises:
+            ValueError: Se o diário existente foi criado com outra
+                configuração.
+        """
+        self.caminho = caminho
+        self.configuracao = json.loads(json.dumps(configuracao))
+        self.unidades: List[dict] = []
+
+        if retomar and os.path.exists(caminho):
+            registros = self._ler()
+            if registros:
+                if registros[0] != {"configuracao": self.configuracao}:
+                    raise ValueError(
+                        f"O diário '{caminho}' foi criado com outra configuração: "
+                        f"{registros[0]}"
+                    )
+                self.unidades = registros[1:]
+                logging.info(
+                    "Retomando a partir de %s unidades concluídas.", len(self.unidades)
+                )
+                return
+
+        with open(self.caminho, "w", encoding="utf-8") as arquivo:
+            _gravar_sincronizado(
+                arquivo, json.dumps({"configuracao": self.configuracao}) + "\n"
+            )
+
+    def _ler(self) -> List[dict]:
+        """Lê os registros válidos, descartando uma última linha incompleta."""
+        registros = []
+        with open(self.caminho, "r", encoding="utf-8") as arquivo:
+            linhas = arquivo.readlines()
+        for linha in linhas:
+            try:
+                registros.append(json.loads(linha))
+            except json.JSONDecodeError:
+                break
+        if len(registros) < len(linhas):
+            with open(self.caminho, "w", encoding="utf-8") as arquivo:
+                _gravar_sincronizado(
+                    arquivo, "".join(json.dumps(r) + "\n" for r in registros)
+                )
+        return registros
+
+    def registrar(self, unidade: dict) -> None:
+        """
+        Registra uma unidade de trabalho concluída.
+
+        Args:
+            unidade (dict): A descrição da unidade, serializável em JSON.
+        """
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            _gravar_sincronizado(arquivo, json.dumps(unidade) + "\n")
+        self.unidades.append(unidade)
+
+    def concluidas(self) -> List[dict]:
+        """
+        Retorna as unidades já concluídas.
+
+        Returns:
+            List[dict]: As unidades, na ordem em que foram registradas.
+        """
+        return list(self.unidades)
+
+
+def escrever_csv_atomicamente(caminho: str, linhas: List[list]) -> None:
+    """
+    Grava um arquivo CSV de forma que ele exista inteiro ou não exista.
+
+    Args:
+        caminho (str): O caminho do arquivo de saída.
+        linhas (List[list]): As linhas do arquivo.
+    """
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", newline="", encoding="utf-8") as arquivo_csv:
+        csv.writer(arquivo_csv).writerows(linhas)
+        arquivo_csv.flush()
+        os.fsync(arquivo_csv.fileno())
+    os.replace(temporario, caminho)
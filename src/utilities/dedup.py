@@ -0,0 +1,131 @@
+"""Módulo de deduplicação de textos antes da tradução.
+
+Bases como CNN/DailyMail repetem muitos textos: assinaturas de agências,
+destaques e sentenças inteiras aparecem em vários artigos. O deduplicador
+indexa os segmentos únicos (células ou sentenças) de todas as colunas,
+traduz cada um uma única vez e distribui as traduções de volta.
+
+Classes:
+- Deduplicador: Traduz apenas os segmentos únicos de uma lista de textos.
+"""
+
+import logging
+from collections import Counter, OrderedDict
+from typing import Callable, List
+
+from models.chunking import split_sentences
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+class Deduplicador:
+    """Traduz cada segmento único uma única vez."""
+
+    def __init__(self, por_sentenca: bool = True, max_memoria: int = 100_000):
+        """
+        Inicializa o deduplicador.
+
+        Args:
+            por_sentenca (bool, optional): Se True, além das células repetidas,
+                as sentenças repetidas entre células diferentes também são
+                traduzidas uma única vez. Default é True.
+            max_memoria (int, optional): O número máximo de traduções mantidas
+                entre chamadas, para reaproveitar segmentos repetidos em
+                blocos diferentes. Default é 100000.
+        """
+        self.por_sentenca = por_sentenca
+        self.max_memoria = max_memoria
+        self.total_segmentos = 0
+        self.segmentos_traduzidos = 0
+        self._memoria: "OrderedDict[str, str]" = OrderedDict()
+
+    def _traduzir_unicos(
+        self, segmentos: List[str], funcao_traducao: Callable
+    ) -> List[str]:
+        """Traduz os segmentos únicos ainda não memorizados."""
+        self.total_segmentos += len(segmentos)
+        pendentes = [
+            segmento
+            for segmento in dict.fromkeys(segmentos)
+            if segmento not in self._memoria
+        ]
+        self.segmentos_traduzidos += len(pendentes)
+        traducoes = dict(
+            zip(pendentes, funcao_traducao(pendentes) if pendentes else [])
+        )
+
+        resultado = []
+        for segmento in segmentos:
+            if segmento in traducoes:
+                traducao = traducoes[segmento]
+            else:
+                traducao = self._memoria[segmento]
+                self._memoria.move_to_end(segmento)
+            resultado.append(traducao)
+
+        self._memoria.update(traducoes)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+        return resultado
+
+    def traduzir(
+        self, textos: List[str], funcao_traducao: Callable[[List[str]], List[str]]
+    ) -> List[str]:
+        """
+        Traduz textos enviando apenas os segmentos únicos para a tradução.
+
+        Args:
+            textos (List[str]): Os textos, de uma ou mais colunas.
+            funcao_traducao (Callable): Traduz uma lista de segmentos.
+
+        Returns:
+            List[str]: As traduções, na mesma ordem dos textos.
+        """
+        if not self.por_sentenca:
+            return self._traduzir_unicos(textos, funcao_traducao)
+
+        repeticoes = Counter(textos)
+        celulas = list(repeticoes)
+        sentencas_por_celula = [
+            split_sentences(celula) or [celula] for celula in celulas
+        ]
+        sentencas = [s for sentencas in sentencas_por_celula for s in sentencas]
+        traducoes = iter(self._traduzir_unicos(sentencas, funcao_traducao))
+        # as células repetidas também contam como segmentos evitados
+        self.total_segmentos += sum(
+            (repeticoes[celula] - 1) * len(sentencas)
+            for celula, sentencas in zip(celulas, sentencas_por_celula)
+        )
+
+        traducao_celula = {
+            celula: " ".join(next(traducoes) for _ in sentencas)
+            for celula, sentencas in zip(celulas, sentencas_por_celula)
+        }
+        return [traducao_celula[texto] for texto in textos]
+
+    def taxa(self) -> float:
+        """
+        Retorna a fração dos segmentos que não precisou ser traduzida.
+
+        Returns:
+            float: A taxa de deduplicação, entre 0 e 1.
+        """
+        if not self.total_segmentos:
+            return 0.0
+        return 1 - self.segmentos_traduzidos / self.total_segmentos
+
+    def relatorio(self) -> str:
+        """
+        Registra e retorna o resumo da deduplicação.
+
+        Returns:
+            str: O resumo da deduplicação.
+        """
+        resumo = (
+            f"Deduplicação: {self.segmentos_traduzidos} de {self.total_segmentos} "
+            f"segmentos traduzidos ({self.taxa() * 100:.1f}% evitados)"
+        )
+        logging.info(resumo)
+        return resumo
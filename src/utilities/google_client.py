@@ -0,0 +1,331 @@
+"""Módulo do cliente reutilizável do Google Translate.
+
+Em vez de criar um cliente e fazer uma requisição para cada célula, o
+cliente é criado uma única vez, várias células são empacotadas em cada
+requisição (até os limites da API) e as requisições são enviadas em
+paralelo, com limite de taxa e novas tentativas com espera exponencial.
+
+O envio das requisições é feito por um transporte, uma função que recebe
+uma lista de textos e o idioma de destino e devolve as traduções:
+- transporte_google_cloud: Usa a biblioteca ``google-cloud-translate`` com
+    uma conta de serviço.
+- transporte_rest: Usa a API REST v2 diretamente, com conexões HTTP
+    persistentes. Aceita qualquer URL, como a de um servidor local de testes.
+
+Funções:
+- empacotar: Agrupa textos em requisições dentro dos limites da API.
+- obter_cliente: Retorna o cliente compartilhado de uma chave de API.
+
+Classes:
+- ErroTransitorio: Erro de uma requisição que pode ser repetida.
+- LimiteTaxa: Limita o número de requisições por segundo.
+- ClienteTradutor: Traduz listas de textos com requisições em lote.
+"""
+
+import functools
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+#: Número máximo de textos em uma requisição da API v2.
+MAX_SEGMENTOS = 128
+#: Número máximo de caracteres somados dos textos de uma requisição.
+MAX_CARACTERES = 30_000
+#: Códigos HTTP de erros que podem ser repetidos.
+CODIGOS_TRANSITORIOS = (429, 500, 502, 503, 504)
+
+
+class ErroTransitorio(Exception):
+    """Erro de uma requisição que pode ser repetida, como 429 ou 503."""
+
+
+def empacotar(
+    textos: List[str],
+    max_segmentos: int = MAX_SEGMENTOS,
+    max_caracteres: int = MAX_CARACTERES,
+) -> List[List[int]]:
+    """
+    Agrupa textos em requisições dentro dos limites da API.
+
+    Um texto maior que ``max_caracteres`` vai sozinho em uma requisição.
+
+    Args:
+        textos (List[str]): Os textos a serem traduzidos.
+        max_segmentos (int, optional): O número máximo de textos por pacote.
+        max_caracteres (int, optional): O número máximo de caracteres por
+            pacote.
+
+    Returns:
+        List[List[int]]: Os índices dos textos de cada pacote, em ordem.
+    """
+    pacotes, atual, caracteres = [], [], 0
+    for indice, texto in enumerate(textos):
+        if atual and (
+            len(atual) == max_segmentos or caracteres + len(texto) > max_caracteres
+        ):
+            pacotes.append(atual)
+            atual, caracteres = [], 0
+        atual.append(indice)
+        caracteres += len(texto)
+    if atual:
+        pacotes.append(atual)
+    return pacotes
+
+
+class LimiteTaxa:
+    """Balde de fichas que limita o número de requisições por segundo."""
+
+    def __init__(self, requisicoes_por_segundo: float, rajada: int = 1):
+        """
+        Inicializa o limite.
+
+        Args:
+            requisicoes_por_segundo (float): A taxa média permitida.
+            rajada (int, optional): O número de requisições que podem ser
+                enviadas de uma vez depois de um período ocioso. Default é 1.
+        """
+        self.intervalo = 1 / requisicoes_por_segundo
+        self.rajada = rajada
+        self._fichas = float(rajada)
+        self._ultimo = time.monotonic()
+        self._trava = threading.Lock()
+
+    def aguardar(self) -> None:
+        """Bloqueia até que uma nova requisição possa ser enviada."""
+        with self._trava:
+            agora = time.monotonic()
+            self._fichas = min(
+                self.rajada, self._fichas + (agora - self._ultimo) / self.intervalo
+            )
+            self._ultimo = agora
+            self._fichas -= 1
+            espera = -self._fichas * self.intervalo if self._fichas < 0 else 0.0
+        if espera:
+            time.sleep(espera)
+
+
+def transporte_google_cloud(
+    caminho_chave_api: Optional[str] = None, url_api: Optional[str] = None
+) -> Callable[[List[str], str], List[str]]:
+    """
+    Cria um transporte que usa a biblioteca ``google-cloud-translate``.
+
+    O cliente é criado uma única vez e reaproveita suas conexões.
+
+    Args:
+        caminho_chave_api (str, optional): O caminho do arquivo JSON da conta
+            de serviço. Default são as credenciais do ambiente.
+        url_api (str, optional): Outro endereço para a API.
+
+    Returns:
+        Callable: O transporte.
+    """
+    from google.api_core import exceptions
+    from google.cloud import translate_v2 as translate
+
+    opcoes = {"api_endpoint": url_api} if url_api else None
+    if caminho_chave_api:
+        cliente = translate.Client.from_service_account_json(
+            caminho_chave_api, client_options=opcoes
+        )
+    else:
+        cliente = translate.Client(client_options=opcoes)
+    transitorios = (
+        exceptions.TooManyRequests,
+        exceptions.InternalServerError,
+        exceptions.BadGateway,
+        exceptions.ServiceUnavailable,
+        exceptions.GatewayTimeout,
+    )
+
+    def transporte(textos, idioma_destino):
+        try:
+            traducoes = cliente.translate(textos, target_language=idioma_destino)
+        except transitorios as erro:
+            raise ErroTransitorio(str(erro)) from erro
+        return [traducao["translatedText"] for traducao in traducoes]
+
+    return transporte
+
+
+def transporte_rest(
+    url_api: str = "https://translation.googleapis.com",
+    chave_api: Optional[str] = None,
+    tempo_limite: float = 60.0,
+) -> Callable[[List[str], str], List[str]]:
+    """
+    Cria um transporte que chama a API REST v2 diretamente.
+
+    Cada thread mantém a sua própria conexão HTTP aberta entre requisições.
+
+    Args:
+        url_api (str, optional): O endereço da API, por exemplo o de um
+            servidor local de testes.
+        chave_api (str, optional): A chave de API enviada no parâmetro "key".
+        tempo_limite (float, optional): O tempo máximo de cada requisição, em
+            segundos.
+
+    Returns:
+        Callable: O transporte.
+    """
+    url = urllib.parse.urlsplit(url_api)
+    classe_conexao = (
+        http.client.HTTPSConnection
+        if url.scheme == "https"
+        else http.client.HTTPConnection
+    )
+    caminho = url.path.rstrip("/") + "/language/translate/v2"
+    if chave_api:
+        caminho += "?" + urllib.parse.urlencode({"key": chave_api})
+    locais = threading.local()
+
+    def transporte(textos, idioma_destino):
+        corpo = json.dumps({"q": textos, "target": idioma_destino})
+        if getattr(locais, "conexao", None) is None:
+            locais.conexao = classe_conexao(url.netloc, timeout=tempo_limite)
+        try:
+            locais.conexao.request(
+                "POST", caminho, corpo, {"Content-Type": "application/json"}
+            )
+            resposta = locais.conexao.getresponse()
+            conteudo = resposta.read()
+        except (OSError, http.client.HTTPException) as erro:
+            locais.conexao.close()
+            locais.conexao = None
+            raise ErroTransitorio(str(erro)) from erro
+        if resposta.status in CODIGOS_TRANSITORIOS:
+            raise ErroTransitorio(f"HTTP {resposta.status}: {conteudo[:200]!r}")
+        if resposta.status != 200:
+            raise RuntimeError(f"HTTP {resposta.status}: {conteudo[:200]!r}")
+        traducoes = json.loads(conteudo)["data"]["translations"]
+        return [traducao["translatedText"] for traducao in traducoes]
+
+    return transporte
+
+
+class ClienteTradutor:
+    """Traduz listas de textos com requisições em lote, paralelas e limitadas."""
+
+    def __init__(
+        self,
+        transporte: Callable[[List[str], str], List[str]],
+        max_conexoes: int = 8,
+        requisicoes_por_segundo: float = 10.0,
+        max_tentativas: int = 5,
+        espera_inicial: float = 1.0,
+        max_segmentos: int = MAX_SEGMENTOS,
+        max_caracteres: int = MAX_CARACTERES,
+    ):
+        """
+        Inicializa o cliente.
+
+        Args:
+            transporte (Callable): Envia uma requisição com uma lista de
+                textos, como ``transporte_google_cloud`` ou ``transporte_rest``.
+            max_conexoes (int, optional): O número de requisições simultâneas.
+            requisicoes_por_segundo (float, optional): O limite de requisições
+                por segundo, somando todas as conexões.
+            max_tentativas (int, optional): O número de tentativas de cada
+                requisição antes de desistir.
+            espera_inicial (float, optional): A espera, em segundos, antes da
+                segunda tentativa. Dobra a cada nova tentativa.
+            max_segmentos (int, optional): O número máximo de textos por
+                requisição.
+            max_caracteres (int, optional): O número máximo de caracteres por
+                requisição.
+        """
+        self.transporte = transporte
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.max_segmentos = max_segmentos
+        self.max_caracteres = max_caracteres
+        self.requisicoes = 0
+        self.repeticoes = 0
+        # as requisições são enviadas por várias threads
+        self._trava = threading.Lock()
+        self._limite = LimiteTaxa(requisicoes_por_segundo, rajada=max_conexoes)
+        self._executor = ThreadPoolExecutor(max_workers=max_conexoes)
+
+    def _enviar(self, textos: List[str], idioma_destino: str) -> List[str]:
+        """Envia uma requisição, repetindo-a em caso de erro transitório."""
+        for tentativa in range(self.max_tentativas):
+            self._limite.aguardar()
+            with self._trava:
+                self.requisicoes += 1
+            try:
+                return self.transporte(textos, idioma_destino)
+            except ErroTransitorio as erro:
+                if tentativa == self.max_tentativas - 1:
+                    raise
+                espera = self.espera_inicial * 2**tentativa
+                espera *= random.uniform(0.5, 1.5)
+                logging.warning(
+                    "Erro transitório (%s), nova tentativa em %.1fs", erro, espera
+                )
+                with self._trava:
+                    self.repeticoes += 1
+                time.sleep(espera)
+
+    def traduzir(self, textos: List[str], idioma_destino: str) -> List[str]:
+        """
+        Traduz uma lista de textos.
+
+        Args:
+            textos (List[str]): Os textos a serem traduzidos.
+            idioma_destino (str): O idioma de destino.
+
+        Returns:
+            List[str]: As traduções, na mesma ordem dos textos. Textos vazios
+            não são enviados e continuam vazios.
+        """
+        traducoes = list(textos)
+        indices = [indice for indice, texto in enumerate(textos) if texto.strip()]
+        pacotes = [
+            [indices[posicao] for posicao in pacote]
+            for pacote in empacotar(
+                [textos[indice] for indice in indices],
+                self.max_segmentos,
+                self.max_caracteres,
+            )
+        ]
+        futuros = [
+            self._executor.submit(
+                self._enviar, [textos[indice] for indice in pacote], idioma_destino
+            )
+            for pacote in pacotes
+        ]
+        for pacote, futuro in zip(pacotes, futuros):
+            for indice, traducao in zip(pacote, futuro.result()):
+                traducoes[indice] = traducao
+        return traducoes
+
+    def fechar(self) -> None:
+        """Encerra as threads do cliente."""
+        self._executor.shutdown()
+
+
+@functools.lru_cache(maxsize=None)
+def obter_cliente(caminho_chave_api: Optional[str] = None) -> ClienteTradutor:
+    """
+    Retorna o cliente compartilhado de uma chave de API.
+
+    O cliente é criado na primeira chamada e reutilizado nas seguintes.
+
+    Args:
+        caminho_chave_api (str, optional): O caminho do arquivo JSON da conta
+            de serviço.
+
+    Returns:
+        ClienteTradutor: O cliente.
+    """
+    return ClienteTradutor(transporte_google_cloud(caminho_chave_api))
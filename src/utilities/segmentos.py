@@ -0,0 +1,369 @@
+"""Módulo de armazenamento de segmentos de texto em arquivos únicos.
+
+Em vez de um arquivo CSV por subtexto, os segmentos de um arquivo dividido
+são gravados em poucos shards JSON Lines, um registro
+``{"row_id", "part_id", "text"}`` por segmento, acompanhados de um índice
+com a posição (shard e deslocamento em bytes) do primeiro segmento de cada
+linha. Os tradutores e o ``merge.py`` leem os shards sequencialmente; o
+índice permite buscar uma linha qualquer sem ler os shards inteiros.
+
+Para um conjunto de nome base ``artigo``, os arquivos são:
+- ``artigo.segmentos-00000.jsonl``, ``artigo.segmentos-00001.jsonl``, ...
+- ``artigo.indice.jsonl``: a primeira linha guarda os metadados do conjunto
+    (como o nome da coluna) e as seguintes, uma linha de texto cada.
+
+Funções:
+- listar_conjuntos: Lista os conjuntos de segmentos de uma pasta.
+- remover_conjuntos: Remove os conjuntos de segmentos de uma pasta.
+- traduzir_conjunto: Traduz um conjunto de segmentos em outra pasta.
+
+Classes:
+- EscritorSegmentos: Grava as linhas divididas em shards com índice.
+- LeitorSegmentos: Lê um conjunto de segmentos.
+"""
+
+import glob
+import itertools
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from utilities.checkpoint import DiarioProgresso
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+SUFIXO_INDICE = ".indice.jsonl"
+
+
+def _caminho_shard(pasta: str, nome_base: str, numero: int) -> str:
+    """Retorna o caminho de um shard do conjunto."""
+    return os.path.join(pasta, f"{nome_base}.segmentos-{numero:05d}.jsonl")
+
+
+def _listar_shards(pasta: str, nome_base: str) -> List[str]:
+    """Retorna os caminhos dos shards existentes do conjunto, em ordem."""
+    padrao = glob.escape(nome_base) + ".segmentos-*.jsonl"
+    return sorted(glob.glob(os.path.join(glob.escape(pasta), padrao)))
+
+
+def listar_conjuntos(pasta: str) -> List[str]:
+    """
+    Lista os conjuntos de segmentos de uma pasta.
+
+    Args:
+        pasta (str): O caminho da pasta.
+
+    Returns:
+        List[str]: Os nomes base dos conjuntos, em ordem.
+    """
+    return sorted(
+        arquivo[: -len(SUFIXO_INDICE)]
+        for arquivo in os.listdir(pasta)
+        if arquivo.endswith(SUFIXO_INDICE)
+    )
+
+
+def remover_conjuntos(pasta: str) -> None:
+    """
+    Remove os shards e os índices de todos os conjuntos de uma pasta.
+
+    Args:
+        pasta (str): O caminho da pasta.
+    """
+    for arquivo in glob.glob(os.path.join(glob.escape(pasta), "*.segmentos-*.jsonl")):
+        os.remove(arquivo)
+    for arquivo in glob.glob(os.path.join(glob.escape(pasta), "*" + SUFIXO_INDICE)):
+        os.remove(arquivo)
+
+
+class EscritorSegmentos:
+    """Grava as linhas divididas em shards JSON Lines com um índice."""
+
+    def __init__(
+        self,
+        pasta: str,
+        nome_base: str,
+        metadados: Optional[dict] = None,
+        segmentos_por_shard: int = 100_000,
+        posicao: Optional[dict] = None,
+    ):
+        """
+        Cria um conjunto vazio, removendo um conjunto anterior de mesmo nome.
+
+        Args:
+            pasta (str): A pasta do conjunto.
+            nome_base (str): O nome base dos arquivos do conjunto.
+            metadados (dict, optional): Guardados na primeira linha do índice,
+                por exemplo ``{"coluna": "article"}``.
+            segmentos_por_shard (int, optional): O número de segmentos a partir
+                do qual um novo shard é iniciado. As partes de uma linha ficam
+                sempre no mesmo shard. Default é 100000.
+            posicao (dict, optional): Uma posição retornada por ``posicao``.
+                Se fornecida, o conjunto existente é mantido até ela, o que
+                foi gravado depois é descartado e a escrita continua dali.
+        """
+        self.pasta = pasta
+        self.nome_base = nome_base
+        self.segmentos_por_shard = segmentos_por_shard
+        caminho_indice = os.path.join(pasta, nome_base + SUFIXO_INDICE)
+        if posicao is not None:
+            self._continuar(caminho_indice, posicao)
+            return
+        self.total_linhas = 0
+        self.total_segmentos = 0
+        for arquivo in _listar_shards(pasta, nome_base):
+            os.remove(arquivo)
+        self._indice = open(caminho_indice, "w", encoding="utf-8")
+        self._indice.write(json.dumps(metadados or {}, ensure_ascii=False) + "\n")
+        self._numero_shard = -1
+        self._shard = None
+        self._segmentos_shard = 0
+
+    def _continuar(self, caminho_indice: str, posicao: dict) -> None:
+        """Reabre o conjunto na posição, descartando o que veio depois dela."""
+        self.total_linhas = posicao["linhas"]
+        self.total_segmentos = posicao["segmentos"]
+        self._numero_shard = posicao["shard"]
+        self._segmentos_shard = posicao["segmentos_shard"]
+        for arquivo in _listar_shards(self.pasta, self.nome_base):
+            numero = int(arquivo.rsplit("-", 1)[1].split(".")[0])
+            if numero > self._numero_shard:
+                os.remove(arquivo)
+        self._shard = None
+        if self._numero_shard >= 0:
+            caminho = _caminho_shard(self.pasta, self.nome_base, self._numero_shard)
+            os.truncate(caminho, posicao["bytes_shard"])
+            self._shard = open(caminho, "ab")
+        os.truncate(caminho_indice, posicao["bytes_indice"])
+        self._indice = open(caminho_indice, "a", encoding="utf-8")
+
+    def posicao(self) -> dict:
+        """
+        Grava no disco o que foi escrito e retorna a posição atual.
+
+        Returns:
+            dict: A posição, que pode ser registrada em um diário e passada
+            ao construtor para continuar o conjunto após uma interrupção.
+        """
+        for arquivo in (self._shard, self._indice):
+            if arquivo is not None:
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+        return {
+            "linhas": self.total_linhas,
+            "segmentos": self.total_segmentos,
+            "shard": self._numero_shard,
+            "segmentos_shard": self._segmentos_shard,
+            "bytes_shard": self._shard.tell() if self._shard is not None else 0,
+            "bytes_indice": self._indice.tell(),
+        }
+
+    def _novo_shard(self) -> None:
+        """Fecha o shard atual e abre o seguinte."""
+        if self._shard is not None:
+            self._shard.close()
+        self._numero_shard += 1
+        self._shard = open(
+            _caminho_shard(self.pasta, self.nome_base, self._numero_shard), "wb"
+        )
+        self._segmentos_shard = 0
+
+    def escrever_linha(self, row_id: int, textos: List[str]) -> None:
+        """
+        Grava as partes de uma linha.
+
+        Args:
+            row_id (int): O número da linha no arquivo original.
+            textos (List[str]): As partes da linha, em ordem.
+        """
+        if self._shard is None or self._segmentos_shard >= self.segmentos_por_shard:
+            self._novo_shard()
+        entrada = {
+            "row_id": row_id,
+            "shard": os.path.basename(self._shard.name),
+            "offset": self._shard.tell(),
+            "partes": len(textos),
+        }
+        for part_id, texto in enumerate(textos, start=1):
+            registro = {"row_id": row_id, "part_id": part_id, "text": texto}
+            self._shard.write(
+                (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+            )
+        self._indice.write(json.dumps(entrada) + "\n")
+        self._segmentos_shard += len(textos)
+        self.total_segmentos += len(textos)
+        self.total_linhas += 1
+
+    def fechar(self) -> None:
+        """Fecha o shard atual e o índice."""
+        if self._shard is not None:
+            self._shard.close()
+        self._indice.close()
+
+    def __enter__(self):
+        """Permite o uso com ``with``."""
+        return self
+
+    def __exit__(self, *excecao):
+        """Fecha os arquivos ao sair do bloco ``with``."""
+        self.fechar()
+
+
+class LeitorSegmentos:
+    """Lê um conjunto de segmentos gravado por ``EscritorSegmentos``."""
+
+    def __init__(self, pasta: str, nome_base: str):
+        """
+        Abre o conjunto.
+
+        Args:
+            pasta (str): A pasta do conjunto.
+            nome_base (str): O nome base dos arquivos do conjunto.
+        """
+        self.pasta = pasta
+        self.nome_base = nome_base
+        self._caminho_indice = os.path.join(pasta, nome_base + SUFIXO_INDICE)
+        with open(self._caminho_indice, "r", encoding="utf-8") as indice:
+            self.metadados = json.loads(indice.readline())
+        self._posicoes: Optional[Dict[int, dict]] = None
+
+    def shards(self) -> List[str]:
+        """Retorna os caminhos dos shards, em ordem."""
+        return _listar_shards(self.pasta, self.nome_base)
+
+    def __iter__(self) -> Iterator[dict]:
+        """Percorre os segmentos sequencialmente, shard a shard."""
+        for caminho in self.shards():
+            with open(caminho, "r", encoding="utf-8") as shard:
+                for linha in shard:
+                    yield json.loads(linha)
+
+    def linhas(self) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Percorre as linhas sequencialmente.
+
+        Yields:
+            Tuple[int, List[str]]: O número da linha e as suas partes.
+        """
+        row_id, textos = None, []
+        for segmento in self:
+            if textos and segmento["row_id"] != row_id:
+                yield row_id, textos
+                textos = []
+            row_id = segmento["row_id"]
+            textos.append(segmento["text"])
+        if textos:
+            yield row_id, textos
+
+    def buscar(self, row_id: int) -> List[str]:
+        """
+        Lê as partes de uma linha usando o índice.
+
+        Args:
+            row_id (int): O número da linha.
+
+        Returns:
+            List[str]: As partes da linha.
+
+        Raises:
+            KeyError: Se a linha não estiver no conjunto.
+        """
+        if self._posicoes is None:
+            with open(self._caminho_indice, "r", encoding="utf-8") as indice:
+                next(indice)
+                entradas = (json.loads(linha) for linha in indice)
+                self._posicoes = {entrada["row_id"]: entrada for entrada in entradas}
+        entrada = self._posicoes[row_id]
+        with open(os.path.join(self.pasta, entrada["shard"]), "rb") as shard:
+            shard.seek(entrada["offset"])
+            return [
+                json.loads(shard.readline())["text"] for _ in range(entrada["partes"])
+            ]
+
+
+def traduzir_conjunto(
+    pasta_entrada: str,
+    pasta_saida: str,
+    nome_base: str,
+    funcao_traducao: Callable[[List[str]], List[str]],
+    tamanho_lote: int = 64,
+    diario: Optional[DiarioProgresso] = None,
+) -> int:
+    """
+    Traduz um conjunto de segmentos, gravando o resultado em outra pasta.
+
+    Os segmentos são lidos em ordem e traduzidos em lotes; a saída mantém o
+    ``row_id`` e o ``part_id`` de cada segmento e tem o seu próprio índice.
+
+    Com um diário de progresso, a posição da saída é registrada após cada
+    lote, e uma execução retomada continua a partir do último lote
+    registrado em vez de traduzir o conjunto inteiro de novo.
+
+    Args:
+        pasta_entrada (str): A pasta do conjunto original.
+        pasta_saida (str): A pasta do conjunto traduzido.
+        nome_base (str): O nome base do conjunto.
+        funcao_traducao (Callable): Traduz uma lista de textos.
+        tamanho_lote (int, optional): O número mínimo de segmentos enviados
+            juntos para a tradução. Default é 64.
+        diario (DiarioProgresso, optional): O diário em que os lotes
+            concluídos são registrados.
+
+    Returns:
+        int: O número de segmentos traduzidos.
+    """
+    registros = [
+        unidade
+        for unidade in (diario.concluidas() if diario is not None else [])
+        if unidade.get("conjunto") == nome_base
+    ]
+    posicao = registros[-1]["posicao"] if registros else None
+    if registros and registros[-1].get("concluido"):
+        return posicao["segmentos"]
+
+    leitor = LeitorSegmentos(pasta_entrada, nome_base)
+
+    def traduzir_lote(escritor, lote):
+        textos = [texto for _, partes in lote for texto in partes]
+        traducoes = iter(funcao_traducao(textos))
+        for row_id, partes in lote:
+            escritor.escrever_linha(row_id, [next(traducoes) for _ in partes])
+        if diario is not None:
+            diario.registrar({"conjunto": nome_base, "posicao": escritor.posicao()})
+
+    with EscritorSegmentos(
+        pasta_saida, nome_base, leitor.metadados, posicao=posicao
+    ) as escritor:
+        if posicao is not None:
+            logging.info(
+                "Retomando o conjunto %s após %s linhas.", nome_base, posicao["linhas"]
+            )
+        lote, segmentos = [], 0
+        # as linhas já traduzidas são puladas
+        linhas = itertools.islice(leitor.linhas(), escritor.total_linhas, None)
+        for row_id, partes in linhas:
+            lote.append((row_id, partes))
+            segmentos += len(partes)
+            if segmentos >= tamanho_lote:
+                traduzir_lote(escritor, lote)
+                lote, segmentos = [], 0
+        if lote:
+            traduzir_lote(escritor, lote)
+        if diario is not None:
+            diario.registrar(
+                {
+                    "conjunto": nome_base,
+                    "posicao": escritor.posicao(),
+                    "concluido": True,
+                }
+            )
+
+    logging.info(
+        "Conjunto traduzido gerado: %s (%s segmentos)",
+        os.path.join(pasta_saida, nome_base),
+        escritor.total_segmentos,
+    )
+    return escritor.total_segmentos
@@ -0,0 +1,244 @@
+"""Módulo de leitura e escrita de tabelas em blocos.
+
+Permite processar arquivos maiores que a memória disponível: a entrada é
+lida em blocos com um número fixo de linhas e cada bloco processado é
+acrescentado imediatamente ao arquivo de saída.
+
+Além de CSV e JSON Lines, aceita os formatos colunares Parquet e Arrow
+(IPC/Feather), que são lidos por mapeamento de memória e apenas nas colunas
+pedidas, e escritos com um grupo de linhas (ou lote) por bloco.
+
+Funções:
+- formato_arquivo: Identifica o formato de um arquivo pela extensão.
+- ler_em_blocos: Lê um arquivo CSV, Parquet ou Arrow em blocos de linhas.
+
+Classes:
+- EscritorBlocos: Acrescenta blocos de linhas a um arquivo de saída.
+"""
+
+import os
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+FORMATOS_SAIDA = ("csv", "jsonl", "parquet", "arrow")
+FORMATOS_COLUNARES = ("parquet", "arrow")
+EXTENSOES = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def formato_arquivo(caminho_arquivo: str) -> str:
+    """
+    Identifica o formato de um arquivo pela extensão.
+
+    Args:
+        caminho_arquivo (str): O caminho do arquivo.
+
+    Returns:
+        str: "csv", "jsonl", "parquet" ou "arrow". Extensões desconhecidas
+        são tratadas como CSV.
+    """
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    return EXTENSOES.get(extensao, "csv")
+
+
+def _ler_lotes_colunares(
+    caminho_arquivo: str, tamanho_bloco: int, colunas: Optional[List[str]]
+):
+    """Lê os lotes de um arquivo Parquet ou Arrow mapeado em memória."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if formato_arquivo(caminho_arquivo) == "parquet":
+        arquivo = pq.ParquetFile(caminho_arquivo, memory_map=True)
+        yield from arquivo.iter_batches(batch_size=tamanho_bloco, columns=colunas)
+        return
+
+    with pa.memory_map(caminho_arquivo) as origem:
+        tabela = pa.ipc.open_file(origem).read_all()
+        if colunas is not None:
+            tabela = tabela.select(colunas)
+        yield from tabela.to_batches(max_chunksize=tamanho_bloco)
+
+
+def _ler_colunar_em_blocos(
+    caminho_arquivo: str,
+    tamanho_bloco: int,
+    colunas: Optional[List[str]],
+    max_linhas: Optional[int],
+    inicio: int,
+) -> Iterator[pd.DataFrame]:
+    """Lê um arquivo Parquet ou Arrow em blocos de linhas."""
+    linha = 0
+    for lote in _ler_lotes_colunares(caminho_arquivo, tamanho_bloco, colunas):
+        fim = linha + lote.num_rows
+        if max_linhas is not None:
+            fim = min(fim, max_linhas)
+        if fim > inicio:
+            primeira = max(inicio, linha)
+            bloco = lote.slice(primeira - linha, fim - primeira).to_pandas()
+            bloco.index = pd.RangeIndex(primeira, fim)
+            yield bloco
+        linha += lote.num_rows
+        if max_linhas is not None and linha >= max_linhas:
+            return
+
+
+def ler_em_blocos(
+    caminho_arquivo: str,
+    tamanho_bloco: int = 1000,
+    colunas: Optional[List[str]] = None,
+    max_linhas: Optional[int] = None,
+    inicio: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """
+    Lê um arquivo CSV, Parquet ou Arrow em blocos de linhas.
+
+    Args:
+        caminho_arquivo (str): O caminho do arquivo. O formato é identificado
+            pela extensão.
+        tamanho_bloco (int, optional): O número de linhas de cada bloco.
+        colunas (List[str], optional): As colunas a serem lidas. Default são
+            todas.
+        max_linhas (int, optional): O número máximo de linhas lidas. Default
+            é o arquivo inteiro.
+        inicio (int, optional): O número de linhas puladas no começo do
+            arquivo, sem convertê-las. Default é 0.
+
+    Yields:
+        pd.DataFrame: Os blocos, com o índice contínuo entre eles e contado a
+        partir do começo do arquivo.
+    """
+    if formato_arquivo(caminho_arquivo) in FORMATOS_COLUNARES:
+        yield from _ler_colunar_em_blocos(
+            caminho_arquivo, tamanho_bloco, colunas, max_linhas, inicio
+        )
+        return
+
+    if max_linhas is not None:
+        max_linhas = max(max_linhas - inicio, 0)
+    with pd.read_csv(
+        caminho_arquivo,
+        chunksize=tamanho_bloco,
+        usecols=colunas,
+        nrows=max_linhas,
+        skiprows=range(1, inicio + 1),
+    ) as leitor:
+        for bloco in leitor:
+            if bloco.empty:
+                # ao retomar um arquivo já inteiramente processado
+                continue
+            bloco.index += inicio
+            yield bloco
+
+
+class EscritorBlocos:
+    """Acrescenta blocos de linhas a um arquivo CSV, JSON Lines, Parquet ou Arrow."""
+
+    def __init__(
+        self,
+        caminho_arquivo: str,
+        formato: str = "csv",
+        retomar_em: int = 0,
+        linhas_escritas: int = 0,
+    ):
+        """
+        Cria o arquivo de saída, ou reabre um arquivo parcial para retomá-lo.
+
+        Args:
+            caminho_arquivo (str): O caminho do arquivo de saída.
+            formato (str, optional): "csv", "jsonl", "parquet" ou "arrow".
+                Default é "csv".
+            retomar_em (int, optional): O tamanho, em bytes, da parte válida
+                de um arquivo parcial. O que vier depois é descartado e os
+                novos blocos são acrescentados a partir daí. Default é 0, que
+                cria um arquivo novo.
+            linhas_escritas (int, optional): O número de linhas já presentes
+                no arquivo parcial.
+
+        Raises:
+            ValueError: Se o formato não for suportado, ou se for pedido para
+                retomar um arquivo colunar, que só é válido depois de fechado.
+        """
+        if formato not in FORMATOS_SAIDA:
+            raise ValueError(
+                f"Formato de saída '{formato}' inválido. Use um de {FORMATOS_SAIDA}."
+            )
+        if retomar_em and formato in FORMATOS_COLUNARES:
+            raise ValueError(f"Não é possível retomar um arquivo {formato}.")
+        self.caminho_arquivo = caminho_arquivo
+        self.formato = formato
+        self.linhas_escritas = linhas_escritas if retomar_em else 0
+        self._escritor_colunar = None
+        self._esquema = None
+        if formato in FORMATOS_COLUNARES:
+            self._arquivo = open(caminho_arquivo, "wb")
+            return
+        if retomar_em:
+            os.truncate(caminho_arquivo, retomar_em)
+        self._arquivo = open(
+            caminho_arquivo, "a" if retomar_em else "w", encoding="utf-8", newline=""
+        )
+
+    def _escrever_colunar(self, bloco: pd.DataFrame) -> None:
+        """Escreve o bloco como um grupo de linhas Parquet ou um lote Arrow."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tabela = pa.Table.from_pandas(bloco, preserve_index=True)
+        if self._escritor_colunar is None:
+            self._esquema = tabela.schema
+            if self.formato == "parquet":
+                self._escritor_colunar = pq.ParquetWriter(self._arquivo, self._esquema)
+            else:
+                self._escritor_colunar = pa.ipc.new_file(self._arquivo, self._esquema)
+        else:
+            # colunas sem nenhum valor no bloco são inferidas como nulas
+            tabela = tabela.cast(self._esquema)
+        self._escritor_colunar.write_table(tabela)
+
+    def escrever(self, bloco: pd.DataFrame) -> None:
+        """
+        Acrescenta um bloco ao arquivo e o sincroniza com o disco.
+
+        Args:
+            bloco (pd.DataFrame): As linhas a serem escritas.
+        """
+        if self.formato in FORMATOS_COLUNARES:
+            self._escrever_colunar(bloco)
+        elif self.formato == "csv":
+            bloco.to_csv(self._arquivo, header=self.linhas_escritas == 0)
+        else:
+            texto = bloco.to_json(orient="records", lines=True, force_ascii=False)
+            self._arquivo.write(texto if texto.endswith("\n") else texto + "\n")
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self.linhas_escritas += len(bloco)
+
+    def tamanho(self) -> int:
+        """
+        Retorna o tamanho atual do arquivo de saída.
+
+        Returns:
+            int: O tamanho em bytes do que já foi escrito.
+        """
+        return os.fstat(self._arquivo.fileno()).st_size
+
+    def fechar(self) -> None:
+        """Fecha o arquivo de saída."""
+        if self._escritor_colunar is not None:
+            self._escritor_colunar.close()
+        self._arquivo.close()
+
+    def __enter__(self):
+        """Permite o uso com ``with``."""
+        return self
+
+    def __exit__(self, *excecao):
+        """Fecha o arquivo ao sair do bloco ``with``."""
+        self.fechar()
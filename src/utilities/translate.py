@@ -6,10 +6,15 @@
 - traduzir_csv: Traduz os arquivos CSV presentes na pasta de entrada.
 - obter_arquivos_csv: Obtém a lista de arquivos CSV presentes em uma pasta.
 - traduzir_arquivo_csv: Traduz um arquivo CSV para o idioma de destino.
+- criar_funcao_traducao: Cria a função que traduz uma lista de textos.
 - traduzir_texto:
     Realiza a tradução de um texto para o idioma de destino utilizando a
     API do Google Translate.
 
+As células de cada arquivo são enviadas em lote, com várias células por
+requisição e várias requisições simultâneas (veja
+``utilities.google_client``).
+
 Exemplo de uso:
     O módulo pode ser executado como um script, solicitando ao usuário os
     parâmetros necessários:
@@ -25,7 +30,14 @@
 import logging
 import os
 
-from google.cloud import translate_v2 as translate
+from utilities.cache import CacheTraducoes
+from utilities.checkpoint import DiarioProgresso, escrever_csv_atomicamente
+from utilities.google_client import (
+    ClienteTradutor,
+    obter_cliente,
+    transporte_google_cloud,
+)
+from utilities.segmentos import listar_conjuntos, traduzir_conjunto
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -37,6 +49,10 @@ def traduzir_csv(
     caminho_pasta_saida=None,
     idioma_destino="pt",
     caminho_chave_api=None,
+    caminho_cache=None,
+    retomar=False,
+    max_conexoes=8,
+    requisicoes_por_segundo=10.0,
 ):
     """Traduz os arquivos CSV presentes na pasta de entrada.
 
@@ -55,6 +71,16 @@ def traduzir_csv(
         caminho_chave_api (str, optional):
             O caminho do arquivo JSON contendo a chave de API do Google
             Translate.
+        caminho_cache (str, optional):
+            O caminho do cache de traduções. Textos já traduzidos em
+            execuções anteriores não são enviados novamente para a API.
+        retomar (bool, optional):
+            Se True, retoma uma execução interrompida, pulando os arquivos
+            registrados no diário de progresso da pasta de saída.
+        max_conexoes (int, optional):
+            O número de requisições simultâneas à API. Default é 8.
+        requisicoes_por_segundo (float, optional):
+            O limite de requisições por segundo à API. Default é 10.
     """
     if not os.path.exists(caminho_pasta_entrada):
         logging.error("A pasta de entrada '%s' não existe.", caminho_pasta_entrada)
@@ -62,12 +88,26 @@ def traduzir_csv(
 
     if caminho_pasta_saida is None:
         caminho_pasta_saida = os.path.join(caminho_pasta_entrada, "traducao")
-    elif not os.path.exists(caminho_pasta_saida):
-        os.makedirs(caminho_pasta_saida)
+    os.makedirs(caminho_pasta_saida, exist_ok=True)
 
     arquivos_csv = obter_arquivos_csv(caminho_pasta_entrada)
+    cache = CacheTraducoes(caminho_cache) if caminho_cache else None
+    cliente = ClienteTradutor(
+        transporte_google_cloud(caminho_chave_api),
+        max_conexoes=max_conexoes,
+        requisicoes_por_segundo=requisicoes_por_segundo,
+    )
+    diario = DiarioProgresso(
+        os.path.join(caminho_pasta_saida, ".progresso.jsonl"),
+        {"entrada": caminho_pasta_entrada, "idioma_destino": idioma_destino},
+        retomar=retomar,
+    )
+    concluidos = diario.concluidas()
+    arquivos_concluidos = {u["arquivo"] for u in concluidos if "arquivo" in u}
 
     for arquivo_csv in arquivos_csv:
+        if arquivo_csv in arquivos_concluidos:
+            continue
         caminho_arquivo_entrada = os.path.join(caminho_pasta_entrada, arquivo_csv)
         caminho_arquivo_saida = os.path.join(caminho_pasta_saida, arquivo_csv)
 
@@ -76,8 +116,27 @@ def traduzir_csv(
             caminho_arquivo_saida,
             idioma_destino,
             caminho_chave_api,
+            cache,
+            cliente,
+        )
+        diario.registrar({"arquivo": arquivo_csv})
+
+    # conjuntos de segmentos gerados pelo break_text com formato "segmentos"
+    for conjunto in listar_conjuntos(caminho_pasta_entrada):
+        # cada lote é registrado no diário, e os já traduzidos são pulados
+        traduzir_conjunto(
+            caminho_pasta_entrada,
+            caminho_pasta_saida,
+            conjunto,
+            criar_funcao_traducao(idioma_destino, cache, cliente),
+            diario=diario,
         )
 
+    cliente.fechar()
+    if cache is not None:
+        cache.relatorio()
+        cache.fechar()
+
 
 def obter_arquivos_csv(caminho_pasta):
     """
@@ -96,7 +155,12 @@ def obter_arquivos_csv(caminho_pasta):
 
 
 def traduzir_arquivo_csv(
-    caminho_arquivo_entrada, caminho_arquivo_saida, idioma_destino, caminho_chave_api
+    caminho_arquivo_entrada,
+    caminho_arquivo_saida,
+    idioma_destino,
+    caminho_chave_api,
+    cache=None,
+    cliente=None,
 ):
     """Traduz CSV de entrada para o idioma de destino e salva.
 
@@ -108,28 +172,51 @@ def traduzir_arquivo_csv(
         caminho_chave_api (str):
             O caminho do arquivo JSON contendo a chave de API do Google
             Translate.
+        cache (CacheTraducoes, optional): O cache consultado antes da API.
+        cliente (ClienteTradutor, optional): O cliente usado nas requisições.
+            Default é o cliente compartilhado da chave de API.
     """
-    traducoes = []
-
     with open(caminho_arquivo_entrada, "r", encoding="utf-8") as arquivo_csv:
-        leitor_csv = csv.reader(arquivo_csv)
-
-        for linha in leitor_csv:
-            texto = linha[0]
-            traducao = traduzir_texto(texto, idioma_destino, caminho_chave_api)
-            traducoes.append([traducao])
+        textos = [linha[0] for linha in csv.reader(arquivo_csv)]
 
-    with open(caminho_arquivo_saida, "w", newline="", encoding="utf-8") as arquivo_csv:
+    if cliente is None:
+        cliente = obter_cliente(caminho_chave_api)
+    traduzir_textos = criar_funcao_traducao(idioma_destino, cache, cliente)
+    traducoes = [[traducao] for traducao in traduzir_textos(textos)]
 
-        escritor_csv = csv.writer(arquivo_csv)
-        escritor_csv.writerows(traducoes)
+    escrever_csv_atomicamente(caminho_arquivo_saida, traducoes)
 
     logging.info("Arquivo CSV traduzido gerado: %s", caminho_arquivo_saida)
 
 
+def criar_funcao_traducao(idioma_destino, cache, cliente):
+    """Cria a função que traduz uma lista de textos, consultando o cache.
+
+    Args:
+        idioma_destino (str): O idioma de destino para a tradução.
+        cache (CacheTraducoes): O cache consultado antes da API, ou None.
+        cliente (ClienteTradutor): O cliente usado nas requisições.
+
+    Returns:
+        Callable: Traduz uma lista de textos.
+    """
+
+    def traduzir_textos(textos):
+        return cliente.traduzir(textos, idioma_destino)
+
+    if cache is None:
+        return traduzir_textos
+    return lambda textos: cache.traduzir(
+        "google", {"idioma_destino": idioma_destino}, textos, traduzir_textos
+    )
+
+
 def traduzir_texto(texto, idioma_destino, caminho_chave_api):
     """Realiza a tradução utilizando a API do Google Translate.
 
+    Para traduzir muitos textos, prefira ``ClienteTradutor.traduzir``, que
+    envia vários textos por requisição.
+
     Args:
         texto (str): O texto a ser traduzido.
         idioma_destino (str): O idioma de destino para a tradução.
@@ -140,10 +227,7 @@ def traduzir_texto(texto, idioma_destino, caminho_chave_api):
     Returns:
         str: O texto traduzido.
     """
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = caminho_chave_api
-    client = translate.Client()
-    traducao = client.translate(texto, target_language=idioma_destino)
-    return traducao["translatedText"]
+    return obter_cliente(caminho_chave_api).traduzir([texto], idioma_destino)[0]
 
 
 if __name__ == "__main__":
@@ -22,14 +22,23 @@
 import logging
 import os
 
-from transformers import MarianMTModel, MarianTokenizer
+from models.registry import configured, registry
+from utilities.cache import CacheTraducoes
+from utilities.checkpoint import DiarioProgresso, escrever_csv_atomicamente
+from utilities.segmentos import listar_conjuntos, traduzir_conjunto
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
-def traduzir_csv(caminho_pasta_entrada, caminho_pasta_saida=None, idioma_destino="pt"):
+def traduzir_csv(
+    caminho_pasta_entrada,
+    caminho_pasta_saida=None,
+    idioma_destino="pt",
+    caminho_cache=None,
+    retomar=False,
+):
     """
     Traduz os arquivos CSV presentes na pasta de entrada para o idioma de
     destino e salva os arquivos traduzidos na pasta de saída.
@@ -46,6 +55,12 @@ def traduzir_csv(caminho_pasta_entrada, caminho_pasta_saida=None, idioma_destino
             da pasta de entrada.
         idioma_destino (str, optional):
             O idioma de destino para a tradução. Default é "pt" (português).
+        caminho_cache (str, optional):
+            O caminho do cache de traduções. Textos já traduzidos em
+            execuções anteriores não são traduzidos novamente.
+        retomar (bool, optional):
+            Se True, retoma uma execução interrompida, pulando os arquivos
+            registrados no diário de progresso da pasta de saída.
 
     """
     if not os.path.exists(caminho_pasta_entrada):
@@ -54,17 +69,44 @@ def traduzir_csv(caminho_pasta_entrada, caminho_pasta_saida=None, idioma_destino
 
     if caminho_pasta_saida is None:
         caminho_pasta_saida = os.path.join(caminho_pasta_entrada, "traducao")
-    elif not os.path.exists(caminho_pasta_saida):
-        os.makedirs(caminho_pasta_saida)
+    os.makedirs(caminho_pasta_saida, exist_ok=True)
 
     arquivos_csv = obter_arquivos_csv(caminho_pasta_entrada)
     print("arquivos_csv", arquivos_csv)
-    for arquivo_csv in arquivos_csv:
-        caminho_arquivo_entrada = os.path.join(caminho_pasta_entrada, arquivo_csv)
-        caminho_arquivo_saida = os.path.join(caminho_pasta_saida, arquivo_csv)
-        traduzir_arquivo_csv(
-            caminho_arquivo_entrada, caminho_arquivo_saida, idioma_destino
-        )
+    cache = CacheTraducoes(caminho_cache) if caminho_cache else None
+    diario = DiarioProgresso(
+        os.path.join(caminho_pasta_saida, ".progresso.jsonl"),
+        {"entrada": caminho_pasta_entrada, "idioma_destino": idioma_destino},
+        retomar=retomar,
+    )
+    modelo = registry.get("marian")
+    with configured(modelo, cache=cache):
+        concluidos = diario.concluidas()
+        arquivos_concluidos = {u["arquivo"] for u in concluidos if "arquivo" in u}
+        for arquivo_csv in arquivos_csv:
+            if arquivo_csv in arquivos_concluidos:
+                continue
+            caminho_arquivo_entrada = os.path.join(caminho_pasta_entrada, arquivo_csv)
+            caminho_arquivo_saida = os.path.join(caminho_pasta_saida, arquivo_csv)
+            traduzir_arquivo_csv(
+                caminho_arquivo_entrada, caminho_arquivo_saida, idioma_destino, cache
+            )
+            diario.registrar({"arquivo": arquivo_csv})
+
+        # conjuntos de segmentos gerados pelo break_text com formato "segmentos"
+        for conjunto in listar_conjuntos(caminho_pasta_entrada):
+            # cada lote é registrado no diário, e os já traduzidos são pulados
+            traduzir_conjunto(
+                caminho_pasta_entrada,
+                caminho_pasta_saida,
+                conjunto,
+                modelo.translate_batch,
+                diario=diario,
+            )
+
+    if cache is not None:
+        cache.relatorio()
+        cache.fechar()
 
 
 def obter_arquivos_csv(caminho_pasta):
@@ -84,7 +126,7 @@ def obter_arquivos_csv(caminho_pasta):
 
 
 def traduzir_arquivo_csv(
-    caminho_arquivo_entrada, caminho_arquivo_saida, idioma_destino
+    caminho_arquivo_entrada, caminho_arquivo_saida, idioma_destino, cache=None
 ):
     """
     Traduz o arquivo CSV de entrada para o idioma de destino e salva o
@@ -95,47 +137,34 @@ def traduzir_arquivo_csv(
         caminho_arquivo_saida (str): O caminho do arquivo CSV de saída
                                      traduzido.
         idioma_destino (str): O idioma de destino para a tradução.
+        cache (CacheTraducoes, optional): O cache consultado antes do modelo.
 
     """
-    traducoes = []
     with open(caminho_arquivo_entrada, "r", encoding="utf-8") as arquivo_csv:
-        leitor_csv = csv.reader(arquivo_csv)
-
-        for linha in leitor_csv:
-            texto = linha[0]
-            traducao = traduzir_marianmt(texto)
+        textos = [linha[0] for linha in csv.reader(arquivo_csv)]
 
-            traducoes.append([traducao])
+    modelo = registry.get("marian")
+    with configured(modelo, cache=cache):
+        traducoes = [[traducao] for traducao in modelo.translate_batch(textos)]
 
-    with open(caminho_arquivo_saida, "w", newline="", encoding="utf-8") as arquivo_csv:
-        escritor_csv = csv.writer(arquivo_csv)
-        escritor_csv.writerows(traducoes)
+    escrever_csv_atomicamente(caminho_arquivo_saida, traducoes)
 
     logging.info("Arquivo CSV traduzido gerado: %s", caminho_arquivo_saida)
 
 
 def traduzir_marianmt(sentence):
-    model_name = "Helsinki-NLP/opus-mt-en-ROMANCE"
-    tokenizer = MarianTokenizer.from_pretrained(model_name)
-    model = MarianMTModel.from_pretrained(model_name)
-
-    inputs = tokenizer(
-        ">>pt<<" + sentence if len(sentence) < 512 else ">>pt<<" + sentence[:512],
-        return_tensors="pt",
-        padding=True,
-    )
+    """
+    Traduz uma sentença com o modelo MarianMT.
 
-    output_sequences = model.generate(
-        input_ids=inputs["input_ids"],
-        attention_mask=inputs["attention_mask"],
-        do_sample=False,  # if batching affects output,
-        max_length=1024,
-    )
-    sentence_decoded = tokenizer.batch_decode(
-        output_sequences, skip_special_tokens=True
-    )
-    print("Traducao:", sentence_decoded)
-    return sentence_decoded
+    O modelo é carregado uma única vez e reutilizado nas chamadas seguintes.
+
+    Args:
+        sentence (str): A sentença a ser traduzida.
+
+    Returns:
+        str: A sentença traduzida.
+    """
+    return registry.get("marian").translate_text(sentence)
 
 
 if __name__ == "__main__":
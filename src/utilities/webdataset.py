@@ -0,0 +1,205 @@
+"""Módulo de tradução de corpora no formato WebDataset.
+
+Um corpus WebDataset é um conjunto de shards ``.tar``; cada amostra é um
+grupo de arquivos consecutivos com a mesma chave (o nome sem a extensão),
+por exemplo ``000123.txt`` e ``000123.json``.
+
+Os shards são lidos em streaming, sem extrair nada para o disco, os campos
+de texto escolhidos são traduzidos em lotes e um novo shard é escrito com
+os campos originais e as traduções. Cada shard de saída é gravado de forma
+atômica, então uma execução interrompida pode ser retomada pulando os
+shards já existentes.
+
+Funções:
+- expandir_shards: Expande um padrão de shards em uma lista de caminhos.
+- ler_amostras: Lê as amostras de um shard em streaming.
+- escrever_amostras: Grava amostras em um shard.
+- traduzir_shard: Traduz os campos de texto de um shard.
+- traduzir_shard_no_worker: Traduz um shard com o modelo de um processo do
+    pool de ``models.parallel``.
+"""
+
+import glob
+import io
+import logging
+import os
+import re
+import tarfile
+from typing import Callable, Dict, Iterator, List
+
+from models.parallel import worker_model
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+PADRAO_INTERVALO = re.compile(r"\{(\d+)\.\.(\d+)\}")
+
+
+def expandir_shards(url: str) -> List[str]:
+    """
+    Retorna os caminhos locais dos shards de um padrão.
+
+    Aceita intervalos no estilo WebDataset (``shard-{000..099}.tar``),
+    padrões glob (``shards/*.tar``) e o prefixo ``file://``.
+
+    Args:
+        url (str): O padrão dos shards.
+
+    Returns:
+        List[str]: Os caminhos dos shards, em ordem.
+    """
+    if url.startswith("file://"):
+        url = url[len("file://") :]
+    intervalo = PADRAO_INTERVALO.search(url)
+    if intervalo:
+        inicio, fim = intervalo.groups()
+        largura = len(inicio)
+        caminhos = []
+        for numero in range(int(inicio), int(fim) + 1):
+            caminho = url[: intervalo.start()] + str(numero).zfill(largura)
+            caminhos.extend(expandir_shards(caminho + url[intervalo.end() :]))
+        return caminhos
+    if glob.has_magic(url):
+        return sorted(glob.glob(url))
+    return [url]
+
+
+def _separar_chave(nome: str):
+    """Separa o nome de um membro do tar em chave e extensão."""
+    diretorio, base = os.path.split(nome)
+    chave, _, extensao = base.partition(".")
+    return os.path.join(diretorio, chave), extensao
+
+
+def ler_amostras(caminho_shard: str) -> Iterator[Dict[str, bytes]]:
+    """
+    Lê as amostras de um shard em streaming.
+
+    Args:
+        caminho_shard (str): O caminho do arquivo ``.tar``.
+
+    Yields:
+        Dict[str, bytes]: Os campos de cada amostra, por extensão, mais a
+        chave em ``"__key__"``.
+    """
+    amostra = {}
+    with tarfile.open(caminho_shard, "r|*") as tar:
+        for membro in tar:
+            if not membro.isfile():
+                continue
+            chave, extensao = _separar_chave(membro.name)
+            if amostra and amostra["__key__"] != chave:
+                yield amostra
+                amostra = {}
+            amostra["__key__"] = chave
+            amostra[extensao] = tar.extractfile(membro).read()
+    if amostra:
+        yield amostra
+
+
+def escrever_amostras(caminho_shard: str, amostras) -> int:
+    """
+    Grava amostras em um shard, de forma atômica.
+
+    Args:
+        caminho_shard (str): O caminho do arquivo ``.tar`` de saída.
+        amostras (Iterable[Dict[str, bytes]]): As amostras a serem gravadas.
+
+    Returns:
+        int: O número de amostras gravadas.
+    """
+    temporario = caminho_shard + ".tmp"
+    total = 0
+    with tarfile.open(temporario, "w") as tar:
+        for amostra in amostras:
+            for extensao, conteudo in amostra.items():
+                if extensao == "__key__":
+                    continue
+                membro = tarfile.TarInfo(f"{amostra['__key__']}.{extensao}")
+                membro.size = len(conteudo)
+                tar.addfile(membro, io.BytesIO(conteudo))
+            total += 1
+    os.replace(temporario, caminho_shard)
+    return total
+
+
+def _traduzir_lote(lote, campos, modelo, funcao_traducao):
+    """Traduz os campos de texto de um lote de amostras."""
+    for campo in campos:
+        amostras = [amostra for amostra in lote if campo in amostra]
+        textos = [amostra[campo].decode("utf-8") for amostra in amostras]
+        for amostra, traducao in zip(amostras, funcao_traducao(textos)):
+            amostra[f"{modelo}.{campo}"] = traducao.encode("utf-8")
+    return lote
+
+
+def traduzir_shard(
+    caminho_entrada: str,
+    caminho_saida: str,
+    funcao_traducao: Callable[[List[str]], List[str]],
+    modelo: str,
+    campos: List[str],
+    tamanho_lote: int = 16,
+) -> int:
+    """
+    Traduz os campos de texto de um shard e grava o shard traduzido.
+
+    As traduções são acrescentadas a cada amostra no campo
+    ``<modelo>.<campo>``, por exemplo ``marian.txt``.
+
+    Args:
+        caminho_entrada (str): O shard de entrada.
+        caminho_saida (str): O shard de saída.
+        funcao_traducao (Callable): Traduz uma lista de textos.
+        modelo (str): O nome do modelo, usado no nome dos novos campos.
+        campos (List[str]): As extensões dos campos de texto a traduzir.
+        tamanho_lote (int, optional): O número de amostras traduzidas juntas.
+
+    Returns:
+        int: O número de amostras gravadas.
+    """
+
+    def amostras_traduzidas():
+        lote = []
+        for amostra in ler_amostras(caminho_entrada):
+            lote.append(amostra)
+            if len(lote) == tamanho_lote:
+                yield from _traduzir_lote(lote, campos, modelo, funcao_traducao)
+                lote = []
+        if lote:
+            yield from _traduzir_lote(lote, campos, modelo, funcao_traducao)
+
+    total = escrever_amostras(caminho_saida, amostras_traduzidas())
+    logging.info("Shard traduzido gerado: %s (%s amostras)", caminho_saida, total)
+    return total
+
+
+def traduzir_shard_no_worker(
+    caminho_entrada: str,
+    caminho_saida: str,
+    modelo: str,
+    campos: List[str],
+    tamanho_lote: int = 16,
+) -> int:
+    """
+    Traduz um shard em um processo iniciado com ``models.parallel.init_worker``.
+
+    Args:
+        caminho_entrada (str): O shard de entrada.
+        caminho_saida (str): O shard de saída.
+        modelo (str): O nome do modelo, usado no nome dos novos campos.
+        campos (List[str]): As extensões dos campos de texto a traduzir.
+        tamanho_lote (int, optional): O número de amostras traduzidas juntas.
+
+    Returns:
+        int: O número de amostras gravadas.
+    """
+    return traduzir_shard(
+        caminho_entrada,
+        caminho_saida,
+        worker_model().translate_batch,
+        modelo,
+        campos,
+        tamanho_lote,
+    )
@@ -0,0 +1,63 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class ServidorGoogleFalso(ThreadingHTTPServer):
+    """Servidor local que imita a API REST v2 do Google Translate."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManipuladorGoogleFalso)
+        self.requisicoes = []
+        self.falhas_restantes = 0
+        self.trava = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ManipuladorGoogleFalso(BaseHTTPRequestHandler):
+    """Traduz prefixando "pt:", ou responde 429 enquanto houver falhas."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.trava:
+            falhar = self.server.falhas_restantes > 0
+            if falhar:
+                self.server.falhas_restantes -= 1
+            else:
+                self.server.requisicoes.append(corpo["q"])
+        if falhar:
+            resposta, status = b'{"error": "rate limited"}', 429
+        else:
+            traducoes = [
+                {"translatedText": f"{corpo['target']}:{texto}"} for texto in corpo["q"]
+            ]
+            resposta = json.dumps({"data": {"translations": traducoes}}).encode()
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor_google():
+    """Servidor local da API do Google Translate, para testes sem rede."""
+    servidor = ServidorGoogleFalso()
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
@@ -0,0 +1,80 @@
+import pytest
+
+from models.backends import compare_backends, load_backend
+
+
+class FakeModel:
+    def __init__(self, traducoes):
+        self.traducoes = traducoes
+
+    def translate_batch(self, sentences):
+        return [self.traducoes[sentence] for sentence in sentences]
+
+
+def test_compare_backends():
+    """Compara as traduções de um backend com as do fp32."""
+    referencia = FakeModel({"a": "x", "b": "yy"})
+    candidato = FakeModel({"a": "x", "b": "yz"})
+    resultado = compare_backends(referencia, candidato, ["a", "b"])
+    assert resultado["exact_match"] == 0.5
+    assert resultado["similarity"] == 0.75
+    assert resultado["differences"] == [
+        {"source": "b", "reference": "yy", "candidate": "yz"}
+    ]
+
+
+def test_backend_int8_equivalente_ao_fp32():
+    """O modelo quantizado escolhe os mesmos tokens que o fp32."""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    torch.manual_seed(0)
+    config = transformers.MarianConfig(
+        vocab_size=64,
+        d_model=32,
+        encoder_layers=1,
+        decoder_layers=1,
+        encoder_attention_heads=2,
+        decoder_attention_heads=2,
+        encoder_ffn_dim=64,
+        decoder_ffn_dim=64,
+        max_position_embeddings=32,
+        pad_token_id=0,
+        eos_token_id=1,
+        decoder_start_token_id=0,
+        # com pesos maiores que o padrão, a saída depende de todas as camadas,
+        # e não só das embeddings que atravessam as conexões residuais
+        init_std=0.05,
+    )
+    modelo = transformers.MarianMTModel(config).eval()
+    entrada = torch.randint(2, 64, (16, 12))
+    esperado = modelo.generate(
+        entrada, do_sample=False, num_beams=1, max_length=16, min_length=16
+    )
+    with torch.no_grad():
+        logits = modelo(input_ids=entrada, decoder_input_ids=esperado).logits
+
+    quantizado = load_backend(modelo, "tiny", "int8")
+    assert any(
+        isinstance(m, torch.nn.quantized.dynamic.Linear) for m in quantizado.modules()
+    )
+    obtido = quantizado.generate(
+        entrada, do_sample=False, num_beams=1, max_length=16, min_length=16
+    )
+    assert obtido.shape == esperado.shape
+    assert (obtido == esperado).float().mean() >= 0.95
+
+    # passo a passo, com a saída do fp32 como prefixo, para que um token
+    # diferente não mude todos os seguintes
+    with torch.no_grad():
+        logits_int8 = quantizado(input_ids=entrada, decoder_input_ids=esperado).logits
+    tokens_iguais = (logits.argmax(-1) == logits_int8.argmax(-1)).float().mean()
+    assert tokens_iguais >= 0.95
+    # o erro da quantização fica perto de 2%; uma camada quebrada passa de 8%
+    erro = (logits - logits_int8).abs().max() / logits.abs().max()
+    assert erro <= 0.05
+
+
+def test_backend_desconhecido():
+    """Backends desconhecidos são rejeitados."""
+    with pytest.raises(ValueError):
+        load_backend(None, "tiny", "fp16")
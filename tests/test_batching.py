@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+import pytest
+
+from models.batching import MicroBatcher, QueueFullError
+
+
+def test_requisicoes_concorrentes_viram_um_lote():
+    """Requisições simultâneas são traduzidas em poucas chamadas."""
+    chamadas = []
+
+    def traduzir(sentencas):
+        chamadas.append(list(sentencas))
+        return [sentenca.upper() for sentenca in sentencas]
+
+    async def principal():
+        batcher = MicroBatcher(traduzir, max_batch_size=4, max_wait_ms=50)
+        resultados = await asyncio.gather(
+            batcher.translate(["a", "b"]),
+            batcher.translate(["c"]),
+            batcher.translate(["d", "e"]),
+        )
+        await batcher.stop()
+        return resultados
+
+    assert asyncio.run(principal()) == [["A", "B"], ["C"], ["D", "E"]]
+    assert chamadas == [["a", "b", "c"], ["d", "e"]]
+
+
+def test_fila_cheia():
+    """Com a fila cheia, novas requisições são recusadas."""
+    liberar = threading.Event()
+
+    def traduzir(sentencas):
+        liberar.wait()
+        return sentencas
+
+    async def principal():
+        batcher = MicroBatcher(traduzir, max_wait_ms=1, max_queue_size=1)
+        primeira = asyncio.ensure_future(batcher.translate(["a"]))
+        await asyncio.sleep(0.05)  # a primeira já está sendo traduzida
+        segunda = asyncio.ensure_future(batcher.translate(["b"]))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await batcher.translate(["c"])
+        liberar.set()
+        resultados = await asyncio.gather(primeira, segunda)
+        await batcher.stop()
+        return resultados
+
+    assert asyncio.run(principal()) == [["a"], ["b"]]
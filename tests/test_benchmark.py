@@ -0,0 +1,87 @@
+import pytest
+
+from models.benchmark import (
+    benchmark_model,
+    compare_results,
+    make_sentences,
+    reset_peak_rss,
+)
+
+
+class Tensor(list):
+    """Lista com a parte da API de tensores usada pelo benchmark."""
+
+    def sum(self):
+        return sum(sum(row) for row in self)
+
+    def numel(self):
+        return sum(len(row) for row in self)
+
+    def __ne__(self, value):
+        return Tensor([int(token != value) for token in row] for row in self)
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+
+
+class FakeModel:
+    """Um token por palavra; gera a entrada e ocupa 1 MB por sentença."""
+
+    tokenizer = FakeTokenizer()
+
+    def encode(self, sentences):
+        width = max(len(sentence.split()) for sentence in sentences)
+        mask = [
+            [1] * len(s.split()) + [0] * (width - len(s.split())) for s in sentences
+        ]
+        return {"input_ids": Tensor(mask), "attention_mask": Tensor(mask)}
+
+    def generate(self, inputs):
+        self.memory = bytearray(len(inputs["input_ids"]) * 2**20)
+        return Tensor(inputs["input_ids"])
+
+    def decode(self, outputs):
+        return ["x"] * len(outputs)
+
+
+def resultado(velocidade):
+    return {
+        "model": "marian",
+        "backend": "eager",
+        "batch_size": 8,
+        "input_length": 16,
+        "sentences_per_s": velocidade,
+    }
+
+
+def test_compare_results_detecta_regressao():
+    """Quedas de vazão acima da tolerância são reportadas."""
+    base = {"results": [resultado(100.0)]}
+    assert compare_results(base, {"results": [resultado(95.0)]}) == []
+    (regressao,) = compare_results(base, {"results": [resultado(80.0)]})
+    assert regressao["baseline_sentences_per_s"] == 100.0
+
+
+def test_make_sentences_reprodutivel():
+    """As sentenças sintéticas são as mesmas para a mesma semente."""
+    assert make_sentences(4, 10) == make_sentences(4, 10)
+    assert all(5 <= len(s.split()) <= 15 for s in make_sentences(20, 10))
+
+
+def test_benchmark_model_com_modelo_falso():
+    """Cada combinação reporta vazão, padding e o próprio pico de memória."""
+    model = FakeModel()
+    grande = benchmark_model(model, batch_size=64, input_length=8, num_batches=2)
+    model.memory = None
+    pequeno = benchmark_model(model, batch_size=1, input_length=8, num_batches=2)
+
+    assert grande["sentences_per_s"] > 0
+    assert grande["tokens_per_s"] > 0
+    assert 0 <= grande["padding_ratio"] < 1
+    assert pequeno["padding_ratio"] == 0
+    if not reset_peak_rss():
+        pytest.skip("o sistema não permite zerar o pico de memória")
+    # o pico da combinação menor não herda o da maior
+    assert pequeno["peak_rss_mb"] < grande["peak_rss_mb"] - 32
+    assert grande["peak_rss_delta_mb"] >= 32
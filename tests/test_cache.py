@@ -0,0 +1,50 @@
+from utilities.cache import CacheTraducoes
+
+
+def test_cache_traduz_apenas_textos_novos(tmp_path):
+    """Textos já traduzidos são lidos do cache, inclusive em nova execução."""
+    chamadas = []
+
+    def traduzir(textos):
+        chamadas.append(list(textos))
+        return [texto.upper() for texto in textos]
+
+    cache = CacheTraducoes(str(tmp_path / "cache.sqlite"))
+    assert cache.traduzir("m", {}, ["a", "b", "a"], traduzir) == ["A", "B", "A"]
+    cache.fechar()
+
+    cache = CacheTraducoes(str(tmp_path / "cache.sqlite"))
+    assert cache.traduzir("m", {}, ["a ", "c"], traduzir) == ["A", "C"]
+    assert cache.traduzir("outro", {}, ["a"], traduzir) == ["A"]
+    assert chamadas == [["a", "b"], ["c"], ["a"]]
+    assert (cache.acertos, cache.falhas) == (1, 2)
+
+
+def test_cache_remove_entradas_antigas(tmp_path):
+    """O cache remove as entradas menos usadas ao passar do tamanho máximo."""
+    cache = CacheTraducoes(str(tmp_path / "cache.sqlite"), tamanho_maximo=2)
+    cache.traduzir("m", {}, ["a"], lambda textos: ["x"])
+    cache.traduzir("m", {}, ["b"], lambda textos: ["y"])
+    cache.traduzir("m", {}, ["a"], lambda textos: ["z"])
+    cache.traduzir("m", {}, ["c"], lambda textos: ["w"])
+    chave_b = cache.gerar_chave("m", {}, "b")
+    assert chave_b not in cache.buscar([chave_b])
+    assert cache.traduzir("m", {}, ["a"], lambda textos: ["novo"]) == ["x"]
+
+
+def test_cache_mantem_tamanho_total(tmp_path):
+    """O tamanho total acompanha inserções, substituições e remoções."""
+    caminho = str(tmp_path / "cache.sqlite")
+    cache = CacheTraducoes(caminho, tamanho_maximo=10)
+    cache.salvar({"a": "xxxx", "b": "yyyy"})
+    cache.salvar({"a": "zz"})
+    assert cache.tamanho_total() == 6
+    cache.salvar({"c": "wwwwww"})
+    (soma,) = cache._conexao.execute("SELECT SUM(tamanho) FROM traducoes").fetchone()
+    assert cache.tamanho_total() == soma <= 10
+    cache._conexao.execute("DELETE FROM meta")
+    cache._conexao.commit()
+    cache.fechar()
+
+    # um cache sem o total guardado é somado ao ser aberto
+    assert CacheTraducoes(caminho, tamanho_maximo=10).tamanho_total() == soma
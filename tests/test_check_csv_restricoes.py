@@ -0,0 +1,48 @@
+import csv
+import os
+
+from utilities.check_csv_restricoes import perfilar_csv, verificar_restricoes_csv
+
+
+def test_perfil_em_uma_passada_e_guardado(tmp_path):
+    """O perfil valida, conta as linhas, mede as colunas e é reaproveitado."""
+    caminho = str(tmp_path / "dados.csv")
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        csv.writer(arquivo).writerows(
+            [["id", "article"], ["1", "abc"], ["2", "linha\nquebrada"], ["3", ""]]
+        )
+
+    perfil = verificar_restricoes_csv(caminho)
+    assert perfil["valido"]
+    assert perfil["linhas"] == 3
+    assert perfil["estatisticas"]["article"] == {
+        "caracteres": 17,
+        "media": 17 / 3,
+        "minimo": 0,
+        "maximo": 14,
+        "vazias": 1,
+    }
+    assert os.path.exists(caminho + ".perfil.json")
+
+    # um perfil guardado é usado enquanto o arquivo não muda
+    with open(caminho + ".perfil.json", "r", encoding="utf-8") as arquivo:
+        guardado = arquivo.read()
+    with open(caminho + ".perfil.json", "w", encoding="utf-8") as arquivo:
+        arquivo.write(guardado.replace('"linhas": 3', '"linhas": 99'))
+    assert perfilar_csv(caminho)["linhas"] == 99
+
+    with open(caminho, "a", newline="", encoding="utf-8") as arquivo:
+        csv.writer(arquivo).writerow(["4"])
+    perfil = perfilar_csv(caminho)
+    assert perfil["linhas"] == 4
+    assert not perfil["valido"]
+    assert "linha 4" in perfil["problema"]
+
+
+def test_arquivo_vazio(tmp_path):
+    """Um arquivo vazio é inválido, sem erro."""
+    caminho = tmp_path / "vazio.csv"
+    caminho.write_text("")
+    perfil = perfilar_csv(str(caminho), usar_cache=False)
+    assert not perfil["valido"]
+    assert perfil["linhas"] == 0
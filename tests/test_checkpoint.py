@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from utilities.checkpoint import DiarioProgresso
+from utilities.tabular import EscritorBlocos, ler_em_blocos
+
+
+def test_diario_retoma_e_descarta_linha_incompleta(tmp_path):
+    """Unidades registradas sobrevivem a uma interrupção no meio da escrita."""
+    caminho = str(tmp_path / "diario.jsonl")
+    diario = DiarioProgresso(caminho, {"colunas": ["a"]})
+    diario.registrar({"linhas": [0, 2]})
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write('{"linhas": [2,')
+
+    diario = DiarioProgresso(caminho, {"colunas": ["a"]}, retomar=True)
+    assert diario.concluidas() == [{"linhas": [0, 2]}]
+    diario.registrar({"linhas": [2, 4]})
+    assert len(DiarioProgresso(caminho, {"colunas": ["a"]}, True).concluidas()) == 2
+
+    with pytest.raises(ValueError):
+        DiarioProgresso(caminho, {"colunas": ["b"]}, retomar=True)
+    assert DiarioProgresso(caminho, {"colunas": ["b"]}).concluidas() == []
+
+
+def test_escritor_retoma_arquivo_parcial(tmp_path):
+    """Retomar descarta o que foi escrito depois do último bloco registrado."""
+    entrada = tmp_path / "entrada.csv"
+    pd.DataFrame({"a": range(5)}).to_csv(entrada, index=False)
+    saida = str(tmp_path / "saida.csv")
+
+    with EscritorBlocos(saida) as escritor:
+        blocos = ler_em_blocos(str(entrada), 2)
+        escritor.escrever(next(blocos))
+        tamanho = escritor.tamanho()
+        escritor.escrever(next(blocos))
+
+    with EscritorBlocos(saida, retomar_em=tamanho, linhas_escritas=2) as escritor:
+        for bloco in ler_em_blocos(str(entrada), 2, inicio=2):
+            escritor.escrever(bloco)
+
+    resultado = pd.read_csv(saida, index_col=0)
+    assert resultado.index.tolist() == [0, 1, 2, 3, 4]
+    assert resultado["a"].tolist() == [0, 1, 2, 3, 4]
@@ -0,0 +1,31 @@
+from models.chunking import chunk_text, split_sentences
+
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+
+def test_split_sentences():
+    """Divide o texto nos finais de sentença."""
+    assert split_sentences(" One. Two? Three!  Four ") == [
+        "One.",
+        "Two?",
+        "Three!",
+        "Four",
+    ]
+
+
+def test_chunk_text_respects_budget():
+    """Agrupa sentenças sem ultrapassar o limite de tokens."""
+    text = "a b c. d e. f g h i. j."
+    chunks = chunk_text(text, count_words, max_tokens=5)
+    assert chunks == ["a b c. d e.", "f g h i. j."]
+    assert all(max(count_words([chunk])) <= 5 for chunk in chunks)
+
+
+def test_chunk_text_splits_long_sentence():
+    """Divide sentenças maiores que o limite entre palavras."""
+    text = " ".join(str(i) for i in range(10)) + "."
+    chunks = chunk_text(text, count_words, max_tokens=4)
+    assert " ".join(chunks) == text
+    assert all(len(chunk.split()) <= 4 for chunk in chunks)
@@ -0,0 +1,38 @@
+from utilities.dedup import Deduplicador
+
+
+def test_deduplicador_traduz_sentencas_unicas_uma_vez():
+    """Células e sentenças repetidas são traduzidas uma única vez."""
+    enviados = []
+
+    def traduzir(segmentos):
+        enviados.extend(segmentos)
+        return [segmento.upper() for segmento in segmentos]
+
+    deduplicador = Deduplicador()
+    textos = ["By AP. One.", "By AP. Two.", "By AP. One."]
+    assert deduplicador.traduzir(textos, traduzir) == [
+        "BY AP. ONE.",
+        "BY AP. TWO.",
+        "BY AP. ONE.",
+    ]
+    assert deduplicador.traduzir(["Two."], traduzir) == ["TWO."]
+    assert enviados == ["By AP.", "One.", "Two."]
+    assert deduplicador.taxa() == 1 - 3 / 7
+
+
+def test_deduplicador_por_celula():
+    """Sem divisão em sentenças, apenas células idênticas são agrupadas."""
+    enviados = []
+
+    def traduzir(segmentos):
+        enviados.extend(segmentos)
+        return [segmento.upper() for segmento in segmentos]
+
+    deduplicador = Deduplicador(por_sentenca=False)
+    assert deduplicador.traduzir(["a. b.", "a. b.", "a."], traduzir) == [
+        "A. B.",
+        "A. B.",
+        "A.",
+    ]
+    assert enviados == ["a. b.", "a."]
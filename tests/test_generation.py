@@ -0,0 +1,116 @@
+from models.base import GENERATION_DEFAULTS, Seq2SeqModel
+
+EOS = 1
+
+
+class Tensor(list):
+    """Lista com a parte da API de tensores usada por ``Seq2SeqModel``."""
+
+    def sum(self, dim):
+        return Tensor(sum(row) for row in self)
+
+    def tolist(self):
+        return [list(row) if isinstance(row, list) else row for row in self]
+
+
+class FakeTokenizer:
+    """Um token por palavra, com o end-of-sentence no fim; "loop" é o 3."""
+
+    eos_token_id = EOS
+
+    def __call__(self, sentences, add_special_tokens=True, **kwargs):
+        ids = [
+            [3 if word == "loop" else 2 for word in sentence.split()]
+            for sentence in sentences
+        ]
+        if add_special_tokens:
+            ids = [row + [EOS] for row in ids]
+        width = max(map(len, ids), default=0) if kwargs.get("padding") else 0
+        return {
+            "input_ids": Tensor(row + [0] * max(0, width - len(row)) for row in ids),
+            "attention_mask": Tensor(
+                [1] * len(row) + [0] * max(0, width - len(row)) for row in ids
+            ),
+        }
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [
+            " ".join("x" for token in row if token not in (0, EOS))
+            for row in sequences.tolist()
+        ]
+
+
+class FakeGenerator:
+    """Gera o dobro de tokens da entrada, ou sem fim se ela tiver o token 3."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        self.calls.append(kwargs)
+        outputs = []
+        for ids, mask in zip(input_ids, attention_mask):
+            if 3 in ids:
+                wanted = [5] * 10_000
+            else:
+                wanted = [5] * (2 * sum(mask)) + [EOS]
+            outputs.append([0] + wanted[: kwargs["max_new_tokens"]])
+        width = max(map(len, outputs))
+        return Tensor(row + [0] * (width - len(row)) for row in outputs)
+
+
+class FakeSeq2Seq(Seq2SeqModel):
+    name = "fake"
+    checkpoint = "fake"
+
+    def __init__(self, **profile):
+        self.tokenizer = FakeTokenizer()
+        self.model = FakeGenerator()
+        self.generation_profile = {**GENERATION_DEFAULTS, **profile}
+        self.chunk_budget = 1000
+
+
+def test_perfil_de_geracao_lido_do_config():
+    """O perfil do YAML do modelo substitui os valores padrão."""
+
+    class Marian(Seq2SeqModel):
+        name = "marian"
+
+    profile = Marian.__new__(Marian).generation_profile
+    assert profile["max_new_tokens"] == 512
+    assert profile["num_beams"] == 1
+    assert set(GENERATION_DEFAULTS) <= set(profile)
+
+
+def test_limite_derivado_do_tamanho_da_entrada():
+    """max_new_tokens acompanha a entrada mais longa e respeita o teto."""
+    model = FakeSeq2Seq(
+        length_ratio=2.0, length_headroom=1.5, length_margin=4, max_new_tokens=50
+    )
+    assert model.max_new_tokens(3) == 3 * 2 * 1.5 + 4
+    assert model.max_new_tokens(100) == 50
+
+    model.translate_batch(["a b", "a b c d"])
+    # 5 tokens com o end-of-sentence
+    assert model.model.calls[0]["max_new_tokens"] == 19
+    assert "length_penalty" not in model.model.calls[0]
+
+
+def test_razao_aprendida_das_saidas():
+    """A razão alvo/fonte se aproxima da observada nas traduções."""
+    model = FakeSeq2Seq(length_ratio=1.0, ratio_momentum=0.5)
+    model.translate_batch(["a b c"])
+    assert model.length_ratio == 0.5 * 1.0 + 0.5 * 9 / 4
+    for _ in range(20):
+        model.translate_batch(["a b c"])
+    assert abs(model.length_ratio - 9 / 4) < 1e-3
+
+
+def test_linhas_que_atingem_o_teto_sao_sinalizadas():
+    """Uma decodificação sem fim para no teto e é sinalizada."""
+    model = FakeSeq2Seq(length_ratio=1.0, ratio_momentum=0.5)
+    translations, hit_cap = model.translate_batch_with_flags(["a b", "loop"])
+    assert hit_cap == [False, True]
+    assert len(translations[1].split()) == model.model.calls[0]["max_new_tokens"]
+    # a saída cortada não entra na razão aprendida
+    assert model.length_ratio == 0.5 * 1.0 + 0.5 * 7 / 3
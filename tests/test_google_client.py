@@ -0,0 +1,32 @@
+from utilities.google_client import ClienteTradutor, empacotar, transporte_rest
+
+
+def test_empacotar_respeita_limites():
+    """Os pacotes respeitam o número de textos e de caracteres."""
+    textos = ["a" * 10] * 5 + ["b" * 50, "c"]
+    assert empacotar(textos, max_segmentos=2, max_caracteres=25) == [
+        [0, 1],
+        [2, 3],
+        [4],
+        [5],
+        [6],
+    ]
+
+
+def test_cliente_empacota_e_repete(servidor_google):
+    """Várias células vão em cada requisição e erros 429 são repetidos."""
+    servidor_google.falhas_restantes = 2
+    cliente = ClienteTradutor(
+        transporte_rest(servidor_google.url),
+        max_conexoes=4,
+        requisicoes_por_segundo=1000,
+        espera_inicial=0.01,
+        max_segmentos=3,
+    )
+    textos = [f"cell {indice}" for indice in range(10)] + [""]
+    traducoes = cliente.traduzir(textos, "pt")
+    cliente.fechar()
+
+    assert traducoes == [f"pt:cell {indice}" for indice in range(10)] + [""]
+    assert sorted(len(pacote) for pacote in servidor_google.requisicoes) == [1, 3, 3, 3]
+    assert cliente.repeticoes == 2
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#: Tempo máximo, em segundos, para importar um ponto de entrada.
+ORCAMENTO_IMPORTACAO = 5.0
+#: Módulos pesados que só podem ser importados pelo modelo escolhido.
+PROIBIDOS = ("torch", "transformers", "google.cloud", "models.marian")
+
+MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+duracao = time.perf_counter() - inicio
+print(json.dumps({{
+    "segundos": duracao,
+    "importados": [m for m in {proibidos!r} if m in sys.modules],
+}}))
+"""
+
+
+def medir_importacao(modulo):
+    """Importa o módulo em um processo novo e mede o tempo."""
+    ambiente = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([os.path.join(RAIZ, "src"), RAIZ]),
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", MEDIR.format(modulo=modulo, proibidos=PROIBIDOS)],
+        capture_output=True,
+        text=True,
+        cwd=RAIZ,
+        env=ambiente,
+        check=True,
+    )
+    return json.loads(resultado.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "modulo, dependencias",
+    [
+        ("src", ["pandas", "tqdm"]),
+        ("merge", []),
+        ("utilities.check_csv_restricoes", []),
+        ("utilities.translate", []),
+        ("utilities.translate_marian", []),
+        ("models.registry", []),
+    ],
+)
+def test_importacao_leve(modulo, dependencias):
+    """Os pontos de entrada não importam os modelos e importam rápido."""
+    for dependencia in dependencias:
+        pytest.importorskip(dependencia)
+    medida = medir_importacao(modulo)
+    print(f"{modulo}: {medida['segundos']:.3f}s")
+    assert medida["importados"] == []
+    assert medida["segundos"] < ORCAMENTO_IMPORTACAO
@@ -0,0 +1,41 @@
+import csv
+import os
+import subprocess
+import sys
+
+from merge import merge_csv_files
+
+
+def test_merge_ordem_natural_e_varias_partes(tmp_path):
+    """As partes são unidas em ordem numérica, com qualquer número de partes."""
+    partes = {(1, 1): "a", (2, 1): "b1", (2, 2): "b2", (2, 10): "b10", (10, 1): "c"}
+    partes[(2, 3)] = "b3"
+    for (linha, parte), texto in partes.items():
+        with open(tmp_path / f"doc_parte_{linha}_{parte}.csv", "w", newline="") as f:
+            csv.writer(f).writerows([["article"], [texto]])
+    saida = tmp_path.parent / "merged.csv"
+
+    merge_csv_files(str(tmp_path), str(saida))
+
+    with open(saida, newline="") as f:
+        assert list(csv.reader(f)) == [["article"], ["a"], ["b1 b2 b3 b10"], ["c"]]
+
+
+def test_merge_executado_como_script(tmp_path):
+    """python merge.py funciona da raiz do repositório, sem PYTHONPATH."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(tmp_path / "doc_parte_1_1.csv", "w", newline="") as f:
+        csv.writer(f).writerows([["article"], ["a"]])
+    saida = tmp_path.parent / "script.csv"
+    ambiente = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    subprocess.run(
+        [sys.executable, "merge.py"],
+        input=f"{tmp_path}\n{saida}\n",
+        text=True,
+        cwd=raiz,
+        env=ambiente,
+        check=True,
+        capture_output=True,
+    )
+    with open(saida, newline="") as f:
+        assert list(csv.reader(f)) == [["article"], ["a"]]
@@ -0,0 +1,55 @@
+import json
+import logging
+
+from models.metrics import Metrics, MetricsReporter
+from utilities.break_text import CSVProcessor
+
+
+def test_temporizadores_e_contadores():
+    """Os tempos, as chamadas e a proporção de padding são acumulados."""
+    metrics = Metrics()
+    with metrics.timer("generate"):
+        pass
+    assert list(metrics.timed("read", [1, 2])) == [1, 2]
+    metrics.increment("tokens_in", 30)
+    metrics.increment("padded_tokens", 40)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["generate"]["calls"] == 1
+    # duas linhas e o fim do arquivo
+    assert snapshot["stages"]["read"]["calls"] == 3
+    assert snapshot["padding_ratio"] == 0.25
+    assert snapshot["peak_rss_bytes"] > 0
+
+
+def test_formato_prometheus():
+    """Cada métrica sai com HELP, TYPE e o valor."""
+    metrics = Metrics()
+    metrics.increment("cache_hits", 3)
+    text = metrics.to_prometheus()
+    assert "# TYPE translation_cache_hits_total counter" in text
+    assert "translation_cache_hits_total 3" in text
+    assert 'translation_stage_calls_total{stage="decode"} 0' in text
+    assert text.endswith("\n")
+
+
+def test_relatorio_periodico(tmp_path):
+    """O relatório grava linhas JSON e o arquivo do Prometheus."""
+    metrics = Metrics()
+    jsonl = tmp_path / "metrics.jsonl"
+    prometheus = tmp_path / "metrics.prom"
+    with MetricsReporter(metrics, str(jsonl), str(prometheus), interval=0.01):
+        metrics.increment("rows", 5)
+    linhas = [json.loads(linha) for linha in jsonl.read_text().splitlines()]
+    assert linhas[-1]["counters"]["rows"] == 5
+    assert "translation_rows_total 5" in prometheus.read_text()
+
+
+def test_progresso_a_cada_cinco_por_cento(caplog):
+    """O progresso é registrado a cada 5% das linhas, e não só por acaso."""
+    with caplog.at_level(logging.INFO):
+        for linha in range(1000):
+            CSVProcessor.monitorar_progresso(linha, 1000)
+    mensagens = [r.getMessage() for r in caplog.records if "Progresso" in r.message]
+    assert len(mensagens) == 20
+    assert mensagens[-1] == "Progresso: 100% concluído"
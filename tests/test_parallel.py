@@ -0,0 +1,66 @@
+import os
+
+from models.parallel import ParallelTranslator
+from models.registry import registry
+from utilities.cache import CacheTraducoes
+
+
+class FakeModel:
+    """Traduz em maiúsculas e informa o processo; "loop" atinge o teto."""
+
+    checkpoint = "fake-parallel"
+
+    def cache_settings(self):
+        return {}
+
+    def translate_batch_with_flags(self, sentences):
+        return (
+            [f"{sentence.upper()}@{os.getpid()}" for sentence in sentences],
+            [sentence == "loop" for sentence in sentences],
+        )
+
+
+class PlainModel:
+    """Modelo mínimo, que só implementa translate_batch."""
+
+    def translate_batch(self, sentences):
+        return [sentence[::-1] for sentence in sentences]
+
+
+def test_traducao_em_processos_preserva_a_ordem(tmp_path, monkeypatch):
+    """Os shards são traduzidos em processos diferentes e voltam em ordem."""
+    monkeypatch.setitem(registry._factories, "fake-parallel", FakeModel)
+    translator = ParallelTranslator("fake-parallel", 2, 1, shard_size=2)
+    try:
+        sentences = [f"frase {i}" for i in range(20)] + ["loop"]
+        translations, hit_cap = translator.translate_batch_with_flags(sentences)
+        assert [t.split("@")[0] for t in translations] == [s.upper() for s in sentences]
+        # traduzidas nos workers, e não no processo do teste
+        assert str(os.getpid()) not in {t.split("@")[1] for t in translations}
+        assert hit_cap == [False] * 20 + [True]
+
+        translator.cache = CacheTraducoes(str(tmp_path / "cache.sqlite"))
+        translator.translate_batch(sentences[:4])
+        translations, hit_cap = translator.translate_batch_with_flags(sentences)
+        assert [t.split("@")[0] for t in translations] == [s.upper() for s in sentences]
+        assert (translator.cache.acertos, translator.cache.falhas) == (4, 21)
+        assert hit_cap[-1] is True
+    finally:
+        translator.close()
+
+
+def test_modelo_sem_checkpoint_nao_usa_o_cache(tmp_path, monkeypatch):
+    """Um modelo que só tem translate_batch funciona, sem passar pelo cache."""
+    monkeypatch.setitem(registry._factories, "plain-parallel", PlainModel)
+    translator = ParallelTranslator("plain-parallel", 2, 1, shard_size=2)
+    try:
+        assert translator.checkpoint is None
+        translator.cache = CacheTraducoes(str(tmp_path / "cache.sqlite"))
+        sentences = ["abc", "de", "f"]
+        assert translator.translate_batch_with_flags(sentences) == (
+            ["cba", "ed", "f"],
+            [False] * 3,
+        )
+        assert (translator.cache.acertos, translator.cache.falhas) == (0, 0)
+    finally:
+        translator.close()
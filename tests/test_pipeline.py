@@ -0,0 +1,82 @@
+import pytest
+
+from models.pipeline import StagedPipeline
+from utilities.cache import CacheTraducoes
+
+
+class FakeModel:
+    """Modelo falso: "gera" a tradução em maiúsculas de cada chunk."""
+
+    checkpoint = "fake"
+    chunk_budget = 3
+    chunk_batch_size = 2
+    cache = None
+
+    def __init__(self):
+        self.generated = []
+
+    def cache_settings(self):
+        return {}
+
+    def count_tokens(self, sentences):
+        return [len(sentence.split()) for sentence in sentences]
+
+    def schedule(self, chunks):
+        return [
+            list(range(start, min(start + self.chunk_batch_size, len(chunks))))
+            for start in range(0, len(chunks), self.chunk_batch_size)
+        ]
+
+    def encode(self, sentences):
+        return list(sentences)
+
+    def generate(self, inputs):
+        if "boom" in inputs:
+            raise RuntimeError("boom")
+        self.generated.extend(inputs)
+        return [sentence.upper() for sentence in inputs]
+
+    def output_lengths(self, outputs):
+        return [len(output) for output in outputs], ["LOOP" in o for o in outputs]
+
+    def decode(self, outputs):
+        return outputs
+
+
+def test_pipeline_preserva_ordem_e_divide_textos():
+    """Os itens saem na ordem de entrada, com os textos longos reunidos."""
+    model = FakeModel()
+    pipeline = StagedPipeline(model, queue_size=1, tokenizer_workers=2)
+    items = [(index, [f"a{index} b. c d e.", "", f"f{index}"]) for index in range(5)]
+
+    results = list(pipeline.translate(items))
+
+    assert [payload for payload, _, _ in results] == list(range(5))
+    assert results[3][1:] == (["A3 B. C D E.", "", "F3"], [False] * 3)
+    assert pipeline.stats["generate"].items == 10
+    assert pipeline.report()["write"]["items"] == 5
+
+
+def test_pipeline_usa_cache(tmp_path):
+    """Textos já traduzidos não chegam ao generate."""
+    model = FakeModel()
+    model.cache = CacheTraducoes(str(tmp_path / "cache.sqlite"))
+    pipeline = StagedPipeline(model)
+
+    assert list(pipeline.translate([(0, ["x loop", "y"])])) == [
+        (0, ["X LOOP", "Y"], [True, False])
+    ]
+    assert list(pipeline.translate([(1, ["y", "z", "x loop", "z"])])) == [
+        (1, ["Y", "Z", "X LOOP", "Z"], [False, False, False, False])
+    ]
+    assert model.generated == ["x loop", "y", "z"]
+    assert (model.cache.acertos, model.cache.falhas) == (3, 3)
+    model.cache.fechar()
+
+
+def test_pipeline_propaga_erros():
+    """Um erro em um estágio interrompe o pipeline e chega ao chamador."""
+    pipeline = StagedPipeline(FakeModel(), queue_size=1)
+    items = ((index, ["boom" if index == 3 else "ok"]) for index in range(100))
+    with pytest.raises(RuntimeError, match="boom"):
+        list(pipeline.translate(items))
@@ -0,0 +1,104 @@
+import sys
+from importlib.metadata import EntryPoint
+
+import models.registry
+from models.registry import BUILTIN_MODELS, ModelRegistry, configured, registry
+
+
+class FakeTensor:
+    def __init__(self, size):
+        self.size = size
+
+    def numel(self):
+        return self.size
+
+    def element_size(self):
+        return 1
+
+
+class FakeModule:
+    def __init__(self, size):
+        self.size = size
+
+    def parameters(self):
+        return [FakeTensor(self.size)]
+
+    def buffers(self):
+        return []
+
+
+class FakeModel:
+    def __init__(self, size):
+        self.model = FakeModule(size)
+
+
+def test_registry_carrega_uma_vez_e_despeja_lru():
+    """Modelos são reutilizados e os menos usados saem ao passar do limite."""
+    carregamentos = []
+    registry = ModelRegistry(memory_budget=25)
+    for nome in ["a", "b", "c"]:
+        registry.register(
+            nome, lambda nome=nome: carregamentos.append(nome) or FakeModel(10)
+        )
+
+    assert registry.get("a") is registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    assert carregamentos == ["a", "b", "c"]
+    assert registry.loaded() == ["a", "c"]
+    assert registry.memory_usage() == 20
+
+
+def test_registro_preguicoso_por_caminho(tmp_path, monkeypatch):
+    """Um modelo registrado como "modulo:atributo" só é importado ao ser usado."""
+    (tmp_path / "modelo_preguicoso.py").write_text("class Modelo:\n    model = None\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registro = ModelRegistry()
+    registro.register("preguicoso", "modelo_preguicoso:Modelo")
+
+    assert registro.names() == ["preguicoso"]
+    assert "modelo_preguicoso" not in sys.modules
+    modelo = registro.get("preguicoso")
+    assert type(modelo).__name__ == "Modelo"
+    assert registro.factory("preguicoso") is type(modelo)
+    sys.modules.pop("modelo_preguicoso")
+
+
+def test_modelos_por_entry_points(monkeypatch):
+    """Pacotes instalados registram modelos pelo grupo de entry points."""
+    monkeypatch.setattr(
+        models.registry,
+        "entry_points",
+        lambda group: [
+            EntryPoint("externo", "collections:OrderedDict", group),
+            EntryPoint("marian", "collections:Counter", group),
+        ],
+    )
+    registro = ModelRegistry(entry_point_group="translate_dataset.models")
+    registro.register("marian", BUILTIN_MODELS["marian"])
+
+    assert registro.names() == ["externo", "marian"]
+    assert registro.factory("externo").__name__ == "OrderedDict"
+    # o registro explícito tem precedência
+    assert registro._factories["marian"] == BUILTIN_MODELS["marian"]
+
+
+def test_modelos_embutidos_registrados():
+    """Os wrappers embutidos aparecem sem serem importados."""
+    assert set(BUILTIN_MODELS) <= set(registry.names())
+
+
+def test_configuracao_temporaria_da_instancia_compartilhada():
+    """As configurações de uma chamada são desfeitas ao sair do bloco."""
+
+    class Modelo:
+        cache = None
+
+    modelo = Modelo()
+    modelo.max_tokens = 100
+    with configured(modelo, cache="cache", max_tokens=None):
+        assert (modelo.cache, modelo.max_tokens) == ("cache", None)
+    assert (modelo.cache, modelo.max_tokens) == (None, 100)
+    assert "cache" not in vars(modelo)
@@ -0,0 +1,44 @@
+from models.base import Seq2SeqModel
+from models.scheduling import pack_batches
+
+
+def test_lotes_ordenados_dentro_do_orcamento():
+    """Os lotes seguem o tamanho e não passam do orçamento com padding."""
+    lengths = [50, 5, 6, 48, 5, 200, 7]
+    batches = pack_batches(lengths, max_tokens=100)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(7))
+    assert batches[0] == [1, 4, 2, 6]
+    for batch in batches:
+        longest = max(lengths[i] for i in batch)
+        assert len(batch) == 1 or len(batch) * longest <= 100
+    # maior que o orçamento: vai sozinho
+    assert [5] in batches
+
+
+def test_limite_de_segmentos_por_lote():
+    """max_batch_size limita o número de segmentos mesmo se couberem."""
+    assert pack_batches([1] * 5, max_tokens=100, max_batch_size=2) == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+
+
+class Tokenizer:
+    def __call__(self, sentences):
+        return {"input_ids": [sentence.split() + ["</s>"] for sentence in sentences]}
+
+
+def test_modelo_agenda_por_tokens():
+    """Com max_tokens o modelo agrupa pelos tokens, não pela quantidade."""
+    model = Seq2SeqModel.__new__(Seq2SeqModel)
+    model.tokenizer = Tokenizer()
+    chunks = ["a " * 30, "b", "c d", "e " * 29]
+
+    model.max_tokens = 64
+    assert model.schedule(chunks) == [[1, 2], [3, 0]]
+
+    model.max_tokens = None
+    model.chunk_batch_size = 3
+    assert model.schedule(chunks) == [[1, 2, 3], [0]]
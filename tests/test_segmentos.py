@@ -0,0 +1,126 @@
+import csv
+
+import pytest
+
+from merge import merge_csv_files
+from utilities.break_text import CSVProcessor
+from utilities.checkpoint import DiarioProgresso
+from utilities.segmentos import (
+    EscritorSegmentos,
+    LeitorSegmentos,
+    listar_conjuntos,
+    traduzir_conjunto,
+)
+
+
+def test_dividir_traduzir_e_unir_segmentos(tmp_path):
+    """As partes vão para poucos shards indexados e são unidas de volta."""
+    entrada = tmp_path / "noticias.csv"
+    textos = ["um dois tres quatro", "cinco", "seis sete oito"]
+    with open(entrada, "w", newline="", encoding="utf-8") as arquivo:
+        csv.writer(arquivo).writerows([["article"]] + [[texto] for texto in textos])
+
+    CSVProcessor(
+        str(entrada),
+        "article",
+        9,
+        10,
+        str(tmp_path / "divididos"),
+        "noticias",
+        formato_saida="segmentos",
+        segmentos_por_shard=3,
+    ).verificar_e_dividir_limite_caracteres_csv()
+    pasta = str(tmp_path / "divididos" / "noticias")
+
+    assert listar_conjuntos(pasta) == ["noticias"]
+    leitor = LeitorSegmentos(pasta, "noticias")
+    assert len(leitor.shards()) == 2
+    assert list(leitor.linhas())[0] == (1, ["um dois", "tres", "quatro"])
+    assert leitor.buscar(3) == ["seis sete", "oito"]
+
+    traduzidos = tmp_path / "traduzidos"
+    traduzidos.mkdir()
+    lotes = []
+
+    def traduzir(segmentos):
+        lotes.append(len(segmentos))
+        return [segmento.upper() for segmento in segmentos]
+
+    assert traduzir_conjunto(pasta, str(traduzidos), "noticias", traduzir, 2) == 6
+    assert lotes == [3, 3]
+
+    saida = tmp_path / "merged.csv"
+    merge_csv_files(str(traduzidos), str(saida))
+    with open(saida, newline="", encoding="utf-8") as arquivo:
+        assert list(csv.reader(arquivo)) == [
+            ["article"],
+            ["UM DOIS TRES QUATRO"],
+            ["CINCO"],
+            ["SEIS SETE OITO"],
+        ]
+
+
+def test_conjunto_retomado_a_partir_do_ultimo_lote(tmp_path):
+    """Após uma interrupção, só os lotes não registrados são traduzidos."""
+    entrada = tmp_path / "entrada"
+    saida = tmp_path / "saida"
+    entrada.mkdir()
+    saida.mkdir()
+    with EscritorSegmentos(str(entrada), "docs", segmentos_por_shard=3) as escritor:
+        for row_id in range(1, 7):
+            escritor.escrever_linha(row_id, [f"linha {row_id}", "fim"])
+    caminho_diario = str(saida / ".progresso.jsonl")
+    traduzidos, interromper = [], [True]
+
+    def traduzir(segmentos):
+        # a primeira execução é interrompida no segundo lote
+        if interromper[0] and traduzidos:
+            raise RuntimeError("interrompido")
+        traduzidos.extend(segmentos)
+        return [segmento.upper() for segmento in segmentos]
+
+    diario = DiarioProgresso(caminho_diario, {})
+    with pytest.raises(RuntimeError):
+        traduzir_conjunto(str(entrada), str(saida), "docs", traduzir, 4, diario)
+    assert traduzidos == ["linha 1", "fim", "linha 2", "fim"]
+
+    traduzidos.clear()
+    interromper[0] = False
+    diario = DiarioProgresso(caminho_diario, {}, retomar=True)
+    assert (
+        traduzir_conjunto(str(entrada), str(saida), "docs", traduzir, 4, diario) == 12
+    )
+    assert traduzidos == [t for i in range(3, 7) for t in (f"linha {i}", "fim")]
+    leitor = LeitorSegmentos(str(saida), "docs")
+    assert list(leitor.linhas()) == [(i, [f"LINHA {i}", "FIM"]) for i in range(1, 7)]
+    assert leitor.buscar(5) == ["LINHA 5", "FIM"]
+
+    # um conjunto concluído não é traduzido de novo
+    traduzidos.clear()
+    diario = DiarioProgresso(caminho_diario, {}, retomar=True)
+    assert (
+        traduzir_conjunto(str(entrada), str(saida), "docs", traduzir, 4, diario) == 12
+    )
+    assert traduzidos == []
+
+
+def test_nova_divisao_em_csv_remove_conjunto_anterior(tmp_path):
+    """Os segmentos de uma divisão anterior não são unidos no lugar das partes."""
+    entrada = tmp_path / "noticias.csv"
+    with open(entrada, "w", newline="", encoding="utf-8") as arquivo:
+        csv.writer(arquivo).writerows([["article"], ["um dois"], ["tres"]])
+    pasta = tmp_path / "divididos" / "noticias"
+
+    for formato in ("segmentos", "csv"):
+        CSVProcessor(
+            str(entrada),
+            "article",
+            100,
+            10,
+            str(tmp_path / "divididos"),
+            "noticias",
+            formato_saida=formato,
+        ).verificar_e_dividir_limite_caracteres_csv()
+
+    assert listar_conjuntos(str(pasta)) == []
+    assert not list(pasta.glob("*.jsonl"))
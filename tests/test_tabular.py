@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from utilities.tabular import EscritorBlocos, ler_em_blocos
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow"])
+def test_formatos_colunares_em_blocos(tmp_path, formato):
+    """Arquivos colunares são lidos por colunas e escritos bloco a bloco."""
+    pytest.importorskip("pyarrow")
+    dados = pd.DataFrame({"a": range(7), "b": list("abcdefg"), "c": [0.5] * 7})
+    entrada = str(tmp_path / f"entrada.{formato}")
+    with EscritorBlocos(entrada, formato) as escritor:
+        escritor.escrever(dados[:4])
+        escritor.escrever(dados[4:])
+
+    blocos = list(ler_em_blocos(entrada, 3, colunas=["b"], max_linhas=6, inicio=2))
+    assert all(len(bloco) <= 3 for bloco in blocos)
+    resultado = pd.concat(blocos)
+    assert resultado.index.tolist() == [2, 3, 4, 5]
+    assert resultado.columns.tolist() == ["b"]
+    assert resultado["b"].tolist() == list("cdef")
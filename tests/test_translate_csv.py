@@ -0,0 +1,166 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("tqdm")
+
+import src as translate_dataset  # noqa: E402
+from models.registry import registry  # noqa: E402
+
+
+class UpperModel:
+    def translate_batch(self, sentences):
+        return [sentence.upper() for sentence in sentences]
+
+
+class ReverseModel:
+    def translate_batch(self, sentences):
+        return [sentence[::-1] for sentence in sentences]
+
+
+registry.register("upper", UpperModel)
+registry.register("reverse", ReverseModel)
+
+
+def test_modelos_concorrentes_lado_a_lado(tmp_path):
+    """A entrada é lida uma vez e as traduções saem lado a lado."""
+    entrada = tmp_path / "noticias.csv"
+    pd.DataFrame(
+        {"id": [1, 2, 3], "article": ["abc", "de", "f"], "highlights": ["x", "y", "z"]}
+    ).to_csv(entrada, index=False)
+
+    translate_dataset.translate_csv(
+        str(entrada),
+        ["article", "highlights"],
+        ["upper", "reverse"],
+        filename=str(tmp_path / "noticias"),
+        chunk_size=2,
+        concurrent_models=True,
+        total_threads=2,
+    )
+
+    saida = pd.read_csv(tmp_path / "noticias_translation.csv", index_col=0)
+    assert list(saida.columns[3:]) == [
+        "article upper translation",
+        "highlights upper translation",
+        "article reverse translation",
+        "highlights reverse translation",
+    ]
+    assert saida["article upper translation"].tolist() == ["ABC", "DE", "F"]
+    assert saida["article reverse translation"].tolist() == ["cba", "ed", "f"]
+
+
+class PooledModel(UpperModel):
+    max_tokens = 64
+
+    def __init__(self):
+        self.calls = []
+
+    def translate_batch_with_flags(self, sentences):
+        self.calls.append(list(sentences))
+        return self.translate_batch(sentences), [s == "long" for s in sentences]
+
+
+def test_orcamento_de_tokens_agrupa_as_colunas():
+    """Com max_tokens, as células de todas as colunas vão em uma só chamada."""
+    model = PooledModel()
+    dataframe = pd.DataFrame({"article": ["long", "b"], "highlights": ["c", "d"]})
+
+    translate_dataset.translate_dataframe(
+        model, "m", dataframe, ["article", "highlights"], batch_size=1
+    )
+
+    assert model.calls == [["long", "b", "c", "d"]]
+    assert dataframe["article m translation"].tolist() == ["LONG", "B"]
+    assert dataframe["highlights m translation"].tolist() == ["C", "D"]
+    assert dataframe["article m hit_cap"].tolist() == [True, False]
+    assert dataframe["highlights m hit_cap"].tolist() == [False, False]
+
+
+class UpperPipeline:
+    def translate(self, items):
+        for dataframe, texts in items:
+            yield dataframe, [text.upper() for text in texts], [
+                text == "long" for text in texts
+            ]
+
+
+def test_pipeline_adiciona_colunas_hit_cap():
+    """O modo pipelined também informa os textos que atingiram o limite."""
+    dataframe = pd.DataFrame({"article": ["long", "b"], "highlights": ["c", "d"]})
+
+    (saida,) = translate_dataset.translate_chunks_pipelined(
+        UpperPipeline(), "m", [dataframe], ["article", "highlights"]
+    )
+
+    assert list(saida.columns[2:]) == [
+        "article m translation",
+        "article m hit_cap",
+        "highlights m translation",
+        "highlights m hit_cap",
+    ]
+    assert saida["article m translation"].tolist() == ["LONG", "B"]
+    assert saida["article m hit_cap"].tolist() == [True, False]
+    assert saida["highlights m hit_cap"].tolist() == [False, False]
+
+
+registry.register("pooled", PooledModel)
+
+
+def test_max_tokens_nao_fica_na_instancia_compartilhada(tmp_path):
+    """O max_tokens de uma execução não vaza para o modelo do registro."""
+    entrada = tmp_path / "noticias.csv"
+    pd.DataFrame({"article": ["long", "b"]}).to_csv(entrada, index=False)
+
+    translate_dataset.translate_csv(
+        str(entrada),
+        ["article"],
+        ["pooled"],
+        filename=str(tmp_path / "noticias"),
+        max_tokens=8,
+    )
+
+    model = registry.get("pooled")
+    assert model.max_tokens == PooledModel.max_tokens
+    assert "max_tokens" not in vars(model) and "cache" not in vars(model)
+
+
+class FlakyModel(UpperModel):
+    #: Número de textos traduzidos antes de falhar; None desliga a falha.
+    falhar_em = None
+    traduzidos = []
+
+    def translate_batch(self, sentences):
+        falhar_em = FlakyModel.falhar_em
+        if falhar_em is not None and len(FlakyModel.traduzidos) >= falhar_em:
+            raise RuntimeError("interrompido")
+        FlakyModel.traduzidos.extend(sentences)
+        return super().translate_batch(sentences)
+
+
+registry.register("flaky", FlakyModel)
+
+
+def test_execucao_interrompida_e_retomada(tmp_path):
+    """A retomada continua do último bloco gravado, sem repetir linhas."""
+    entrada = tmp_path / "noticias.csv"
+    textos = [f"texto {i}" for i in range(7)]
+    pd.DataFrame({"id": range(7), "article": textos}).to_csv(entrada, index=False)
+    opcoes = {"filename": str(tmp_path / "noticias"), "chunk_size": 2}
+
+    # o terceiro bloco falha, depois que os dois primeiros foram gravados
+    FlakyModel.falhar_em, FlakyModel.traduzidos = 4, []
+    with pytest.raises(RuntimeError, match="interrompido"):
+        translate_dataset.translate_csv(
+            str(entrada), ["article"], ["flaky"], batch_size=2, **opcoes
+        )
+    assert FlakyModel.traduzidos == textos[:4]
+
+    FlakyModel.falhar_em, FlakyModel.traduzidos = None, []
+    translate_dataset.translate_csv(
+        str(entrada), ["article"], ["flaky"], batch_size=2, resume=True, **opcoes
+    )
+    assert FlakyModel.traduzidos == textos[4:]
+
+    saida = pd.read_csv(tmp_path / "noticias_translation.csv", index_col=0)
+    assert saida["id"].tolist() == list(range(7))
+    assert saida["article flaky translation"].tolist() == [t.upper() for t in textos]
@@ -0,0 +1,51 @@
+from utilities.webdataset import (
+    escrever_amostras,
+    expandir_shards,
+    ler_amostras,
+    traduzir_shard,
+)
+
+
+def test_expandir_shards(tmp_path):
+    """Intervalos e padrões glob são expandidos em ordem."""
+    assert expandir_shards("file://shard-{08..10}.tar") == [
+        "shard-08.tar",
+        "shard-09.tar",
+        "shard-10.tar",
+    ]
+    for nome in ("b.tar", "a.tar"):
+        (tmp_path / nome).touch()
+    assert expandir_shards(str(tmp_path / "*.tar")) == [
+        str(tmp_path / "a.tar"),
+        str(tmp_path / "b.tar"),
+    ]
+
+
+def test_traduzir_shard(tmp_path):
+    """As traduções são acrescentadas a cada amostra, mantendo os campos."""
+    entrada = str(tmp_path / "entrada.tar")
+    saida = str(tmp_path / "saida.tar")
+    amostras = [
+        {"__key__": f"{indice:03d}", "txt": f"text {indice}".encode(), "cls": b"1"}
+        for indice in range(5)
+    ]
+    escrever_amostras(entrada, amostras)
+    lotes = []
+
+    def traduzir(textos):
+        lotes.append(len(textos))
+        return [texto.upper() for texto in textos]
+
+    assert traduzir_shard(entrada, saida, traduzir, "marian", ["txt"], 2) == 5
+    assert lotes == [2, 2, 1]
+    traduzidas = list(ler_amostras(saida))
+    assert [amostra["__key__"] for amostra in traduzidas] == [
+        "000",
+        "001",
+        "002",
+        "003",
+        "004",
+    ]
+    assert traduzidas[3]["marian.txt"] == b"TEXT 3"
+    assert traduzidas[3]["txt"] == b"text 3"
+    assert traduzidas[3]["cls"] == b"1"